@@ -0,0 +1,62 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Benchmarks for fetching finished query results from FlowAPI's /get route,
+which need a running FlowKit deployment. Set `FLOWAPI_URL`, and
+`FLOWAPI_TOKEN` to a token which can run and get each query kind.
+"""
+
+import time
+
+try:
+    import flowclient
+except ImportError:
+    pass  # The benchmarks are skipped by flowapi_or_skip
+
+from .utils import available_dates, connect_or_skip, flowapi_or_skip
+
+
+def _query_spec(query_kind, dates):
+    if query_kind == "daily_location":
+        return flowclient.daily_location(dates[0], "admin3", "last")
+    elif query_kind == "modal_location":
+        return flowclient.modal_location_from_dates(
+            dates[0], dates[-1], "admin3", "last"
+        )
+    elif query_kind == "location_event_counts":
+        return flowclient.location_event_counts(dates[0], dates[-1], "admin3", "hour")
+
+
+class GetResult:
+    params = (
+        ["daily_location", "modal_location", "location_event_counts"],
+        ["json", "csv", "arrow"],
+    )
+    param_names = ["query_kind", "result_format"]
+    timeout = 1200
+
+    def setup(self, query_kind, result_format):
+        connect_or_skip()
+        self.connection = flowapi_or_skip()
+        self.query_id = flowclient.run_query(
+            self.connection, _query_spec(query_kind, available_dates(7))
+        )
+        # Make sure the query has finished, so only fetching the result is timed
+        while not flowclient.query_is_ready(self.connection, self.query_id)[0]:
+            time.sleep(1)
+
+    def time_get(self, query_kind, result_format):
+        flowclient.get_result_by_query_id(
+            self.connection, self.query_id, result_format=result_format
+        )
+
+    def track_rows_per_second(self, query_kind, result_format):
+        start = time.perf_counter()
+        df = flowclient.get_result_by_query_id(
+            self.connection, self.query_id, result_format=result_format
+        )
+        return len(df) / (time.perf_counter() - start)
+
+    track_rows_per_second.unit = "rows/s"
@@ -0,0 +1,44 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Benchmarks for choosing which queries to remove from cache. Planning runs
+on randomly generated cache records and needs no database, listing the
+candidates needs a running FlowDB.
+"""
+
+import numpy as np
+
+from flowmachine.core import Query
+from flowmachine.core.cache import get_cache_eviction_candidates, plan_cache_eviction
+
+from .utils import connect_or_skip
+
+
+class PlanCacheEviction:
+    params = [1000, 10000, 100_000]
+    param_names = ["n_cached"]
+
+    def setup(self, n_cached):
+        rng = np.random.RandomState(0)
+        sizes = rng.lognormal(15, 2, n_cached).astype(int)
+        scores = np.sort(rng.exponential(1, n_cached))
+        self.candidates = [
+            (f"{i:032x}", f"x{i:032x}", int(size), float(score))
+            for i, (size, score) in enumerate(zip(sizes, scores))
+        ]
+        self.bytes_to_free = int(sizes.sum() // 10)
+
+    def time_plan(self, n_cached):
+        plan_cache_eviction(self.candidates, self.bytes_to_free)
+
+
+class CacheEvictionCandidates:
+    timeout = 600
+
+    def setup(self):
+        connect_or_skip()
+
+    def time_get_candidates(self):
+        get_cache_eviction_candidates(Query.connection)
@@ -0,0 +1,64 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Benchmarks for constructing daily locations and generating their SQL,
+which need a running FlowDB.
+"""
+
+from flowmachine.features import daily_location
+
+from .utils import RoundTrips, connect_or_skip, available_dates
+
+
+class DailyLocation:
+    params = (["admin3", "versioned-site"], ["last", "most-common"])
+    param_names = ["level", "method"]
+    timeout = 600
+
+    def setup(self, level, method):
+        connect_or_skip()
+        self.date = available_dates(1)[0]
+        self.query = daily_location(self.date, level=level, method=method)
+
+    def time_construct(self, level, method):
+        daily_location(self.date, level=level, method=method)
+
+    def track_construct_db_round_trips(self, level, method):
+        with RoundTrips() as trips:
+            daily_location(self.date, level=level, method=method)
+        return trips.db
+
+    track_construct_db_round_trips.unit = "queries"
+
+    def track_construct_redis_round_trips(self, level, method):
+        with RoundTrips() as trips:
+            daily_location(self.date, level=level, method=method)
+        return trips.redis
+
+    track_construct_redis_round_trips.unit = "commands"
+
+    def time_make_sql(self, level, method):
+        self.query._make_query()
+
+    def track_sql_size(self, level, method):
+        return len(self.query._make_query())
+
+    track_sql_size.unit = "characters"
+
+    def track_get_query_db_round_trips(self, level, method):
+        self.query.__dict__.pop("_sql_memo", None)
+        with RoundTrips() as trips:
+            self.query.get_query()
+        return trips.db
+
+    track_get_query_db_round_trips.unit = "queries"
+
+    def track_get_query_redis_round_trips(self, level, method):
+        self.query.__dict__.pop("_sql_memo", None)
+        with RoundTrips() as trips:
+            self.query.get_query()
+        return trips.redis
+
+    track_get_query_redis_round_trips.unit = "commands"
@@ -0,0 +1,25 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Records the size of the dataset the benchmarks ran against, so that
+results from different data can be told apart. Needs a running FlowDB.
+"""
+
+from flowmachine.core import Query
+
+from .utils import connect_or_skip
+
+
+class Dataset:
+    params = ["events.calls", "infrastructure.cells"]
+    param_names = ["table"]
+
+    def setup(self, table):
+        connect_or_skip()
+
+    def track_rows(self, table):
+        return Query.connection.fetch(f"SELECT count(*) FROM {table}")[0][0]
+
+    track_rows.unit = "rows"
@@ -0,0 +1,34 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Benchmarks for storing a distance matrix calculated in the database or in
+numpy, which need a running FlowDB.
+"""
+
+from flowmachine.features.spatial import DistanceMatrix
+
+from .utils import connect_or_skip
+
+
+class StoreDistanceMatrix:
+    params = [["sql", "numpy"], ["versioned-site", "versioned-cell"], [None, 50]]
+    param_names = ["engine", "level", "max_distance"]
+    timeout = 1200
+    # Each store needs the distance matrix removed from cache, which setup does
+    number = 1
+    repeat = 3
+
+    def setup(self, engine, level, max_distance):
+        connect_or_skip()
+        self.query = DistanceMatrix(
+            level=level, engine=engine, max_distance=max_distance
+        )
+        self.query.invalidate_db_cache()
+
+    def teardown(self, engine, level, max_distance):
+        self.query.invalidate_db_cache()
+
+    def time_store(self, engine, level, max_distance):
+        self.query.store().result()
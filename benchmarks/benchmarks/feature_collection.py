@@ -0,0 +1,45 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Benchmarks for feature collections of subscriber features computed from the
+same events, which need a running FlowDB. `shared_scan=False` joins the
+features, each with its own scan of the events.
+"""
+
+from flowmachine.features import (
+    EventCount,
+    NocturnalEvents,
+    RadiusOfGyration,
+    SubscriberDegree,
+    feature_collection,
+)
+
+from .utils import connect_or_skip, available_dates
+
+
+class FeatureCollectionScan:
+    params = ([1, 7], [True, False])
+    param_names = ["n_days", "shared_scan"]
+    timeout = 1200
+
+    def setup(self, n_days, shared_scan):
+        connect_or_skip()
+        dates = available_dates(n_days + 1)
+        start, stop = dates[0], dates[-1]
+        self.query = feature_collection(
+            [
+                EventCount(start, stop),
+                EventCount(start, stop, direction="out"),
+                NocturnalEvents(start, stop),
+                SubscriberDegree(start, stop),
+                RadiusOfGyration(start, stop),
+            ],
+            dropna=False,
+            shared_scan=shared_scan,
+        )
+        self.sql = self.query.get_query()
+
+    def time_feature_collection(self, n_days, shared_scan):
+        self.query.connection.fetch(f"SELECT count(*) FROM ({self.sql}) _")
@@ -0,0 +1,48 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Benchmarks for the cache check made on every poll of a query, which need a
+running FlowDB. `time_get_query_object` is the cost of loading the cached
+query object, which is how the check used to be made.
+"""
+
+import time
+
+from flowmachine.core import Query
+from flowmachine.core.cache import cache_table_exists, get_query_object_by_id
+from flowmachine.features import ModalLocation, daily_location
+
+from .utils import connect_or_skip, available_dates
+
+
+class PollCacheCheck:
+    params = [1, 7]
+    param_names = ["n_days"]
+    timeout = 1200
+
+    def setup(self, n_days):
+        connect_or_skip()
+        self.query = ModalLocation(
+            *[
+                daily_location(date, level="admin3", method="last")
+                for date in available_dates(n_days)
+            ]
+        )
+        if not self.query.is_stored:
+            self.query.store().result()
+
+    def time_cache_table_exists(self, n_days):
+        cache_table_exists(Query.connection, self.query.md5)
+
+    def time_get_query_object(self, n_days):
+        get_query_object_by_id(Query.connection, self.query.md5)
+
+
+class PollCacheCheckCPU(PollCacheCheck):
+    """
+    CPU time used by this process, rather than wall time, for the same checks.
+    """
+
+    timer = time.process_time
@@ -0,0 +1,57 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Benchmarks for the array-based engine of the population-weighted
+opportunities model, which run on randomly generated inputs and
+need no database.
+"""
+
+import numpy as np
+import pandas as pd
+
+from flowmachine.models.pwo import (
+    _buffer_population_matrix,
+    _location_codes,
+    _predict_flows,
+)
+
+
+def _make_inputs(n_sites):
+    rng = np.random.RandomState(0)
+    sites = [f"site_{i}" for i in range(n_sites)]
+    population_df = pd.DataFrame(
+        {"site_id": sites, "total": rng.randint(1, 1000, n_sites)}
+    )
+    population_buffer = pd.DataFrame(
+        {
+            "site_id_from": np.repeat(sites, n_sites),
+            "site_id_to": np.tile(sites, n_sites),
+            "buffer_population": rng.randint(1000, 100_000, n_sites * n_sites),
+        }
+    )
+    return population_df, population_buffer
+
+
+class PopulationWeightedOpportunitiesEngine:
+    params = [100, 500, 1000, 2500, 5000]
+    param_names = ["n_sites"]
+    timeout = 300
+
+    def setup(self, n_sites):
+        self.population_df, self.population_buffer = _make_inputs(n_sites)
+        self.locations = _location_codes(self.population_df, ["site_id"])
+        self.population = self.population_df["total"].values.astype("float64")
+        self.buffer_population = _buffer_population_matrix(
+            self.population_buffer, self.locations
+        )
+
+    def time_buffer_population_matrix(self, n_sites):
+        _buffer_population_matrix(self.population_buffer, self.locations)
+
+    def time_predict_flows(self, n_sites):
+        _predict_flows(self.population, self.buffer_population, self.population * 0.1)
+
+    def peakmem_predict_flows(self, n_sites):
+        _predict_flows(self.population, self.buffer_population, self.population * 0.1)
@@ -0,0 +1,63 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Benchmarks for constructing query objects, which need a running FlowDB.
+"""
+
+from flowmachine.core.catalog_cache import (
+    CATALOG_CACHE_TTL,
+    refresh_catalog_cache,
+    set_catalog_cache_ttl,
+)
+from flowmachine.features import ModalLocation, daily_location
+
+from .utils import connect_or_skip, available_dates
+
+
+class ModalLocationConstruction:
+    params = ([7, 30, 90], [True, False])
+    param_names = ["n_days", "catalog_cache"]
+    timeout = 600
+
+    def setup(self, n_days, catalog_cache):
+        connect_or_skip()
+        self.dates = available_dates(n_days)
+        set_catalog_cache_ttl(CATALOG_CACHE_TTL if catalog_cache else 0)
+
+    def teardown(self, n_days, catalog_cache):
+        set_catalog_cache_ttl(CATALOG_CACHE_TTL)
+
+    def time_construct_modal_location(self, n_days, catalog_cache):
+        ModalLocation(
+            *[
+                daily_location(date, level="admin3", method="last")
+                for date in self.dates
+            ]
+        )
+
+
+class ModalLocationUnion:
+    params = [7, 30, 90]
+    param_names = ["n_days"]
+    timeout = 600
+
+    def setup(self, n_days):
+        connect_or_skip()
+        self.daily_locations = [
+            daily_location(date, level="admin3", method="last")
+            for date in available_dates(n_days)
+        ]
+        self.modal_location = ModalLocation(*self.daily_locations)
+
+    def time_construct_union(self, n_days):
+        self.modal_location._unioned_locations()
+
+    def time_modal_location_sql(self, n_days):
+        self.modal_location._make_query()
+
+    def track_modal_location_sql_size(self, n_days):
+        return len(self.modal_location._make_query())
+
+    track_modal_location_sql_size.unit = "characters"
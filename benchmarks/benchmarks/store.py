@@ -0,0 +1,49 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Benchmarks for storing queries end to end, from nothing in cache, which
+need a running FlowDB.
+"""
+
+from flowmachine.features import Flows, ModalLocation, daily_location
+
+from .utils import connect_or_skip, available_dates, invalidate_tree
+
+
+def _make_query(query_kind, dates):
+    if query_kind == "daily_location":
+        return daily_location(dates[0], level="admin3", method="last")
+    elif query_kind == "modal_location":
+        return ModalLocation(
+            *[daily_location(date, level="admin3", method="last") for date in dates]
+        )
+    elif query_kind == "flows":
+        return Flows(
+            daily_location(dates[0], level="admin3", method="last"),
+            daily_location(dates[1], level="admin3", method="last"),
+        )
+
+
+class StoreQuery:
+    params = (
+        ["daily_location", "modal_location", "flows"],
+        ["store", "store_with_dependencies"],
+    )
+    param_names = ["query_kind", "how"]
+    timeout = 1200
+    # Each store needs an empty cache, which setup provides
+    number = 1
+    repeat = 3
+
+    def setup(self, query_kind, how):
+        connect_or_skip()
+        self.query = _make_query(query_kind, available_dates(7))
+        invalidate_tree(self.query)
+
+    def teardown(self, query_kind, how):
+        invalidate_tree(self.query)
+
+    def time_store(self, query_kind, how):
+        getattr(self.query, how)().result()
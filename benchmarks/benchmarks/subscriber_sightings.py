@@ -0,0 +1,32 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Benchmarks for subscriber locations read from the stored per-day subscriber
+sightings, against reading them from the events tables, which need a
+running FlowDB.
+"""
+
+from flowmachine.features import store_subscriber_sightings, subscriber_locations
+
+from .utils import connect_or_skip, available_dates
+
+
+class SubscriberLocationsFromSightings:
+    params = (["cell", "admin3"], [1, 7], [True, False])
+    param_names = ["level", "n_days", "read_sightings"]
+    timeout = 1200
+
+    def setup(self, level, n_days, read_sightings):
+        connect_or_skip()
+        dates = available_dates(n_days + 1)
+        for future in store_subscriber_sightings(dates[0], dates[-1], levels=[level]):
+            future.result()
+        self.query = subscriber_locations(
+            dates[0], dates[-1], level=level, read_sightings=read_sightings
+        )
+        self.sql = self.query.get_query()
+
+    def time_subscriber_locations(self, level, n_days, read_sightings):
+        self.query.connection.fetch(f"SELECT count(*) FROM ({self.sql}) _")
@@ -0,0 +1,46 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Benchmarks for subsetting events to an explicit list of subscribers, which
+need a running FlowDB.
+"""
+
+from flowmachine.core import Query
+from flowmachine.features import EventTableSubset
+
+from .utils import connect_or_skip, available_dates
+
+
+class ExplicitSubscriberSubset:
+    params = [100, 1000, 10000, 100_000]
+    param_names = ["n_subscribers"]
+    timeout = 600
+
+    def setup(self, n_subscribers):
+        connect_or_skip()
+        start, stop = available_dates(2)
+        # Made up subscribers, padded with real ones so the subset isn't empty
+        subscribers = [
+            row[0]
+            for row in Query.connection.fetch(
+                f"SELECT DISTINCT msisdn FROM events.calls LIMIT {n_subscribers}"
+            )
+        ]
+        subscribers += [
+            f"{i:016x}" for i in range(max(0, n_subscribers - len(subscribers)))
+        ]
+        self.subset = EventTableSubset(start, stop, subscriber_subset=subscribers)
+        self.sql = self.subset.get_query()
+
+    def time_build_sql(self, n_subscribers):
+        self.subset._make_query()
+
+    def track_sql_size(self, n_subscribers):
+        return len(self.sql)
+
+    track_sql_size.unit = "characters"
+
+    def time_plan(self, n_subscribers):
+        Query.connection.fetch(f"EXPLAIN {self.sql}")
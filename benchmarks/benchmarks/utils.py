@@ -0,0 +1,150 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Helpers shared by benchmarks which need a running FlowDB.
+"""
+
+import os
+
+from sqlalchemy import event
+
+import flowmachine
+from flowmachine.core import Query
+
+
+def connect_or_skip():
+    """
+    Connect flowmachine using the usual environment variables, and skip the
+    benchmark if FlowDB or redis is not available.
+
+    Returns
+    -------
+    flowmachine.core.Connection
+    """
+    try:
+        return Query.connection
+    except AttributeError:
+        pass
+    try:
+        connection = flowmachine.connect()
+        Query.redis.ping()
+    except Exception:
+        # asv treats NotImplementedError raised in setup as a skipped benchmark
+        raise NotImplementedError("FlowDB is not available.")
+    return connection
+
+
+def available_dates(n_days, table="calls"):
+    """
+    Get the first n_days dates for which there is data, skipping the
+    benchmark if there are not enough.
+
+    Parameters
+    ----------
+    n_days : int
+        Number of dates needed
+    table : str, default "calls"
+        Events table to check
+
+    Returns
+    -------
+    list of str
+        ISO format date strings
+    """
+    dates = Query.connection.available_dates(table=table)[table]
+    if len(dates) < n_days:
+        raise NotImplementedError(f"Fewer than {n_days} days of {table} data.")
+    return [date.strftime("%Y-%m-%d") for date in dates[:n_days]]
+
+
+def flowapi_or_skip():
+    """
+    Connect to FlowAPI with flowclient, using the url in `FLOWAPI_URL` and
+    the token in `FLOWAPI_TOKEN`, and skip the benchmark if they are not set
+    or flowclient is not installed.
+
+    Returns
+    -------
+    flowclient.Connection
+    """
+    try:
+        import flowclient
+    except ImportError:
+        raise NotImplementedError("flowclient is not installed.")
+    try:
+        return flowclient.Connection(
+            os.environ["FLOWAPI_URL"], os.environ["FLOWAPI_TOKEN"]
+        )
+    except KeyError:
+        raise NotImplementedError("FLOWAPI_URL and FLOWAPI_TOKEN are not set.")
+
+
+def invalidate_tree(query):
+    """
+    Remove a query, and every query it is built from, from cache, so that
+    storing it is timed from scratch. Cell to region mappings are shared by
+    every query at a level, so are left stored.
+
+    Parameters
+    ----------
+    query : Query
+    """
+    from flowmachine.features import CellToPolygon
+
+    openlist = [query]
+    while openlist:
+        q = openlist.pop()
+        openlist += list(q.dependencies)
+        if isinstance(q, CellToPolygon):
+            continue
+        try:
+            q.fully_qualified_table_name
+        except NotImplementedError:
+            continue
+        q.invalidate_db_cache()
+
+
+class RoundTrips:
+    """
+    Context manager which counts the queries sent to FlowDB, and the
+    commands sent to redis, while it is open.
+
+    Examples
+    --------
+    >>> with RoundTrips() as trips:
+    ...     daily_location("2016-01-01")
+    >>> trips.db, trips.redis
+    (3, 0)
+    """
+
+    def __enter__(self):
+        self.db = 0
+        self.redis = 0
+        connection = Query.connection
+        redis = Query.redis
+        fetch = connection.fetch
+        execute_command = redis.execute_command
+
+        def counted_fetch(*args, **kwargs):
+            self.db += 1
+            return fetch(*args, **kwargs)
+
+        def counted_execute_command(*args, **kwargs):
+            self.redis += 1
+            return execute_command(*args, **kwargs)
+
+        # Connection.fetch uses the DBAPI connection directly, so isn't seen by the event
+        connection.fetch = counted_fetch
+        redis.execute_command = counted_execute_command
+        event.listen(connection.engine, "before_cursor_execute", self._count_db)
+        return self
+
+    def _count_db(self, *args, **kwargs):
+        self.db += 1
+
+    def __exit__(self, *exc_info):
+        del Query.connection.fetch
+        del Query.redis.execute_command
+        event.remove(Query.connection.engine, "before_cursor_execute", self._count_db)
@@ -0,0 +1,97 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Benchmark for fetching a finished query result from FlowAPI's /get route
+as JSON, CSV and Arrow, and decoding it into a pandas dataframe with
+flowclient.
+
+Each download runs in a fresh subprocess, so the peak resident memory
+reported for a format is that of fetching and decoding the result alone.
+
+Needs a running FlowKit deployment, a token which can get the query, and
+the id of a query which has already been run, e.g.
+
+    python benchmarks/load/flowapi_get.py --url http://localhost:9090 \\
+        --token $TOKEN --query-id 6bb3efbb6f4e4ee4d2e4e8bdb7f1d82c
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+FORMATS = ["json", "csv", "arrow"]
+
+
+def fetch(url: str, token: str, query_id: str, result_format: str) -> dict:
+    """
+    Fetch and decode the result once, and report how long it took, the
+    size of the dataframe and this process's peak resident memory.
+    """
+    import flowclient
+
+    connection = flowclient.Connection(url, token)
+    start = time.perf_counter()
+    df = flowclient.get_result_by_query_id(
+        connection, query_id, result_format=result_format
+    )
+    elapsed = time.perf_counter() - start
+    return dict(
+        seconds=elapsed,
+        rows=len(df),
+        # ru_maxrss is in kilobytes on Linux
+        peak_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", required=True, help="FlowAPI url")
+    parser.add_argument("--token", required=True, help="Access token")
+    parser.add_argument("--query-id", required=True, help="Id of a finished query")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=FORMATS)
+    parser.add_argument("--child", choices=FORMATS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(fetch(args.url, args.token, args.query_id, args.child)))
+        return
+
+    print(f"{'format':>8} {'rows':>10} {'best s':>8} {'rows/s':>12} {'peak MB':>9}")
+    for result_format in args.formats:
+        runs = [
+            json.loads(
+                subprocess.run(
+                    [
+                        sys.executable,
+                        __file__,
+                        "--url",
+                        args.url,
+                        "--token",
+                        args.token,
+                        "--query-id",
+                        args.query_id,
+                        "--child",
+                        result_format,
+                    ],
+                    check=True,
+                    stdout=subprocess.PIPE,
+                ).stdout
+            )
+            for _ in range(args.repeats)
+        ]
+        best = min(run["seconds"] for run in runs)
+        rows = runs[0]["rows"]
+        peak = max(run["peak_rss_mb"] for run in runs)
+        print(
+            f"{result_format:>8} {rows:>10} {best:>8.2f} {rows / best:>12.0f} {peak:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Load benchmark for FlowAPI's /poll route, comparing a new REQ socket for
+every HTTP request (FlowAPI's previous behaviour) with the pooled
+connection to the FlowMachine server.
+
+The FlowAPI app is driven in-process by concurrent clients, and talks over
+TCP to a stub FlowMachine server which answers immediately, so the figures
+reflect FlowAPI and messaging overhead only.
+
+Run from the flowapi directory, in its environment, e.g.
+
+    pipenv run python ../benchmarks/load/flowapi_poll.py --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import zmq
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "flowapi"))
+
+import asyncpg
+from quart import request
+from zmq.asyncio import Context
+
+from app.main import create_app
+from app.zmq_channel import ZMQChannel
+from tests.unit.utils import make_token
+
+
+class PerRequestSocket:
+    """
+    FlowAPI's previous behaviour: open a REQ socket before each HTTP
+    request, and close it afterwards.
+    """
+
+    def __init__(self, app, address):
+        self.address = address
+
+        @app.before_request
+        async def connect_zmq():
+            request.socket = Context.instance().socket(zmq.REQ)
+            request.socket.connect(self.address)
+
+        @app.teardown_request
+        def close_zmq(exc):
+            request.socket.close()
+
+    async def request(self, message):
+        request.socket.send_json(message)
+        return await request.socket.recv_json()
+
+    def close(self):
+        pass
+
+
+def stub_server(socket):
+    """
+    Answer messages as the FlowMachine server would for a running daily
+    location query, until the context is terminated.
+    """
+    while True:
+        try:
+            *envelope, msg = socket.recv_multipart()
+        except zmq.ContextTerminated:
+            socket.close(linger=0)
+            return
+        msg = json.loads(msg)
+        if msg["action"] == "get_query_kind":
+            reply = {"id": msg["query_id"], "query_kind": "daily_location"}
+        else:
+            reply = {"id": msg["query_id"], "status": "running"}
+        socket.send_multipart([*envelope, json.dumps(reply).encode()])
+
+
+async def dummy_pool(*args, **kwargs):
+    # /poll never touches the database
+    return None
+
+
+async def run_load(app, token, n_requests, concurrency):
+    """
+    Make n_requests polls using concurrency clients, and return the
+    latency of each request and the total time taken.
+    """
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+    remaining = iter(range(n_requests))
+
+    async def poll_repeatedly():
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await client.get("/api/0/poll/DUMMY_ID", headers=headers)
+            latencies.append(time.perf_counter() - start)
+            assert 202 == response.status_code
+
+    await client.get("/api/0/poll/DUMMY_ID", headers=headers)  # Warm up
+    start = time.perf_counter()
+    await asyncio.gather(*[poll_repeatedly() for _ in range(concurrency)])
+    return latencies, time.perf_counter() - start
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.update(
+        LOG_DIRECTORY=tempfile.mkdtemp(),
+        LOG_LEVEL="error",
+        SERVER="127.0.0.1",
+        JWT_SECRET_KEY="secret",
+    )
+    asyncpg.create_pool = dummy_pool
+    token = make_token(
+        "benchmark",
+        "secret",
+        timedelta(hours=1),
+        {"daily_location": {"permissions": {"poll": True}}},
+    )
+
+    ctx = zmq.Context()
+    socket = ctx.socket(zmq.ROUTER)
+    port = socket.bind_to_random_port("tcp://127.0.0.1")
+    threading.Thread(target=stub_server, args=(socket,), daemon=True).start()
+
+    print(f"{args.requests} polls, {args.concurrency} concurrent clients")
+    print(f"{'mode':<12}{'p50 (ms)':>10}{'p99 (ms)':>10}{'req/s':>10}")
+    for mode in ("per_request", "pooled"):
+        app = create_app()
+        address = f"tcp://127.0.0.1:{port}"
+        if mode == "pooled":
+            app.zmq_channel = ZMQChannel(address)
+        else:
+            app.zmq_channel = PerRequestSocket(app, address)
+        latencies, elapsed = asyncio.get_event_loop().run_until_complete(
+            run_load(app, token, args.requests, args.concurrency)
+        )
+        app.zmq_channel.close()
+        print(
+            f"{mode:<12}{percentile(latencies, 50) * 1000:>10.2f}"
+            f"{percentile(latencies, 99) * 1000:>10.2f}{len(latencies) / elapsed:>10.0f}"
+        )
+    ctx.term()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,16 +6,25 @@ from functools import wraps
 from flask_jwt_extended import jwt_required, get_jwt_claims, get_jwt_identity
 from quart import current_app, request, jsonify
 
+from .query_metadata import get_query_metadata
 
-def check_claims(claim_type):
+
+def check_claims(claim_type, include_sql=False):
     """
     Create a decorator which checks the query kind provided to a route
     against the claims of any token provided.
 
+    For routes with a query id, the metadata of the query is looked up
+    with `get_query_metadata`, and left on the request as
+    `request.query_metadata` for the route to use.
+
     Parameters
     ----------
     claim_type : str
         One of "run", "poll" or "get_result"
+    include_sql : bool, default False
+        If True, always fetch the metadata from the FlowMachine server,
+        along with the SQL for the query's result if it is complete.
 
     Returns
     -------
@@ -40,15 +49,11 @@ def check_claims(claim_type):
             query_kind = (
                 "NA" if json_payload is None else json_payload.get("query_kind", "NA")
             )
-            try:  # Get the query kind from the backend
-                request.socket.send_json(
-                    {
-                        "request_id": request.request_id,
-                        "action": "get_query_kind",
-                        "query_id": kwargs["query_id"],
-                    }
+            try:  # Get the query kind from the cache or the backend
+                message = await get_query_metadata(
+                    kwargs["query_id"], include_sql=include_sql
                 )
-                message = await request.socket.recv_json()
+                request.query_metadata = message
                 if "query_kind" in message:
                     query_kind = message["query_kind"]
                 else:
@@ -99,14 +104,6 @@ def check_claims(claim_type):
                 )
             elif claim_type == "get_result":
                 # Get aggregation unit
-                request.socket.send_json(
-                    {
-                        "request_id": request.request_id,
-                        "action": "get_params",
-                        "query_id": kwargs["query_id"],
-                    }
-                )
-                message = await request.socket.recv_json()
                 if "params" not in message:
                     return jsonify({}), 404
                 try:
@@ -230,3 +227,79 @@ def check_geography_claims():
         return wrapper
 
     return decorator
+
+
+def query_kind_allowed(claim_type, query_kind):
+    """
+    Check the claims of the token provided for whether it allows
+    an action on queries of a given kind.
+
+    Parameters
+    ----------
+    claim_type : str
+        One of "run", "poll" or "get_result"
+    query_kind : str
+        Kind of query
+
+    Returns
+    -------
+    bool
+    """
+    endpoint_claims = get_jwt_claims().get(query_kind, {}).get("permissions", {})
+    return (claim_type in endpoint_claims) and (endpoint_claims[claim_type] != False)
+
+
+def check_batch_claims(claim_type):
+    """
+    Create a decorator for routes which act on a batch of queries. The
+    decorated function should check each query against the claims of the
+    token provided using `query_kind_allowed`; this decorator logs the
+    request, and rejects JSON payloads which don't have a list of queries
+    under the given key.
+
+    Parameters
+    ----------
+    claim_type : str
+        One of "run" or "poll"
+
+    Returns
+    -------
+    decorator
+    """
+    key = {"run": "queries", "poll": "query_ids"}[claim_type]
+
+    def decorator(func):
+        @wraps(func)
+        @jwt_required
+        async def wrapper(*args, **kwargs):
+            json_payload = await request.json
+            current_app.access_logger.info(
+                "AUTHENTICATED",
+                request_id=request.request_id,
+                route=request.path,
+                user=get_jwt_identity(),
+                src_ip=request.headers.get("Remote-Addr"),
+                json_payload=json_payload,
+            )
+            if json_payload is None or not isinstance(json_payload.get(key), list):
+                return (
+                    jsonify(
+                        {"status": "Error", "msg": f"Expected '{key}' to be a list."}
+                    ),
+                    400,
+                )
+            current_app.query_run_logger.info(
+                "Received",
+                request_id=request.request_id,
+                query_kind="BATCH",
+                route=request.path,
+                user=get_jwt_identity(),
+                src_ip=request.headers.get("Remote-Addr"),
+                json_payload=json_payload,
+                claims=get_jwt_claims(),
+            )
+            return await func(json_payload[key], *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -12,15 +12,16 @@ blueprint = Blueprint("geography", __name__)
 @blueprint.route("/geography/<aggregation_unit>")
 @check_geography_claims()
 async def get_geography(aggregation_unit):
-    request.socket.send_json(
-        {
-            "request_id": request.request_id,
-            "action": "get_geography",
-            "params": {"aggregation_unit": aggregation_unit},
-        }
-    )
-    #  Get the reply.
-    message = await request.socket.recv_json()
+    msg = {
+        "request_id": request.request_id,
+        "action": "get_geography",
+        "params": {"aggregation_unit": aggregation_unit},
+    }
+    # Optional level of detail for the boundaries, e.g. "low" for simplified polygons
+    simplify = request.args.get("simplify")
+    if simplify is not None:
+        msg["simplify"] = simplify
+    message = await current_app.zmq_channel.request(msg)
     current_app.logger.debug(f"Got message: {message}")
     try:
         status = message["status"]
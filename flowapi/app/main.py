@@ -6,17 +6,19 @@ import uuid
 from pathlib import Path
 
 import quart.flask_patch
-from quart import Quart, request
+from quart import Quart, request, jsonify
 import asyncpg
 import logging
 import os
-import zmq
 from logging.handlers import TimedRotatingFileHandler
-from zmq.asyncio import Context
 
 from .jwt_auth_callbacks import register_logging_callbacks
+from .pagination import RowCountCache
 from .run_query import blueprint as run_query_blueprint
 from .geography import blueprint as geography_blueprint
+from .query_metadata import QueryMetadataCache
+from .query_notifications import QueryStoredListener
+from .zmq_channel import ZMQChannel, ServerBusyError
 from flask_jwt_extended import JWTManager
 
 import structlog
@@ -69,6 +71,19 @@ def create_app():
         "JWT_SECRET_KEY", os.getenv("JWT_SECRET_KEY")
     )
     jwt = JWTManager(app)
+    # One connection to the FlowMachine server per worker, shared by all requests
+    app.zmq_channel = ZMQChannel(f"tcp://{os.getenv('SERVER')}:5555")
+    # Exact row counts of stored query results, by table name
+    app.row_counts = RowCountCache(
+        max_size=int(os.getenv("ROW_COUNT_CACHE_SIZE", 10000))
+    )
+    # Notifications that queries have been stored, for long-polling
+    app.query_listener = QueryStoredListener()
+    # Kind and parameters of queries, by query id
+    app.query_metadata = QueryMetadataCache(
+        max_size=int(os.getenv("QUERY_METADATA_CACHE_SIZE", 10000)),
+        ttl=float(os.getenv("QUERY_METADATA_CACHE_TTL", 3600)),
+    )
 
     log_root = os.getenv("LOG_DIRECTORY", "/var/log/flowapi/")
 
@@ -107,34 +122,29 @@ def create_app():
         logger.addHandler(fh)
         app.query_run_logger = structlog.wrap_logger(logger)
 
-    @app.before_request
-    async def connect_zmq():
-        context = Context.instance()
-        #  Socket to talk to server
-        app.logger.debug("Connecting to FlowMachine server…")
-        socket = context.socket(zmq.REQ)
-        socket.connect(f"tcp://{os.getenv('SERVER')}:5555")
-        request.socket = socket
-        app.logger.debug("Connected.")
-
     @app.before_request
     async def add_uuid():
         request.request_id = str(uuid.uuid4())
 
-    @app.teardown_request
-    def close_zmq(exc):
+    @app.after_serving
+    async def close_zmq():
         app.logger.debug("Closing connection to FlowMachine server…")
-        try:
-            request.socket.close()
-            app.logger.debug("Closed socket.")
-        except AttributeError:
-            app.logger.debug("No socket to close.")
+        app.zmq_channel.close()
+        await app.query_listener.close()
 
     @app.before_first_request
     async def create_db():
         dsn = f'postgres://{getsecret("API_DB_USER", os.getenv("DB_USER"))}:{getsecret("API_DB_PASS", os.getenv("DB_PASS"))}@{os.getenv("DB_HOST")}:{os.getenv("FLOWDB_PORT", 5432)}/flowdb'
         app.pool = await asyncpg.create_pool(dsn, max_size=20)
 
+    @app.errorhandler(ServerBusyError)
+    async def server_busy(error):
+        return (
+            jsonify({"status": "Error", "msg": f"{error}"}),
+            503,
+            {"Retry-After": "1"},
+        )
+
     @app.route("/")
     async def root():
         return ""
@@ -0,0 +1,225 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import base64
+import json
+from collections import OrderedDict
+from typing import Optional
+
+from quart import current_app
+
+# Largest number of rows which may be requested in one page
+MAX_PAGE_SIZE = 100_000
+
+
+def encode_cursor(values):
+    """
+    Encode the key values of the last row of a page as an opaque cursor.
+
+    Parameters
+    ----------
+    values : list
+        Values of the key columns
+
+    Returns
+    -------
+    str
+        URL-safe cursor
+    """
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor made by `encode_cursor`.
+
+    Parameters
+    ----------
+    cursor : str
+        Cursor to decode
+
+    Returns
+    -------
+    list
+        Values of the key columns
+
+    Raises
+    ------
+    ValueError
+        If the cursor is not valid
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid cursor '{cursor}'.")
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid cursor '{cursor}'.")
+    return values
+
+
+def quote_identifier(name):
+    """
+    Quote a column name for use in SQL.
+    """
+    escaped = name.replace('"', '""')
+    return f'"{escaped}"'
+
+
+def keyset_page_sql(table_name, columns, key_column, limit, after=False):
+    """
+    SQL to select one page of rows from the table storing a query result,
+    in order of the indexed column numbering its rows, starting after the
+    row number given as the parameter $1 if `after` is True.
+
+    The row number is selected as an extra column, and one more row than
+    the page size is selected, so that it is known whether there is a
+    following page.
+
+    Parameters
+    ----------
+    table_name : str
+        Schema-qualified name of the table
+    columns : list of str
+        Columns of the result
+    key_column : str
+        Column numbering the rows
+    limit : int
+        Number of rows in the page
+    after : bool, default False
+        Start after the row number passed as $1
+
+    Returns
+    -------
+    str
+    """
+    key = quote_identifier(key_column)
+    selected = ", ".join(quote_identifier(col) for col in columns + [key_column])
+    where = f" WHERE {key} > $1" if after else ""
+    return (
+        f"SELECT {selected} FROM {table_name}{where} ORDER BY {key} LIMIT {limit + 1}"
+    )
+
+
+async def fetch_result_page(table_name, columns, key_column, limit, cursor=None):
+    """
+    Fetch one page of a query result, using the row number of the last row
+    of the previous page (a keyset) rather than an offset, so that later
+    pages don't have to skip over all the rows before them.
+
+    Parameters
+    ----------
+    table_name : str
+        Schema-qualified name of the table storing the result
+    columns : list of str
+        Columns of the result
+    key_column : str
+        Indexed column numbering the rows of the result
+    limit : int
+        Number of rows in the page
+    cursor : str, optional
+        Cursor returned with the previous page. If not given, the first
+        page is returned.
+
+    Returns
+    -------
+    list of dict, str or None
+        Rows of the page, and the cursor for the next page, or None if this
+        is the last page
+
+    Raises
+    ------
+    ValueError
+        If the cursor is not valid for this result
+    """
+    args = []
+    if cursor is not None:
+        after = decode_cursor(cursor)
+        if len(after) != 1 or type(after[0]) is not int:
+            raise ValueError(f"Invalid cursor '{cursor}'.")
+        args = after
+    page_sql = keyset_page_sql(table_name, columns, key_column, limit, bool(args))
+    current_app.logger.debug(f"Running {page_sql}")
+    async with current_app.pool.acquire() as connection:
+        rows = await connection.fetch(page_sql, *args)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][key_column]])
+    return [{col: row[col] for col in columns} for row in rows], next_cursor
+
+
+class RowCountCache:
+    """
+    Least recently used cache of the exact row counts of stored query
+    results, by table name.
+
+    Parameters
+    ----------
+    max_size : int, default 10000
+        Most tables to hold counts for
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._counts = OrderedDict()
+
+    def get(self, table_name: str) -> Optional[int]:
+        """
+        Get the row count of a table, or None if it isn't known.
+        """
+        try:
+            self._counts.move_to_end(table_name)
+        except KeyError:
+            return None
+        return self._counts[table_name]
+
+    def set(self, table_name: str, count: int) -> None:
+        """
+        Remember the row count of a table, forgetting the least recently
+        used table if the cache is full.
+        """
+        self._counts[table_name] = count
+        self._counts.move_to_end(table_name)
+        while len(self._counts) > self.max_size:
+            self._counts.popitem(last=False)
+
+    def __len__(self):
+        return len(self._counts)
+
+
+async def count_rows(table_name, exact=False):
+    """
+    Count the rows in the table storing a query result.
+
+    Unless an exact count is asked for, Postgres' estimate from the table
+    statistics is used if there is one. Exact counts are remembered, since
+    a stored result does not change.
+
+    Parameters
+    ----------
+    table_name : str
+        Schema-qualified name of the table
+    exact : bool, default False
+        Count the rows, rather than using an estimate
+
+    Returns
+    -------
+    int, bool
+        The number of rows, and whether it is exact
+    """
+    count = current_app.row_counts.get(table_name)
+    if count is not None:
+        return count, True
+    async with current_app.pool.acquire() as connection:
+        if not exact:
+            estimate = await connection.fetchval(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass($1)",
+                table_name,
+            )
+            # Tables which have never been analysed have no useful estimate
+            if estimate is not None and estimate > 0:
+                return estimate, False
+        count = await connection.fetchval(f"SELECT count(*) FROM {table_name}")
+    current_app.row_counts.set(table_name, count)
+    return count, True
@@ -0,0 +1,133 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Metadata of queries known to the FlowMachine server, fetched with a single
+`get_query_metadata` request and cached by query id.
+
+The kind and parameters of a query never change for a given id, so once
+they are known, checking the claims of a token against a query needs no
+request to the FlowMachine server at all.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from quart import current_app, request
+
+
+class QueryMetadataCache:
+    """
+    Least recently used cache of the kind and parameters of queries, by
+    query id. Entries expire a fixed time after they were added, so that
+    ids forgotten by the FlowMachine server are eventually forgotten here.
+
+    Parameters
+    ----------
+    max_size : int, default 10000
+        Most queries to hold metadata for
+    ttl : float, default 3600
+        Seconds to keep metadata for
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, query_id: str) -> Optional[dict]:
+        """
+        Get the metadata of a query.
+
+        Parameters
+        ----------
+        query_id : str
+            Id of the query
+
+        Returns
+        -------
+        dict or None
+            With keys "id", "query_kind" and "params", or None if there is
+            no unexpired entry for the query.
+        """
+        try:
+            expires, metadata = self._entries[query_id]
+        except KeyError:
+            return None
+        if expires < time.monotonic():
+            del self._entries[query_id]
+            return None
+        self._entries.move_to_end(query_id)
+        return dict(metadata)
+
+    def set(self, query_id: str, query_kind: str, params: dict) -> None:
+        """
+        Remember the kind and parameters of a query, forgetting the least
+        recently used query if the cache is full.
+
+        Parameters
+        ----------
+        query_id : str
+            Id of the query
+        query_kind : str
+            Kind of the query
+        params : dict
+            Parameters of the query
+        """
+        self._entries[query_id] = (
+            time.monotonic() + self.ttl,
+            {"id": query_id, "query_kind": query_kind, "params": params},
+        )
+        self._entries.move_to_end(query_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Forget all the metadata.
+        """
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+async def get_query_metadata(query_id: str, *, include_sql: bool = False) -> dict:
+    """
+    Get the kind and parameters of a query, from the app's cache if they are
+    there, and otherwise from the FlowMachine server along with the status of
+    the query.
+
+    Parameters
+    ----------
+    query_id : str
+        Id of the query
+    include_sql : bool, default False
+        If True, always ask the FlowMachine server, and include the SQL which
+        returns the result of the query if it is complete.
+
+    Returns
+    -------
+    dict
+        The cached metadata, or the reply from the FlowMachine server. Only
+        replies from the server have a "status".
+    """
+    if not include_sql:
+        metadata = current_app.query_metadata.get(query_id)
+        if metadata is not None:
+            return metadata
+    message = await current_app.zmq_channel.request(
+        {
+            "request_id": request.request_id,
+            "action": "get_query_metadata",
+            "query_id": query_id,
+            "include_sql": include_sql,
+        }
+    )
+    if "query_kind" in message and "params" in message:
+        current_app.query_metadata.set(
+            query_id, message["query_kind"], message["params"]
+        )
+    return message
@@ -0,0 +1,143 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Waiting for queries to finish, using the notifications FlowMachine sends
+through FlowDB whenever it finishes storing a query, so that clients can
+long-poll a query instead of repeatedly polling it.
+"""
+
+import asyncio
+import json
+from collections import defaultdict
+from typing import Optional
+
+# Must match flowmachine.core.cache.QUERY_STORED_CHANNEL
+QUERY_STORED_CHANNEL = "flowmachine_query_stored"
+
+# Longest a request may wait for a query to finish, in seconds
+MAX_WAIT = 60
+
+
+class QueryStoredListener:
+    """
+    Listens for notifications that queries have been stored on a connection
+    taken from the database pool, and wakes up anyone waiting on them.
+
+    The connection is only taken the first time something waits, and is
+    taken again if it has been closed.
+    """
+
+    def __init__(self):
+        self._waiters = defaultdict(set)
+        self._connection = None
+        self._pool = None
+        self._lock = None  # Made on first use, so it belongs to the running loop
+
+    async def start(self, pool) -> None:
+        """
+        Start listening, if not already listening.
+
+        Parameters
+        ----------
+        pool : asyncpg.pool.Pool
+            Pool to take the connection to listen on from
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._connection is not None and not self._connection.is_closed():
+                return
+            self._pool = pool
+            self._connection = await pool.acquire()
+            await self._connection.add_listener(QUERY_STORED_CHANNEL, self._notified)
+
+    def _notified(self, connection, pid, channel, payload) -> None:
+        """
+        Callback for notifications, which sets the result of every future
+        waiting on the query which was stored to its status.
+        """
+        try:
+            event = json.loads(payload)
+            query_id, status = event["query_id"], event["status"]
+        except (ValueError, KeyError, TypeError):
+            return
+        for future in self._waiters.pop(query_id, ()):
+            if not future.done():
+                future.set_result(status)
+
+    def expect(self, query_id: str) -> asyncio.Future:
+        """
+        Start waiting for a query to be stored. Only notifications sent after
+        this is called are seen, so call it before checking whether the query
+        is still running, and `forget` the future once finished with it.
+
+        Parameters
+        ----------
+        query_id : str
+            Id of the query
+
+        Returns
+        -------
+        asyncio.Future
+            Future whose result will be "done", or "error" if storing the
+            query failed
+        """
+        future = asyncio.get_event_loop().create_future()
+        self._waiters[query_id].add(future)
+        return future
+
+    def forget(self, query_id: str, future: asyncio.Future) -> None:
+        """
+        Stop waiting for a query to be stored.
+
+        Parameters
+        ----------
+        query_id : str
+            Id of the query
+        future : asyncio.Future
+            Future returned by `expect`
+        """
+        waiters = self._waiters.get(query_id)
+        if waiters is not None:
+            waiters.discard(future)
+            if len(waiters) == 0:
+                del self._waiters[query_id]
+
+    @staticmethod
+    async def wait(future: asyncio.Future, timeout: float) -> Optional[str]:
+        """
+        Wait for a query to be stored.
+
+        Parameters
+        ----------
+        future : asyncio.Future
+            Future returned by `expect`
+        timeout : float
+            Longest time to wait, in seconds
+
+        Returns
+        -------
+        str or None
+            "done", or "error" if storing the query failed, or None if
+            the query wasn't stored before the timeout
+        """
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self) -> None:
+        """
+        Stop listening, and return the connection to the pool.
+        """
+        if self._connection is None:
+            return
+        async with self._lock:
+            if not self._connection.is_closed():
+                await self._connection.remove_listener(
+                    QUERY_STORED_CHANNEL, self._notified
+                )
+                await self._pool.release(self._connection)
+            self._connection = None
@@ -2,18 +2,33 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import ujson as json
 from quart import Blueprint, current_app, request, url_for, stream_with_context, jsonify
-from .stream_results import stream_result_as_json
-from .check_claims import check_claims
+from .pagination import MAX_PAGE_SIZE, count_rows, fetch_result_page
+from .stream_results import (
+    stream_result_as_json,
+    stream_result_as_csv,
+    stream_result_as_arrow,
+)
+from .check_claims import check_claims, check_batch_claims, query_kind_allowed
+from .query_notifications import MAX_WAIT
 
 blueprint = Blueprint("query", __name__)
 
+# Formats query results can be returned in, by mimetype, with the file extension
+# to use. The first is the default.
+RESULT_FORMATS = {
+    "application/json": "json",
+    "text/csv": "csv",
+    "application/vnd.apache.arrow.stream": "arrow",
+}
+
 
 @blueprint.route("/run", methods=["POST"])
 @check_claims("run")
 async def run_query():
     json_data = await request.json
-    request.socket.send_json(
+    message = await current_app.zmq_channel.request(
         {
             "request_id": request.request_id,
             "action": "run_query",
@@ -21,9 +36,6 @@ async def run_query():
             "params": json_data["params"],
         }
     )
-
-    #  Get the reply.
-    message = await request.socket.recv_json()
     current_app.logger.debug(f"Received reply {message}")
 
     if "id" in message:
@@ -35,13 +47,74 @@ async def run_query():
         return jsonify({}), 403
 
 
+@blueprint.route("/run_batch", methods=["POST"])
+@check_batch_claims("run")
+async def run_query_batch(queries):
+    allowed = [
+        isinstance(query, dict)
+        and query_kind_allowed("run", query.get("query_kind", "NA"))
+        for query in queries
+    ]
+    message = await current_app.zmq_channel.request(
+        {
+            "request_id": request.request_id,
+            "action": "run_query_batch",
+            "queries": [query for query, ok in zip(queries, allowed) if ok],
+        }
+    )
+    current_app.logger.debug(f"Received reply {message}")
+
+    replies = iter(message["results"])
+    results = []
+    for query, ok in zip(queries, allowed):
+        if not ok:
+            query_kind = query.get("query_kind") if isinstance(query, dict) else None
+            results.append(
+                {
+                    "status": "Error",
+                    "msg": f"'run' access denied for '{query_kind}' query",
+                }
+            )
+            continue
+        reply = next(replies)
+        if "id" in reply:
+            results.append(
+                {
+                    "status": "accepted",
+                    "query_id": reply["id"],
+                    "location": url_for(f"query.poll_query", query_id=reply["id"]),
+                }
+            )
+        else:
+            results.append({"status": "Error", "msg": reply.get("error")})
+    return jsonify({"queries": results}), 202
+
+
 @blueprint.route("/poll/<query_id>")
 @check_claims("poll")
 async def poll_query(query_id):
-    request.socket.send_json(
-        {"request_id": request.request_id, "action": "poll", "query_id": query_id}
-    )
-    message = await request.socket.recv_json()
+    try:
+        wait = min(max(float(request.args.get("wait", 0)), 0), MAX_WAIT)
+    except ValueError:
+        return (
+            jsonify({"status": "Error", "msg": "'wait' must be a number of seconds."}),
+            400,
+        )
+    stored = None
+    if wait > 0:
+        # Start listening before polling, so that the query can't finish unseen in between
+        await current_app.query_listener.start(current_app.pool)
+        stored = current_app.query_listener.expect(query_id)
+    try:
+        message = request.query_metadata
+        if stored is not None or "status" not in message:
+            message = await poll(query_id)
+        if message.get("status") == "running" and stored is not None:
+            if await current_app.query_listener.wait(stored, wait) is not None:
+                message = await poll(query_id)
+    finally:
+        if stored is not None:
+            current_app.query_listener.forget(query_id, stored)
 
     if message["status"] == "done":
         return (
@@ -55,13 +128,65 @@ async def poll_query(query_id):
         return jsonify({}), 404
 
 
+async def poll(query_id):
+    """
+    Ask the FlowMachine server for the status of a query.
+
+    Parameters
+    ----------
+    query_id : str
+        Identifier of the query
+
+    Returns
+    -------
+    dict
+        Reply from the server
+    """
+    return await current_app.zmq_channel.request(
+        {"request_id": request.request_id, "action": "poll", "query_id": query_id}
+    )
+
+
+@blueprint.route("/poll_batch", methods=["POST"])
+@check_batch_claims("poll")
+async def poll_query_batch(query_ids):
+    message = await current_app.zmq_channel.request(
+        {
+            "request_id": request.request_id,
+            "action": "poll_batch",
+            "query_ids": query_ids,
+        }
+    )
+    results = []
+    for query_id, reply in zip(query_ids, message["results"]):
+        query_kind = reply.get("query_kind")
+        if query_kind is None:
+            results.append({"query_id": query_id, "status": "awol"})
+        elif not query_kind_allowed("poll", query_kind):
+            results.append(
+                {
+                    "query_id": query_id,
+                    "status": "Error",
+                    "msg": f"'poll' access denied for '{query_kind}' query",
+                }
+            )
+        elif reply["status"] == "done":
+            results.append(
+                {
+                    "query_id": query_id,
+                    "status": "done",
+                    "location": url_for(f"query.get_query", query_id=query_id),
+                }
+            )
+        else:
+            results.append({"query_id": query_id, "status": reply["status"]})
+    return jsonify({"queries": results}), 200
+
+
 @blueprint.route("/get/<query_id>")
-@check_claims("get_result")
+@check_claims("get_result", include_sql=True)
 async def get_query(query_id):
-    request.socket.send_json(
-        {"request_id": request.request_id, "action": "get_sql", "query_id": query_id}
-    )
-    message = await request.socket.recv_json()
+    message = request.query_metadata
     current_app.logger.debug(f"Got message: {message}")
     try:
         status = message["status"]
@@ -70,11 +195,24 @@ async def get_query(query_id):
             jsonify({"status": "Error", "msg": "Server responded without status"}),
             500,
         )
-    if message["status"] == "done":
-        results_streamer = stream_with_context(stream_result_as_json)(
-            message["sql"], additional_elements={"query_id": query_id}
+    if message["status"] == "done" and (
+        "limit" in request.args or "after" in request.args
+    ):
+        return await get_query_page(query_id)
+    elif message["status"] == "done":
+        mimetype = request.accept_mimetypes.best_match(
+            list(RESULT_FORMATS), default="application/json"
         )
-        mimetype = "application/json"
+        if mimetype == "text/csv":
+            results_streamer = stream_with_context(stream_result_as_csv)(message["sql"])
+        elif mimetype == "application/vnd.apache.arrow.stream":
+            results_streamer = stream_with_context(stream_result_as_arrow)(
+                message["sql"]
+            )
+        else:
+            results_streamer = stream_with_context(stream_result_as_json)(
+                message["sql"], additional_elements={"query_id": query_id}
+            )
 
         current_app.logger.debug(f"Returning result of query {query_id}.")
         return (
@@ -82,15 +220,129 @@ async def get_query(query_id):
             200,
             {
                 "Transfer-Encoding": "chunked",
-                "Content-Disposition": f"attachment;filename={query_id}.json",
+                "Content-Disposition": f"attachment;filename={query_id}.{RESULT_FORMATS[mimetype]}",
                 "Content-type": mimetype,
             },
         )
-    elif message["status"] == "running":
+    else:
+        return not_done_response(message)
+
+
+def not_done_response(message):
+    """
+    Response for a reply from the FlowMachine server to a request for a
+    query result, when the result is not available.
+
+    Parameters
+    ----------
+    message : dict
+        Reply from the server
+
+    Returns
+    -------
+    tuple
+        Response body and status code
+    """
+    status = message.get("status")
+    if status == "running":
         return jsonify({}), 202
-    elif message["status"] == "error":
+    elif status == "error":
         return jsonify({"status": "Error", "msg": message["error"]}), 403
     elif status == "awol":
         return (jsonify({"status": "Error", "msg": message["error"]}), 404)
+    elif status is None:
+        return (
+            jsonify({"status": "Error", "msg": "Server responded without status"}),
+            500,
+        )
     else:
         return jsonify({"status": "Error", "msg": f"Unexpected status: {status}"}), 500
+
+
+async def get_query_page(query_id):
+    """
+    Response with one page of a query result, as JSON, for a request to
+    /get with `limit` and/or `after` arguments.
+
+    Pages are in the order the rows of the result were stored, which are
+    numbered so that the order doesn't change. The response includes the
+    location of the next page, or null if this is the last page.
+
+    Parameters
+    ----------
+    query_id : str
+        Identifier of the query
+
+    Returns
+    -------
+    tuple
+        Response body, status code and headers
+    """
+    try:
+        limit = int(request.args.get("limit", MAX_PAGE_SIZE))
+    except ValueError:
+        limit = 0
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        return (
+            jsonify(
+                {
+                    "status": "Error",
+                    "msg": f"'limit' must be an integer between 1 and {MAX_PAGE_SIZE}.",
+                }
+            ),
+            400,
+        )
+    message = await current_app.zmq_channel.request(
+        {
+            "request_id": request.request_id,
+            "action": "get_result_info",
+            "query_id": query_id,
+        }
+    )
+    if message.get("status") != "done":
+        return not_done_response(message)
+    try:
+        rows, next_cursor = await fetch_result_page(
+            message["table_name"],
+            message["columns"],
+            message["key_column"],
+            limit,
+            request.args.get("after"),
+        )
+    except ValueError as exc:
+        return jsonify({"status": "Error", "msg": f"{exc}"}), 400
+    next_location = (
+        None
+        if next_cursor is None
+        else url_for(
+            "query.get_query", query_id=query_id, limit=limit, after=next_cursor
+        )
+    )
+    current_app.logger.debug(f"Returning page of result of query {query_id}.")
+    return (
+        json.dumps(
+            {"query_id": query_id, "query_result": rows, "next": next_location},
+            default=str,
+        ),
+        200,
+        {"Content-type": "application/json"},
+    )
+
+
+@blueprint.route("/count/<query_id>")
+@check_claims("get_result")
+async def get_row_count(query_id):
+    message = await current_app.zmq_channel.request(
+        {
+            "request_id": request.request_id,
+            "action": "get_result_info",
+            "query_id": query_id,
+        }
+    )
+    current_app.logger.debug(f"Got message: {message}")
+    if message.get("status") != "done":
+        return not_done_response(message)
+    count, exact = await count_rows(
+        message["table_name"], exact=request.args.get("exact", "false") == "true"
+    )
+    return jsonify({"query_id": query_id, "count": count, "exact": exact}), 200
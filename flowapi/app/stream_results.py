@@ -2,9 +2,35 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import asyncio
+import io
+
+import pyarrow as pa
 import ujson as json
 from quart import current_app
 
+# Arrow types for Postgres types which asyncpg decodes to values arrow can
+# take directly. Columns of any other type are sent as strings.
+ARROW_TYPES = {
+    "bool": pa.bool_(),
+    "int2": pa.int16(),
+    "int4": pa.int32(),
+    "int8": pa.int64(),
+    "float4": pa.float32(),
+    "float8": pa.float64(),
+    "text": pa.string(),
+    "varchar": pa.string(),
+    "bpchar": pa.string(),
+    "name": pa.string(),
+    "date": pa.date32(),
+    "timestamp": pa.timestamp("us"),
+    "timestamptz": pa.timestamp("us", tz="UTC"),
+}
+# Arrow types for Postgres types whose values need converting first
+CONVERTED_ARROW_TYPES = {"numeric": (pa.float64(), float)}
+# Number of rows fetched from the database, and sent, at a time
+BATCH_SIZE = 10000
+
 
 async def stream_result_as_json(
     sql_query, result_name="query_result", additional_elements=None
@@ -54,3 +80,157 @@ async def stream_result_as_json(
                 yield b"]}"
             except Exception as e:
                 logger.error(e)
+
+
+async def stream_result_as_csv(sql_query):
+    """
+    Generate a CSV representation of a query result, with a header row,
+    using Postgres' COPY so that rows are encoded by the database.
+
+    Parameters
+    ----------
+    sql_query : str
+        SQL query to stream output of
+
+    Yields
+    ------
+    bytes
+        Chunks of CSV
+    """
+    logger = current_app.logger
+    pool = current_app.pool
+    logger.debug("Starting generator.")
+    async with pool.acquire() as connection:
+        chunks = asyncio.Queue(maxsize=16)
+
+        async def copy():
+            try:
+                await connection.copy_from_query(
+                    sql_query.strip().rstrip(";"),
+                    output=chunks.put,
+                    format="csv",
+                    header=True,
+                )
+            except asyncio.CancelledError:
+                # Cancelled because nothing is reading the chunks any more
+                raise
+            except Exception:
+                await chunks.put(None)
+                raise
+            await chunks.put(None)
+
+        logger.debug(f"Running {sql_query}")
+        copier = asyncio.ensure_future(copy())
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                yield chunk
+            await copier  # Raise any error from the copy
+            logger.debug("Finishing up.")
+        except Exception as e:
+            logger.error(e)
+        finally:
+            # Make sure the copy has stopped before the connection goes back
+            # to the pool, in case the client went away part way through
+            copier.cancel()
+            await asyncio.wait({copier})
+
+
+def arrow_schema(attributes):
+    """
+    Get the arrow schema for a query result, and the function needed to
+    convert each column's values to ones arrow accepts.
+
+    Parameters
+    ----------
+    attributes : tuple of asyncpg.types.Attribute
+        Columns of the query result, as given by a prepared statement
+
+    Returns
+    -------
+    pyarrow.Schema, list
+        The schema, and a list with a conversion function, or None if no
+        conversion is needed, for each column
+    """
+    fields, converters = [], []
+    for attribute in attributes:
+        arrow_type, convert = CONVERTED_ARROW_TYPES.get(
+            attribute.type.name, (ARROW_TYPES.get(attribute.type.name), None)
+        )
+        if arrow_type is None:
+            arrow_type, convert = pa.string(), str
+        fields.append(pa.field(attribute.name, arrow_type))
+        converters.append(convert)
+    return pa.schema(fields), converters
+
+
+def rows_to_record_batch(rows, schema, converters):
+    """
+    Convert rows of a query result to an arrow record batch.
+
+    Parameters
+    ----------
+    rows : list of asyncpg.Record
+        Rows to convert
+    schema : pyarrow.Schema
+        Schema of the result
+    converters : list
+        Conversion function, or None, for each column
+
+    Returns
+    -------
+    pyarrow.RecordBatch
+    """
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    arrays = []
+    for values, field, convert in zip(columns, schema, converters):
+        if convert is not None:
+            values = [None if value is None else convert(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+async def stream_result_as_arrow(sql_query, batch_size=BATCH_SIZE):
+    """
+    Generate an Arrow IPC stream of a query result, fetching and encoding
+    rows in batches.
+
+    Parameters
+    ----------
+    sql_query : str
+        SQL query to stream output of
+    batch_size : int
+        Number of rows in each record batch
+
+    Yields
+    ------
+    bytes
+        Chunks of the Arrow IPC stream
+    """
+    logger = current_app.logger
+    pool = current_app.pool
+    logger.debug("Starting generator.")
+    async with pool.acquire() as connection:
+        async with connection.transaction():
+            logger.debug(f"Running {sql_query}")
+            try:
+                statement = await connection.prepare(sql_query)
+                schema, converters = arrow_schema(statement.get_attributes())
+                sink = io.BytesIO()
+                writer = pa.ipc.new_stream(sink, schema)
+                cursor = await statement.cursor()
+                while True:
+                    rows = await cursor.fetch(batch_size)
+                    if len(rows) == 0:
+                        break
+                    writer.write_batch(rows_to_record_batch(rows, schema, converters))
+                    yield sink.getvalue()
+                    sink.seek(0)
+                    sink.truncate()
+                writer.close()
+                yield sink.getvalue()
+                logger.debug("Finishing up.")
+            except Exception as e:
+                logger.error(e)
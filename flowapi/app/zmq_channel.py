@@ -0,0 +1,132 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import asyncio
+import logging
+import uuid
+from json import dumps, loads
+from typing import Dict
+
+import zmq
+from zmq.asyncio import Context
+
+logger = logging.getLogger("flowapi").getChild(__name__)
+
+
+class ServerBusyError(Exception):
+    """
+    Custom exception to indicate that the FlowMachine server was too busy
+    to accept a message.
+    """
+
+
+class ZMQChannel:
+    """
+    Long-lived connection to the FlowMachine server, shared by all the
+    requests handled by a worker.
+
+    Messages are sent over a single DEALER socket, each tagged with a
+    unique message id which the server echoes back with its reply, so
+    any number of requests can be waiting on the server at once and each
+    reply is handed to the coroutine which is waiting for it.
+
+    Parameters
+    ----------
+    address : str
+        ZMQ address of the FlowMachine server, e.g. "tcp://flowmachine:5555"
+    """
+
+    def __init__(self, address: str):
+        self.address = address
+        self._socket = None
+        self._receiver = None
+        self._pending: Dict[bytes, asyncio.Future] = {}
+
+    def _connect(self) -> None:
+        """
+        Open the socket and start listening for replies, if not already doing so.
+        """
+        if self._socket is None:
+            logger.debug(f"Connecting to FlowMachine server at {self.address}…")
+            self._socket = Context.instance().socket(zmq.DEALER)
+            self._socket.connect(self.address)
+            self._receiver = asyncio.ensure_future(self._receive_replies())
+
+    async def _receive_replies(self) -> None:
+        """
+        Receive replies from the server, and pass each one to the future
+        waiting for it.
+        """
+        try:
+            while True:
+                message_id, _, reply = await self._socket.recv_multipart()
+                try:
+                    future = self._pending.pop(message_id)
+                except KeyError:
+                    logger.error(f"Discarding reply to unknown message {message_id}.")
+                    continue
+                if not future.done():
+                    future.set_result(loads(reply))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            # Fail everything in flight rather than leaving it waiting forever,
+            # and reconnect on the next request.
+            logger.error(f"Connection to FlowMachine server failed: {exc}")
+            self._reset(exc)
+
+    def _reset(self, exc: Exception) -> None:
+        """
+        Close the socket and fail any requests still waiting for a reply.
+        """
+        if self._socket is not None:
+            self._socket.close(linger=0)
+        self._socket = None
+        self._receiver = None
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(exc)
+
+    async def request(self, message: dict) -> dict:
+        """
+        Send a message to the FlowMachine server and wait for the reply.
+
+        Parameters
+        ----------
+        message : dict
+            JSON-serialisable message, including the action and API request id
+
+        Returns
+        -------
+        dict
+            The server's reply
+
+        Raises
+        ------
+        ServerBusyError
+            If the server was too busy to handle the message
+        """
+        self._connect()
+        message_id = uuid.uuid4().hex.encode()
+        future = asyncio.get_event_loop().create_future()
+        self._pending[message_id] = future
+        try:
+            await self._socket.send_multipart(
+                [message_id, b"", dumps(message).encode()]
+            )
+            reply = await future
+        finally:
+            self._pending.pop(message_id, None)
+        if reply.get("status") == "busy":
+            raise ServerBusyError(reply.get("error", "FlowMachine server is busy."))
+        return reply
+
+    def close(self) -> None:
+        """
+        Close the connection to the server.
+        """
+        if self._receiver is not None:
+            self._receiver.cancel()
+        self._reset(ConnectionError("Connection to FlowMachine server closed."))
@@ -4,12 +4,11 @@
 
 import asyncpg
 import pytest
-import zmq
 from .context import app
 from app.main import create_app
+from app.zmq_channel import ZMQChannel
 from asynctest import MagicMock, Mock, CoroutineMock
 from datetime import timedelta
-from zmq.asyncio import Context
 from .utils import make_token
 from asyncio import Future
 
@@ -26,9 +25,9 @@ def async_return(result):
 @pytest.fixture
 def dummy_zmq_server(monkeypatch):
     """
-    A fixture which provides a dummy zero mq
-    socket which records the json it is asked
-    to send.
+    A fixture which replaces the request method of the channel
+    to the FlowMachine server with a mock, so no messages are
+    actually sent.
 
     Parameters
     ----------
@@ -37,14 +36,13 @@ def dummy_zmq_server(monkeypatch):
     Yields
     ------
     asynctest.CoroutineMock
-        Coroutine mocking for the recv_json method of the socket
+        Coroutine mocking the request method of the channel, which
+        returns the reply to each message
 
     """
-    dummy = Mock()
-    dummy.return_value.socket.return_value.recv_json = CoroutineMock()
-
-    monkeypatch.setattr(zmq.asyncio.Context, "instance", dummy)
-    yield dummy.return_value.socket.return_value.recv_json
+    dummy = CoroutineMock()
+    monkeypatch.setattr(ZMQChannel, "request", dummy)
+    yield dummy
 
 
 @pytest.fixture
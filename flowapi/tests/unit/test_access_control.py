@@ -108,9 +108,13 @@ async def test_granular_json_access(
     responses = {}
     for q_kind in query_kinds:
         dummy_zmq_server.side_effect = (
-            {"id": 10, "query_kind": q_kind},
-            {"id": 10, "params": {"aggregation_unit": "DUMMY_AGGREGATION"}},
-            {"sql": "SELECT 1;", "status": "done"},
+            {
+                "id": 10,
+                "query_kind": q_kind,
+                "params": {"aggregation_unit": "DUMMY_AGGREGATION"},
+                "sql": "SELECT 1;",
+                "status": "done",
+            },
         )
         response = await client.get(
             f"/api/0/get/0",
@@ -139,9 +143,13 @@ async def test_no_result_access_without_both_claims(
     client, db, log_dir, app = app
     token = access_token_builder({"DUMMY_QUERY_KIND": claims})
     dummy_zmq_server.side_effect = (
-        {"id": 10, "query_kind": "DUMMY_QUERY_KIND"},
-        {"id": 10, "params": {"aggregation_unit": "DUMMY_AGGREGATION"}},
-        {"query": "SELECT 1;", "status": "done"},
+        {
+            "id": 10,
+            "query_kind": "DUMMY_QUERY_KIND",
+            "params": {"aggregation_unit": "DUMMY_AGGREGATION"},
+            "query": "SELECT 1;",
+            "status": "done",
+        },
     )
     response = await client.get(
         f"/api/0/get/0",
@@ -0,0 +1,101 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_run_batch(app, dummy_zmq_server, access_token_builder):
+    """
+    Test that only queries allowed by the token are sent to be run, and each query gets a status.
+    """
+    client, db, log_dir, app = app
+
+    token = access_token_builder({"daily_location": {"permissions": {"run": True}}})
+    dummy_zmq_server.return_value = {
+        "status": "done",
+        "results": [{"status": "accepted", "id": 0}, {"error": "Broken"}],
+    }
+    queries = [
+        {"query_kind": "daily_location", "params": {"date": "2016-01-01"}},
+        {"query_kind": "modal_location", "params": {}},
+        {"query_kind": "daily_location", "params": {"date": "NOT_A_DATE"}},
+    ]
+    response = await client.post(
+        f"/api/0/run_batch",
+        headers={"Authorization": f"Bearer {token}"},
+        json={"queries": queries},
+    )
+    json = await response.get_json()
+    assert response.status_code == 202
+    assert [
+        {"status": "accepted", "query_id": 0, "location": "/api/0/poll/0"},
+        {"status": "Error", "msg": "'run' access denied for 'modal_location' query"},
+        {"status": "Error", "msg": "Broken"},
+    ] == json["queries"]
+    sent = dummy_zmq_server.call_args[0][0]
+    assert "run_query_batch" == sent["action"]
+    assert [queries[0], queries[2]] == sent["queries"]
+
+
+@pytest.mark.asyncio
+async def test_poll_batch(app, dummy_zmq_server, access_token_builder):
+    """
+    Test that each query id gets a status, and queries not allowed by the token are not reported.
+    """
+    client, db, log_dir, app = app
+
+    token = access_token_builder({"daily_location": {"permissions": {"poll": True}}})
+    dummy_zmq_server.return_value = {
+        "status": "done",
+        "results": [
+            {"status": "done", "id": "a", "query_kind": "daily_location"},
+            {"status": "running", "id": "b", "query_kind": "daily_location"},
+            {"status": "running", "id": "c", "query_kind": "modal_location"},
+            {"status": "awol", "id": "d", "error": "Unknown query id: d"},
+        ],
+    }
+    response = await client.post(
+        f"/api/0/poll_batch",
+        headers={"Authorization": f"Bearer {token}"},
+        json={"query_ids": ["a", "b", "c", "d"]},
+    )
+    json = await response.get_json()
+    assert response.status_code == 200
+    assert [
+        {"query_id": "a", "status": "done", "location": "/api/0/get/a"},
+        {"query_id": "b", "status": "running"},
+        {
+            "query_id": "c",
+            "status": "Error",
+            "msg": "'poll' access denied for 'modal_location' query",
+        },
+        {"query_id": "d", "status": "awol"},
+    ] == json["queries"]
+
+
+@pytest.mark.parametrize(
+    "route, payload",
+    [
+        ("run_batch", {"query_kind": "daily_location"}),
+        ("poll_batch", {"query_ids": "a"}),
+    ],
+)
+@pytest.mark.asyncio
+async def test_batch_requires_list(
+    route, payload, app, dummy_zmq_server, access_token_builder
+):
+    """
+    Test that 400 is returned if the payload doesn't contain a list.
+    """
+    client, db, log_dir, app = app
+
+    token = access_token_builder(
+        {"daily_location": {"permissions": {"run": True, "poll": True}}}
+    )
+    response = await client.post(
+        f"/api/0/{route}", headers={"Authorization": f"Bearer {token}"}, json=payload
+    )
+    assert response.status_code == 400
+    dummy_zmq_server.assert_not_called()
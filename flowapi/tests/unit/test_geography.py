@@ -100,3 +100,35 @@ async def test_geography_error_for_missing_status(
         headers={"Authorization": f"Bearer {token}"},
     )
     assert 500 == response.status_code
+
+
+@pytest.mark.parametrize("simplify", ["low", None])
+@pytest.mark.asyncio
+async def test_get_geography_simplify(
+    simplify, app, dummy_zmq_server, access_token_builder
+):
+    """
+    Test that a requested level of detail is passed on to flowmachine, and left out otherwise.
+    """
+    client, db, log_dir, app = app
+    db.acquire.return_value.__aenter__.return_value.cursor.return_value.__aiter__.return_value = (
+        []
+    )
+    token = access_token_builder(
+        {
+            "geography": {
+                "permissions": {"get_result": True},
+                "spatial_aggregation": ["DUMMY_AGGREGATION"],
+            }
+        }
+    )
+    dummy_zmq_server.side_effect = ({"status": "done", "sql": "SELECT 1;"},)
+    query_string = "" if simplify is None else f"?simplify={simplify}"
+    response = await client.get(
+        f"/api/0/geography/DUMMY_AGGREGATION{query_string}",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert 200 == response.status_code
+    sent = dummy_zmq_server.call_args[0][0]
+    assert {"aggregation_unit": "DUMMY_AGGREGATION"} == sent["params"]
+    assert simplify == sent.get("simplify")
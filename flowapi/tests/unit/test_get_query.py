@@ -2,10 +2,18 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import asyncio
 import pytest
+from collections import namedtuple
+from contextlib import asynccontextmanager
 from json import loads
 
-from asynctest import return_once
+import pyarrow as pa
+from asynctest import return_once, CoroutineMock, Mock
+from quart import Quart
+
+from app.stream_results import stream_result_as_csv
+from .conftest import async_return
 
 
 @pytest.mark.asyncio
@@ -32,9 +40,13 @@ async def test_get_query(app, dummy_zmq_server, access_token_builder):
     )
 
     dummy_zmq_server.side_effect = (
-        {"id": 0, "query_kind": "modal_location"},
-        {"id": 0, "params": {"aggregation_unit": "DUMMY_AGGREGATION"}},
-        {"sql": "SELECT 1;", "status": "done"},
+        {
+            "id": 0,
+            "query_kind": "modal_location",
+            "params": {"aggregation_unit": "DUMMY_AGGREGATION"},
+            "sql": "SELECT 1;",
+            "status": "done",
+        },
     )
     response = await client.get(
         f"/api/0/get/0", headers={"Authorization": f"Bearer {token}"}
@@ -45,6 +57,129 @@ async def test_get_query(app, dummy_zmq_server, access_token_builder):
     assert "attachment;filename=0.json" == response.headers["content-disposition"]
 
 
+@pytest.mark.asyncio
+async def test_get_query_as_csv(app, dummy_zmq_server, access_token_builder):
+    """
+    Test that CSV from the database is returned when CSV is accepted.
+    """
+    client, db, log_dir, app = app
+
+    async def copy_from_query(sql, output, format, header):
+        assert "SELECT 1" == sql
+        assert "csv" == format
+        await output(b"name,value\n")
+        await output(b"foo,1\n")
+
+    db.acquire.return_value.__aenter__.return_value.copy_from_query = copy_from_query
+    token = access_token_builder(
+        {
+            "modal_location": {
+                "permissions": {"get_result": True},
+                "spatial_aggregation": ["DUMMY_AGGREGATION"],
+            }
+        }
+    )
+
+    dummy_zmq_server.side_effect = (
+        {
+            "id": 0,
+            "query_kind": "modal_location",
+            "params": {"aggregation_unit": "DUMMY_AGGREGATION"},
+            "sql": "SELECT 1;",
+            "status": "done",
+        },
+    )
+    response = await client.get(
+        f"/api/0/get/0",
+        headers={"Authorization": f"Bearer {token}", "Accept": "text/csv"},
+    )
+    assert b"name,value\nfoo,1\n" == await response.get_data()
+    assert "text/csv" == response.headers["content-type"]
+    assert "attachment;filename=0.csv" == response.headers["content-disposition"]
+
+
+@pytest.mark.asyncio
+async def test_csv_copy_stopped_before_connection_released():
+    """
+    Test that if the CSV stops being read part way through, the copy is stopped before its connection is released.
+    """
+    events = []
+
+    class Connection:
+        async def copy_from_query(self, sql, output, format, header):
+            try:
+                for _ in range(100):
+                    await output(b"foo,1\n")
+            except asyncio.CancelledError:
+                events.append("cancelled")
+                raise
+
+    class Pool:
+        @asynccontextmanager
+        async def acquire(self):
+            try:
+                yield Connection()
+            finally:
+                events.append("released")
+
+    app = Quart(__name__)
+    app.pool = Pool()
+    async with app.app_context():
+        stream = stream_result_as_csv("SELECT 1")
+        assert b"foo,1\n" == await stream.__anext__()
+        await stream.aclose()
+    assert ["cancelled", "released"] == events
+
+
+@pytest.mark.asyncio
+async def test_get_query_as_arrow(app, dummy_zmq_server, access_token_builder):
+    """
+    Test that an Arrow IPC stream is returned when Arrow is accepted.
+    """
+    client, db, log_dir, app = app
+    Attribute = namedtuple("Attribute", ["name", "type"])
+    Type = namedtuple("Type", ["name"])
+    statement = Mock()
+    statement.get_attributes.return_value = (
+        Attribute("name", Type("text")),
+        Attribute("value", Type("numeric")),
+    )
+    cursor = Mock()
+    cursor.fetch = CoroutineMock(side_effect=([("foo", 1), ("bar", None)], []))
+    statement.cursor.return_value = async_return(cursor)
+    connection = db.acquire.return_value.__aenter__.return_value
+    connection.prepare = CoroutineMock(return_value=statement)
+    token = access_token_builder(
+        {
+            "modal_location": {
+                "permissions": {"get_result": True},
+                "spatial_aggregation": ["DUMMY_AGGREGATION"],
+            }
+        }
+    )
+
+    dummy_zmq_server.side_effect = (
+        {
+            "id": 0,
+            "query_kind": "modal_location",
+            "params": {"aggregation_unit": "DUMMY_AGGREGATION"},
+            "sql": "SELECT 1;",
+            "status": "done",
+        },
+    )
+    response = await client.get(
+        f"/api/0/get/0",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.apache.arrow.stream",
+        },
+    )
+    table = pa.ipc.open_stream(await response.get_data()).read_all()
+    assert {"name": ["foo", "bar"], "value": [1.0, None]} == table.to_pydict()
+    assert pa.float64() == table.schema.field("value").type
+    assert "attachment;filename=0.arrow" == response.headers["content-disposition"]
+
+
 @pytest.mark.parametrize(
     "status, http_code",
     [
@@ -73,9 +208,14 @@ async def test_get_json_status(
         }
     )
     dummy_zmq_server.side_effect = (
-        {"id": 0, "query_kind": "modal_location"},
-        {"id": 0, "params": {"aggregation_unit": "DUMMY_AGGREGATION"}},
-        {"status": status, "id": 0, "error": "Some error", "sql": "SELECT 1;"},
+        {
+            "id": 0,
+            "query_kind": "modal_location",
+            "params": {"aggregation_unit": "DUMMY_AGGREGATION"},
+            "status": status,
+            "error": "Some error",
+            "sql": "SELECT 1;",
+        },
     )
     response = await client.get(
         f"/api/0/get/0", headers={"Authorization": f"Bearer {token}"}
@@ -102,9 +242,11 @@ async def test_get_error_for_missing_status(
         }
     )
     dummy_zmq_server.side_effect = (
-        {"id": 0, "query_kind": "modal_location"},
-        {"id": 0, "params": {"aggregation_unit": "DUMMY_AGGREGATION"}},
-        {"id": 0},
+        {
+            "id": 0,
+            "query_kind": "modal_location",
+            "params": {"aggregation_unit": "DUMMY_AGGREGATION"},
+        },
     )
     response = await client.get(
         f"/api/0/get/0", headers={"Authorization": f"Bearer {token}"}
@@ -0,0 +1,234 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import datetime
+from json import loads
+
+import pytest
+from asynctest import CoroutineMock
+
+from app.pagination import RowCountCache, decode_cursor, encode_cursor, keyset_page_sql
+
+RESULT_INFO = {
+    "status": "done",
+    "table_name": "cache.x0",
+    "columns": ["date", "total"],
+    "key_column": "_row_number",
+}
+
+TOKEN_CLAIMS = {
+    "modal_location": {
+        "permissions": {"get_result": True},
+        "spatial_aggregation": ["DUMMY_AGGREGATION"],
+    }
+}
+
+
+def test_cursor_round_trip():
+    """
+    Test that a cursor decodes to the values it was made from, with dates as strings.
+    """
+    cursor = encode_cursor(["foo", 1, datetime.date(2016, 1, 1)])
+    assert ["foo", 1, "2016-01-01"] == decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("cursor", ["NOT_A_CURSOR", encode_cursor({"a": 1})])
+def test_bad_cursor(cursor):
+    """
+    Test that decoding something which isn't a cursor raises a ValueError.
+    """
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+def test_keyset_page_sql():
+    """
+    Test that the page sql orders by the row number, and fetches one extra row.
+    """
+    assert (
+        'SELECT "pcod", "_row_number" FROM cache.x1 ORDER BY "_row_number" LIMIT 3'
+        == keyset_page_sql("cache.x1", ["pcod"], "_row_number", 2)
+    )
+
+
+def test_keyset_page_sql_after():
+    """
+    Test that the page sql starts after the row number passed as a parameter.
+    """
+    assert (
+        'SELECT "a", "b", "_row_number" FROM cache.x1 WHERE "_row_number" > $1 '
+        'ORDER BY "_row_number" LIMIT 11'
+        == keyset_page_sql("cache.x1", ["a", "b"], "_row_number", 10, after=True)
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_query_pages(app, dummy_zmq_server, access_token_builder):
+    """
+    Test that a page of results is returned without the row numbers, with the
+    location of the next page, and that the next page starts after it.
+    """
+    client, db, log_dir, app = app
+    connection = db.acquire.return_value.__aenter__.return_value
+    connection.fetch = CoroutineMock(
+        side_effect=(
+            [
+                {"date": datetime.date(2016, 1, d), "total": d, "_row_number": d}
+                for d in (1, 2, 3)
+            ],
+            [{"date": datetime.date(2016, 1, 3), "total": 3, "_row_number": 3}],
+        )
+    )
+    token = access_token_builder(TOKEN_CLAIMS)
+    query_replies = (
+        {
+            "id": 0,
+            "query_kind": "modal_location",
+            "params": {"aggregation_unit": "DUMMY_AGGREGATION"},
+            "sql": "SELECT 1;",
+            "status": "done",
+        },
+        RESULT_INFO,
+    )
+    dummy_zmq_server.side_effect = query_replies * 2
+
+    response = await client.get(
+        f"/api/0/get/0?limit=2", headers={"Authorization": f"Bearer {token}"}
+    )
+    js = loads(await response.get_data())
+    assert 200 == response.status_code
+    assert [
+        {"date": "2016-01-01", "total": 1},
+        {"date": "2016-01-02", "total": 2},
+    ] == js["query_result"]
+    assert js["next"].startswith("/api/0/get/0?")
+
+    response = await client.get(
+        js["next"], headers={"Authorization": f"Bearer {token}"}
+    )
+    js = loads(await response.get_data())
+    assert [3] == [row["total"] for row in js["query_result"]]
+    assert js["next"] is None
+    sql, *args = connection.fetch.call_args[0]
+    assert '"_row_number" > $1' in sql
+    assert [2] == args
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        "limit=0",
+        "limit=ten",
+        "limit=1000001",
+        "after=NOT_A_CURSOR",
+        f"after={encode_cursor(['A'])}",
+    ],
+)
+@pytest.mark.asyncio
+async def test_get_query_page_bad_args(
+    args, app, dummy_zmq_server, access_token_builder
+):
+    """
+    Test that a bad page size or cursor gets a 400 response.
+    """
+    client, db, log_dir, app = app
+    connection = db.acquire.return_value.__aenter__.return_value
+    connection.fetch = CoroutineMock(return_value=[])
+    token = access_token_builder(TOKEN_CLAIMS)
+    dummy_zmq_server.side_effect = (
+        {
+            "id": 0,
+            "query_kind": "modal_location",
+            "params": {"aggregation_unit": "DUMMY_AGGREGATION"},
+            "sql": "SELECT 1;",
+            "status": "done",
+        },
+        RESULT_INFO,
+    )
+    response = await client.get(
+        f"/api/0/get/0?{args}", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert 400 == response.status_code
+
+
+@pytest.mark.parametrize(
+    "args, estimate, expected",
+    [
+        ("", 1000, {"count": 1000, "exact": False}),
+        ("", 0, {"count": 42, "exact": True}),
+        ("?exact=true", 1000, {"count": 42, "exact": True}),
+    ],
+)
+@pytest.mark.asyncio
+async def test_row_count(
+    args, estimate, expected, app, dummy_zmq_server, access_token_builder
+):
+    """
+    Test that the row count is estimated if there are table statistics, and counted otherwise or if asked.
+    """
+    client, db, log_dir, app = app
+    connection = db.acquire.return_value.__aenter__.return_value
+
+    async def fetchval(sql, *args):
+        return estimate if "reltuples" in sql else 42
+
+    connection.fetchval = fetchval
+    token = access_token_builder(TOKEN_CLAIMS)
+    dummy_zmq_server.side_effect = (
+        {
+            "id": 0,
+            "query_kind": "modal_location",
+            "params": {"aggregation_unit": "DUMMY_AGGREGATION"},
+            "status": "done",
+        },
+        RESULT_INFO,
+    )
+    response = await client.get(
+        f"/api/0/count/0{args}", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert 200 == response.status_code
+    assert {"query_id": "0", **expected} == await response.get_json()
+    if expected["exact"]:
+        assert 42 == app.row_counts.get("cache.x0")
+
+
+@pytest.mark.parametrize(
+    "status, http_code", [("running", 202), ("awol", 404), ("error", 403)]
+)
+@pytest.mark.asyncio
+async def test_row_count_status(
+    status, http_code, app, dummy_zmq_server, access_token_builder
+):
+    """
+    Test that the row count route gives the same status codes as getting the result.
+    """
+    client, db, log_dir, app = app
+    token = access_token_builder(TOKEN_CLAIMS)
+    dummy_zmq_server.side_effect = (
+        {
+            "id": 0,
+            "query_kind": "modal_location",
+            "params": {"aggregation_unit": "DUMMY_AGGREGATION"},
+            "status": "done",
+        },
+        {"status": status, "error": "Some error"},
+    )
+    response = await client.get(
+        f"/api/0/count/0", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert http_code == response.status_code
+
+
+def test_row_count_cache_forgets_least_recently_used():
+    """
+    Test that the row count cache holds at most max_size counts, forgetting the least recently used.
+    """
+    row_counts = RowCountCache(max_size=2)
+    row_counts.set("cache.x0", 0)
+    row_counts.set("cache.x1", 1)
+    row_counts.get("cache.x0")
+    row_counts.set("cache.x2", 2)
+    assert 2 == len(row_counts)
+    assert row_counts.get("cache.x1") is None
+    assert 0 == row_counts.get("cache.x0")
@@ -2,8 +2,14 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import asyncio
+import json
+
 import pytest
-from asynctest import return_once
+from asynctest import CoroutineMock, return_once
+
+from app.query_notifications import QUERY_STORED_CHANNEL
+from app.zmq_channel import ServerBusyError
 
 
 @pytest.mark.parametrize(
@@ -28,3 +34,86 @@ async def test_poll_query(
     assert response.status_code == http_code
     if status == "done":
         assert "/api/0/get/0" == response.headers["Location"]
+
+
+@pytest.mark.asyncio
+async def test_poll_query_server_busy(app, dummy_zmq_server, access_token_builder):
+    """
+    Test that 503 is returned when the FlowMachine server is too busy to answer.
+    """
+    client, db, log_dir, app = app
+
+    token = access_token_builder({"modal_location": {"permissions": {"poll": True}}})
+    dummy_zmq_server.side_effect = ServerBusyError("Server is busy.")
+    response = await client.get(
+        f"/api/0/poll/0", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 503
+    assert "1" == response.headers["Retry-After"]
+
+
+@pytest.mark.asyncio
+async def test_long_poll_returns_when_query_stored(
+    app, dummy_zmq_server, access_token_builder, monkeypatch
+):
+    """
+    Test that a long poll of a running query returns as soon as the query is stored.
+    """
+    client, db, log_dir, app = app
+    monkeypatch.setattr(app.query_listener, "start", CoroutineMock())
+    token = access_token_builder({"modal_location": {"permissions": {"poll": True}}})
+    dummy_zmq_server.side_effect = (
+        {"id": "0", "query_kind": "modal_location"},
+        {"id": "0", "status": "running"},
+        {"id": "0", "status": "done"},
+    )
+    asyncio.get_event_loop().call_later(
+        0.1,
+        app.query_listener._notified,
+        None,
+        0,
+        QUERY_STORED_CHANNEL,
+        json.dumps({"query_id": "0", "status": "done"}),
+    )
+    response = await client.get(
+        f"/api/0/poll/0?wait=30", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert 303 == response.status_code
+    assert 3 == dummy_zmq_server.call_count
+    assert {} == app.query_listener._waiters
+
+
+@pytest.mark.asyncio
+async def test_long_poll_times_out(
+    app, dummy_zmq_server, access_token_builder, monkeypatch
+):
+    """
+    Test that a long poll of a query which is still running after the wait gets a 202.
+    """
+    client, db, log_dir, app = app
+    monkeypatch.setattr(app.query_listener, "start", CoroutineMock())
+    token = access_token_builder({"modal_location": {"permissions": {"poll": True}}})
+    dummy_zmq_server.side_effect = return_once(
+        {"id": "0", "query_kind": "modal_location"},
+        then={"id": "0", "status": "running"},
+    )
+    response = await client.get(
+        f"/api/0/poll/0?wait=0.1", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert 202 == response.status_code
+    assert 2 == dummy_zmq_server.call_count
+    assert {} == app.query_listener._waiters
+
+
+@pytest.mark.asyncio
+async def test_long_poll_bad_wait(app, dummy_zmq_server, access_token_builder):
+    """
+    Test that a wait which isn't a number gets a 400.
+    """
+    client, db, log_dir, app = app
+    token = access_token_builder({"modal_location": {"permissions": {"poll": True}}})
+    dummy_zmq_server.return_value = {"id": "0", "query_kind": "modal_location"}
+    response = await client.get(
+        f"/api/0/poll/0?wait=soon", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert 400 == response.status_code
@@ -0,0 +1,96 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import pytest
+
+from app.query_metadata import QueryMetadataCache
+
+TOKEN_CLAIMS = {
+    "modal_location": {
+        "permissions": {"get_result": True, "poll": True},
+        "spatial_aggregation": ["DUMMY_AGGREGATION"],
+    }
+}
+
+METADATA = {
+    "id": "0",
+    "query_kind": "modal_location",
+    "params": {"aggregation_unit": "DUMMY_AGGREGATION"},
+}
+
+
+def test_cache_forgets_least_recently_used():
+    """
+    Test that the least recently used query is forgotten when the cache is full.
+    """
+    cache = QueryMetadataCache(max_size=2)
+    cache.set("0", "modal_location", {})
+    cache.set("1", "flows", {})
+    cache.get("0")
+    cache.set("2", "daily_location", {})
+    assert 2 == len(cache)
+    assert cache.get("1") is None
+    assert {"id": "0", "query_kind": "modal_location", "params": {}} == cache.get("0")
+
+
+def test_cache_entries_expire(monkeypatch):
+    """
+    Test that metadata is forgotten once it has been in the cache longer than the ttl.
+    """
+    now = 1000.0
+    monkeypatch.setattr("app.query_metadata.time.monotonic", lambda: now)
+    cache = QueryMetadataCache(ttl=10)
+    cache.set("0", "modal_location", {})
+    now += 5
+    assert cache.get("0") is not None
+    now += 10
+    assert cache.get("0") is None
+    assert 0 == len(cache)
+
+
+@pytest.mark.asyncio
+async def test_repeat_poll_uses_cached_metadata(
+    app, dummy_zmq_server, access_token_builder
+):
+    """
+    Test that polling a query a second time only needs to ask the server for its status.
+    """
+    client, db, log_dir, app = app
+    token = access_token_builder(TOKEN_CLAIMS)
+    dummy_zmq_server.side_effect = (
+        {**METADATA, "status": "running"},
+        {"id": "0", "status": "done"},
+    )
+    response = await client.get(
+        f"/api/0/poll/0", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert 202 == response.status_code
+    assert "get_query_metadata" == dummy_zmq_server.call_args[0][0]["action"]
+
+    response = await client.get(
+        f"/api/0/poll/0", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert 303 == response.status_code
+    assert 2 == dummy_zmq_server.call_count
+    assert "poll" == dummy_zmq_server.call_args[0][0]["action"]
+
+
+@pytest.mark.asyncio
+async def test_get_takes_one_request(app, dummy_zmq_server, access_token_builder):
+    """
+    Test that getting a query result asks the server for its metadata and sql in one request.
+    """
+    client, db, log_dir, app = app
+    db.acquire.return_value.__aenter__.return_value.cursor.return_value.__aiter__.return_value = [
+        {"some": "valid"}
+    ]
+    token = access_token_builder(TOKEN_CLAIMS)
+    dummy_zmq_server.return_value = {**METADATA, "status": "done", "sql": "SELECT 1;"}
+    response = await client.get(
+        f"/api/0/get/0", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert 200 == response.status_code
+    dummy_zmq_server.assert_called_once()
+    assert dummy_zmq_server.call_args[0][0]["include_sql"]
+    assert METADATA == app.query_metadata.get("0")
@@ -0,0 +1,102 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import asyncio
+import json
+
+import pytest
+import zmq
+from zmq.asyncio import Context
+
+from app.zmq_channel import ZMQChannel, ServerBusyError
+
+
+@pytest.fixture
+def reversing_server():
+    """
+    A fixture which provides a ROUTER socket, and a coroutine which answers
+    pairs of messages on it in the opposite order to that they arrived in,
+    echoing the action back.
+
+    Yields
+    ------
+    tuple of str, coroutine function
+        Address of the server, and the coroutine function to run it
+    """
+    socket = Context.instance().socket(zmq.ROUTER)
+    port = socket.bind_to_random_port("tcp://127.0.0.1")
+
+    async def serve():
+        while True:
+            first = await socket.recv_multipart()
+            second = await socket.recv_multipart()
+            for *envelope, msg in (second, first):
+                action = json.loads(msg)["action"]
+                reply = {"action": action}
+                if action == "busy":
+                    reply["status"] = "busy"
+                await socket.send_multipart([*envelope, json.dumps(reply).encode()])
+
+    yield f"tcp://127.0.0.1:{port}", serve
+    socket.close(linger=0)
+
+
+@pytest.mark.asyncio
+async def test_replies_matched_to_requests(reversing_server):
+    """
+    Test that concurrent requests over the channel each get their own reply,
+    whatever order the replies arrive in.
+    """
+    address, serve = reversing_server
+    server = asyncio.ensure_future(serve())
+    channel = ZMQChannel(address)
+    replies = await asyncio.gather(
+        channel.request({"request_id": "DUMMY_ID", "action": "first"}),
+        channel.request({"request_id": "DUMMY_ID", "action": "second"}),
+    )
+    assert [{"action": "first"}, {"action": "second"}] == replies
+    replies = await asyncio.gather(
+        channel.request({"request_id": "DUMMY_ID", "action": "third"}),
+        channel.request({"request_id": "DUMMY_ID", "action": "fourth"}),
+    )
+    assert [{"action": "third"}, {"action": "fourth"}] == replies
+    channel.close()
+    server.cancel()
+
+
+@pytest.mark.asyncio
+async def test_close_fails_waiting_requests(reversing_server):
+    """
+    Test that closing the channel fails requests still waiting for a reply.
+    """
+    address, serve = reversing_server
+    server = asyncio.ensure_future(serve())
+    channel = ZMQChannel(address)
+    waiting = asyncio.ensure_future(
+        channel.request({"request_id": "DUMMY_ID", "action": "lonely"})
+    )
+    await asyncio.sleep(0.1)
+    channel.close()
+    server.cancel()
+    with pytest.raises(ConnectionError):
+        await waiting
+
+
+@pytest.mark.asyncio
+async def test_busy_reply_raises(reversing_server):
+    """
+    Test that a busy reply from the server raises an error for that request only.
+    """
+    address, serve = reversing_server
+    server = asyncio.ensure_future(serve())
+    channel = ZMQChannel(address)
+    busy, not_busy = await asyncio.gather(
+        channel.request({"request_id": "DUMMY_ID", "action": "busy"}),
+        channel.request({"request_id": "DUMMY_ID", "action": "not_busy"}),
+        return_exceptions=True,
+    )
+    assert isinstance(busy, ServerBusyError)
+    assert {"action": "not_busy"} == not_busy
+    channel.close()
+    server.cancel()
@@ -24,8 +24,13 @@ from .client import (
     get_geography,
     get_result,
     get_result_by_query_id,
+    get_result_page,
+    get_results,
+    get_row_count,
     get_status,
+    poll_queries,
     query_is_ready,
+    run_queries,
     run_query,
 )
 
@@ -43,7 +48,12 @@ __all__ = [
     "get_geography",
     "get_result",
     "get_result_by_query_id",
+    "get_result_page",
+    "get_results",
+    "get_row_count",
     "get_status",
+    "poll_queries",
     "query_is_ready",
+    "run_queries",
     "run_query",
 ]
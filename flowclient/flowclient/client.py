@@ -11,10 +11,24 @@ import pandas as pd
 import requests
 import time
 from requests import ConnectionError
-from typing import Tuple, Union, Dict, List
+from typing import Tuple, Union, Dict, List, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
 
 logger = logging.getLogger(__name__)
 
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+    logger.debug("pyarrow not found. Results cannot be retrieved in Arrow format.")
+
+# Mimetypes to request query results in each format
+RESULT_FORMATS = {
+    "json": "application/json",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
 
 class FlowclientConnectionError(Exception):
     """
@@ -80,7 +94,12 @@ class Connection:
             self.session.verify = ssl_certificate
         self.session.headers["Authorization"] = f"Bearer {self.token}"
 
-    def get_url(self, route: str) -> requests.Response:
+    def get_url(
+        self,
+        route: str,
+        headers: Union[Dict[str, str], None] = None,
+        stream: bool = False,
+    ) -> requests.Response:
         """
         Attempt to get something from the API, and return the raw
         response object if an error response wasn't received.
@@ -90,6 +109,10 @@ class Connection:
         ----------
         route : str
             Path relative to API host to get
+        headers : dict, optional
+            Additional headers to send with the request
+        stream : bool, default False
+            If True, don't download the response body until it is accessed
 
         Returns
         -------
@@ -99,7 +122,10 @@ class Connection:
         logger.debug(f"Getting {self.url}/api/{self.api_version}/{route}")
         try:
             response = self.session.get(
-                f"{self.url}/api/{self.api_version}/{route}", allow_redirects=False
+                f"{self.url}/api/{self.api_version}/{route}",
+                allow_redirects=False,
+                headers=headers,
+                stream=stream,
             )
         except ConnectionError as e:
             error_msg = f"Unable to connect to FlowKit API at {self.url}: {e}"
@@ -153,7 +179,7 @@ class Connection:
             error_msg = f"Unable to connect to FlowKit API at {self.url}: {e}"
             logger.info(error_msg)
             raise FlowclientConnectionError(error_msg)
-        if response.status_code == 202:
+        if response.status_code in {200, 202}:
             return response
         elif response.status_code == 404:
             raise FileNotFoundError(
@@ -201,7 +227,7 @@ def connect(
 
 
 def query_is_ready(
-    connection: Connection, query_id: str
+    connection: Connection, query_id: str, wait: float = 0
 ) -> Tuple[bool, requests.Response]:
     """
     Check if a query id has results available.
@@ -212,6 +238,9 @@ def query_is_ready(
         API connection  to use
     query_id : str
         Identifier of the query to retrieve
+    wait : float, default 0
+        If the query is still running, ask the server to wait up to this
+        many seconds (at most 60) for it to finish before replying.
 
     Returns
     -------
@@ -222,7 +251,10 @@ def query_is_ready(
     logger.info(
         f"Polling server on {connection.url}/api/{connection.api_version}/poll/{query_id}"
     )
-    reply = connection.get_url(f"poll/{query_id}")
+    if wait > 0:
+        reply = connection.get_url(f"poll/{query_id}?wait={wait}")
+    else:
+        reply = connection.get_url(f"poll/{query_id}")
 
     if reply.status_code == 303:
         logger.info(
@@ -261,7 +293,9 @@ def get_status(connection: Connection, query_id: str) -> str:
         return "Running"
 
 
-def get_result_by_query_id(connection: Connection, query_id: str) -> pd.DataFrame:
+def get_result_by_query_id(
+    connection: Connection, query_id: str, result_format: str = "json", wait: float = 30
+) -> pd.DataFrame:
     """
     Get a query by id, and return it as a dataframe
 
@@ -271,6 +305,13 @@ def get_result_by_query_id(connection: Connection, query_id: str) -> pd.DataFram
         API connection  to use
     query_id : str
         Identifier of the query to retrieve
+    result_format : {"json", "csv", "arrow"}, default "json"
+        Format to download the result in. "csv" and "arrow" are much faster
+        for large results; "arrow" also keeps column types, and requires pyarrow.
+    wait : float, default 30
+        Seconds for the server to wait for the query to finish each time it
+        is polled, so that the result is fetched as soon as it is ready
+        without polling repeatedly. Set to 0 to poll once a second instead.
 
     Returns
     -------
@@ -278,20 +319,65 @@ def get_result_by_query_id(connection: Connection, query_id: str) -> pd.DataFram
         Dataframe containing the result
 
     """
-    query_ready, reply = query_is_ready(connection, query_id)  # Poll the server
+    start = time.monotonic()
+    query_ready, reply = query_is_ready(connection, query_id, wait)  # Poll the server
     while not query_ready:
-        logger.info("Waiting before polling again.")
-        time.sleep(1)  # Wait a second, then check if the query is ready again
-        query_ready, reply = query_is_ready(connection, query_id)  # Poll the server
+        # Servers which don't wait reply at once, so never poll more than once a second
+        time.sleep(max(0, 1 - (time.monotonic() - start)))
+        logger.info("Polling again.")
+        start = time.monotonic()
+        query_ready, reply = query_is_ready(connection, query_id, wait)
 
-    logger.info(f"Getting {connection.url}/api/{connection.api_version}/get/{query_id}")
     result_location = reply.headers[
         "Location"
     ]  # Need to strip off the /api/<api_version>/
+    return _get_result_by_location(connection, query_id, result_location, result_format)
+
+
+def _get_result_by_location(
+    connection: Connection,
+    query_id: str,
+    result_location: str,
+    result_format: str = "json",
+) -> pd.DataFrame:
+    """
+    Get the result of a finished query, and return it as a dataframe
+
+    Parameters
+    ----------
+    connection : Connection
+        API connection  to use
+    query_id : str
+        Identifier of the query to retrieve
+    result_location : str
+        Location of the result, as given by the API
+    result_format : {"json", "csv", "arrow"}, default "json"
+        Format to download the result in
+
+    Returns
+    -------
+    pandas.DataFrame
+        Dataframe containing the result
+
+    """
+    if result_format not in RESULT_FORMATS:
+        raise ValueError(
+            f"Unknown result format '{result_format}'. Must be one of {list(RESULT_FORMATS)}."
+        )
+    if result_format == "arrow" and pyarrow is None:
+        raise ImportError("pyarrow is needed to get results in Arrow format.")
+    logger.info(f"Getting {connection.url}/api/{connection.api_version}/get/{query_id}")
     result_location = re.sub(
         "^/api/[0-9]+/", "", result_location
     )  # strip off the /api/<api_version>/
-    response = connection.get_url(result_location)
+    if result_format == "json":
+        response = connection.get_url(result_location)
+    else:
+        response = connection.get_url(
+            result_location,
+            headers={"Accept": RESULT_FORMATS[result_format]},
+            stream=True,
+        )
     if response.status_code != 200:
         try:
             msg = response.json()["msg"]
@@ -301,12 +387,20 @@ def get_result_by_query_id(connection: Connection, query_id: str) -> pd.DataFram
         raise FlowclientConnectionError(
             f"Could not get result. API returned with status code: {response.status_code}.{more_info}"
         )
-    result = response.json()
     logger.info(f"Got {connection.url}/api/{connection.api_version}/{query_id}")
-    return pd.DataFrame.from_records(result["query_result"])
+    if result_format == "json":
+        return pd.DataFrame.from_records(response.json()["query_result"])
+    # Decode the body as it arrives, rather than holding all of it in memory
+    response.raw.decode_content = True
+    if result_format == "csv":
+        return pd.read_csv(response.raw)
+    else:
+        return pyarrow.ipc.open_stream(response.raw).read_pandas()
 
 
-def get_result(connection: Connection, query: dict) -> pd.DataFrame:
+def get_result(
+    connection: Connection, query: dict, result_format: str = "json", wait: float = 30
+) -> pd.DataFrame:
     """
     Run and retrieve a query of a specified kind with parameters.
 
@@ -316,6 +410,11 @@ def get_result(connection: Connection, query: dict) -> pd.DataFrame:
         API connection to use
     query : dict
         A query specification to run, e.g. `{'kind':'daily_location', 'params':{'date':'2016-01-01'}}`
+    result_format : {"json", "csv", "arrow"}, default "json"
+        Format to download the result in (see `get_result_by_query_id`)
+    wait : float, default 30
+        Seconds for the server to wait for the query to finish each time it
+        is polled (see `get_result_by_query_id`)
 
     Returns
     -------
@@ -323,10 +422,14 @@ def get_result(connection: Connection, query: dict) -> pd.DataFrame:
        Pandas dataframe containing the results
 
     """
-    return get_result_by_query_id(connection, run_query(connection, query))
+    return get_result_by_query_id(
+        connection, run_query(connection, query), result_format, wait
+    )
 
 
-def get_geography(connection: Connection, aggregation_unit: str) -> dict:
+def get_geography(
+    connection: Connection, aggregation_unit: str, simplify: Optional[str] = None
+) -> dict:
     """
     Get geography data from the database.
 
@@ -336,6 +439,9 @@ def get_geography(connection: Connection, aggregation_unit: str) -> dict:
         API connection to use
     aggregation_unit : str
         aggregation unit, e.g. 'admin3'
+    simplify : {None, 'full', 'high', 'medium', 'low'}
+        Optionally get boundaries simplified to a lower level of detail,
+        which are much quicker to download and draw than the full boundaries.
     
     Returns
     -------
@@ -343,10 +449,11 @@ def get_geography(connection: Connection, aggregation_unit: str) -> dict:
         geography data as a GeoJSON FeatureCollection
     
     """
-    logger.info(
-        f"Getting {connection.url}/api/{connection.api_version}/geography/{aggregation_unit}"
-    )
-    response = connection.get_url(f"geography/{aggregation_unit}")
+    route = f"geography/{aggregation_unit}"
+    if simplify is not None:
+        route = f"{route}?simplify={simplify}"
+    logger.info(f"Getting {connection.url}/api/{connection.api_version}/{route}")
+    response = connection.get_url(route)
     if response.status_code != 200:
         try:
             msg = response.json()["msg"]
@@ -399,6 +506,207 @@ def run_query(connection: Connection, query: dict) -> str:
         )
 
 
+def run_queries(connection: Connection, queries: List[dict]) -> List[str]:
+    """
+    Run several queries in one request, and get the identifiers for them.
+
+    Parameters
+    ----------
+    connection : Connection
+        API connection to use
+    queries : list of dict
+        Queries to run
+
+    Returns
+    -------
+    list of str
+        Identifiers of the queries, in the same order as the queries
+
+    Raises
+    ------
+    FlowclientConnectionError
+        If any of the queries could not be run. Any others will still be run.
+    """
+    logger.info(
+        f"Requesting run of {len(queries)} queries at {connection.url}/api/{connection.api_version}"
+    )
+    r = connection.post_json(route="run_batch", data={"queries": queries})
+    results = r.json()["queries"]
+    errors = [
+        f"{query}: {result.get('msg', 'Unknown error.')}"
+        for query, result in zip(queries, results)
+        if result["status"] != "accepted"
+    ]
+    if len(errors) > 0:
+        raise FlowclientConnectionError(
+            f"Error running {len(errors)} of {len(queries)} queries. {'; '.join(errors)}"
+        )
+    return [result["query_id"] for result in results]
+
+
+def poll_queries(connection: Connection, query_ids: List[str]) -> Dict[str, str]:
+    """
+    Check the status of several queries in one request.
+
+    Parameters
+    ----------
+    connection : Connection
+        API connection to use
+    query_ids : list of str
+        Identifiers of the queries to check
+
+    Returns
+    -------
+    dict
+        Mapping from query id to status, e.g. "done" or "running"
+    """
+    logger.info(
+        f"Polling {len(query_ids)} queries on {connection.url}/api/{connection.api_version}/poll_batch"
+    )
+    r = connection.post_json(route="poll_batch", data={"query_ids": list(query_ids)})
+    return {result["query_id"]: result["status"] for result in r.json()["queries"]}
+
+
+def get_results(
+    connection: Connection,
+    query_ids: List[str],
+    poll_interval: float = 0.5,
+    max_poll_interval: float = 30,
+    result_format: str = "json",
+) -> List[pd.DataFrame]:
+    """
+    Wait for several queries to finish, and return their results as dataframes.
+
+    All the queries still running are polled in a single request, and the
+    wait between polls doubles each time, up to `max_poll_interval`.
+
+    Parameters
+    ----------
+    connection : Connection
+        API connection to use
+    query_ids : list of str
+        Identifiers of the queries to retrieve
+    poll_interval : float, default 0.5
+        Seconds to wait before polling again the first time
+    max_poll_interval : float, default 30
+        Longest wait between polls, in seconds
+    result_format : {"json", "csv", "arrow"}, default "json"
+        Format to download the results in (see `get_result_by_query_id`)
+
+    Returns
+    -------
+    list of pandas.DataFrame
+        Dataframes containing the results, in the same order as the query ids
+
+    Raises
+    ------
+    FlowclientConnectionError
+        If any of the queries is neither finished nor running
+    """
+    pending = set(query_ids)
+    while True:
+        statuses = poll_queries(connection, sorted(pending))
+        for query_id, status in statuses.items():
+            if status == "done":
+                pending.discard(query_id)
+            elif status != "running":
+                raise FlowclientConnectionError(
+                    f"Could not get result of query {query_id}. Status: {status}"
+                )
+        if len(pending) == 0:
+            break
+        logger.info(
+            f"{len(pending)} queries still running. Waiting {poll_interval}s before polling again."
+        )
+        time.sleep(poll_interval)
+        poll_interval = min(poll_interval * 2, max_poll_interval)
+    return [
+        _get_result_by_location(connection, query_id, f"get/{query_id}", result_format)
+        for query_id in query_ids
+    ]
+
+
+def get_result_page(
+    connection: Connection, query_id: str, limit: int, after: Optional[str] = None
+) -> Tuple[pd.DataFrame, Optional[str]]:
+    """
+    Get one page of a finished query's result.
+
+    Pages are ordered by the result's key columns, and each page after the
+    first is fetched by passing the cursor returned with the one before, so
+    a large result can be downloaded in pieces and resumed from the last
+    page retrieved.
+
+    Parameters
+    ----------
+    connection : Connection
+        API connection to use
+    query_id : str
+        Identifier of the query to retrieve
+    limit : int
+        Number of rows in the page
+    after : str, optional
+        Cursor returned with the previous page. If not given, the first page
+        is returned.
+
+    Returns
+    -------
+    pandas.DataFrame, str or None
+        Dataframe containing the page of the result, and the cursor for the
+        next page, or None if this is the last page
+
+    Examples
+    --------
+    >>> pages = []
+    >>> df, cursor = get_result_page(conn, query_id, limit=10000)
+    >>> while cursor is not None:
+    ...     pages.append(df)
+    ...     df, cursor = get_result_page(conn, query_id, limit=10000, after=cursor)
+    """
+    args = {"limit": limit}
+    if after is not None:
+        args["after"] = after
+    response = connection.get_url(f"get/{query_id}?{urlencode(args)}")
+    if response.status_code != 200:
+        raise FlowclientConnectionError(
+            f"Could not get result. API returned with status code: {response.status_code}."
+        )
+    page = response.json()
+    next_cursor = None
+    if page["next"] is not None:
+        next_cursor = parse_qs(urlparse(page["next"]).query)["after"][0]
+    return pd.DataFrame.from_records(page["query_result"]), next_cursor
+
+
+def get_row_count(connection: Connection, query_id: str, exact: bool = False) -> int:
+    """
+    Get the number of rows in a finished query's result.
+
+    Parameters
+    ----------
+    connection : Connection
+        API connection to use
+    query_id : str
+        Identifier of the query
+    exact : bool, default False
+        If False, FlowAPI may answer with the database's estimate, which
+        is much quicker for large results. If True, the rows are counted.
+
+    Returns
+    -------
+    int
+        Number of rows
+    """
+    response = connection.get_url(
+        f"count/{query_id}" + ("?exact=true" if exact else "")
+    )
+    if response.status_code != 200:
+        raise FlowclientConnectionError(
+            f"Could not get row count. API returned with status code: {response.status_code}."
+        )
+    return response.json()["count"]
+
+
 def location_event_counts(
     start_date: str,
     end_date: str,
@@ -407,6 +715,7 @@ def location_event_counts(
     direction: str = "all",
     event_types: Union[str, List[str]] = "all",
     subscriber_subset: Union[dict, None] = None,
+    incremental: bool = False,
 ) -> dict:
     """
     Return query spec for a location event counts query aggregated spatially and temporally.
@@ -429,6 +738,10 @@ def location_event_counts(
         Subset of subscribers to include in event counts. Must be None
         (= all subscribers) or a dictionary with the specification of a
         subset query.
+    incremental : bool, default False
+        If True, FlowMachine stores the result for each day separately and
+        builds the result from them, so running the query again over a
+        longer range only computes the new days.
 
     Returns
     -------
@@ -437,18 +750,18 @@ def location_event_counts(
     """
     if subscriber_subset is None:
         subscriber_subset = "all"
-    return {
-        "query_kind": "location_event_counts",
-        "params": {
-            "start_date": start_date,
-            "end_date": end_date,
-            "interval": count_interval,
-            "aggregation_unit": aggregation_unit,
-            "direction": direction,
-            "event_types": event_types,
-            "subscriber_subset": subscriber_subset,
-        },
+    params = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "interval": count_interval,
+        "aggregation_unit": aggregation_unit,
+        "direction": direction,
+        "event_types": event_types,
+        "subscriber_subset": subscriber_subset,
     }
+    if incremental:
+        params["incremental"] = True
+    return {"query_kind": "location_event_counts", "params": params}
 
 
 def daily_location(
@@ -921,7 +1234,9 @@ def meaningful_locations_between_dates_od_matrix(
 
 
 def modal_location(
-    *daily_locations: Dict[str, Union[str, Dict[str, str]]], aggregation_unit: str
+    *daily_locations: Dict[str, Union[str, Dict[str, str]]],
+    aggregation_unit: str,
+    incremental: bool = False,
 ) -> dict:
     """
     Return query spec for a modal location query for a list of daily locations.
@@ -932,6 +1247,10 @@ def modal_location(
         List of daily location query specifications
     aggregation_unit : str
         Unit of aggregation, e.g. "admin3"
+    incremental : bool, default False
+        If True, FlowMachine stores the result for each day separately and
+        builds the result from them, so running the query again over a
+        longer range only computes the new days.
 
     Returns
     -------
@@ -939,10 +1258,10 @@ def modal_location(
         Dict which functions as the query specification for the modal location
 
     """
-    return {
-        "query_kind": "modal_location",
-        "params": {"locations": daily_locations, "aggregation_unit": aggregation_unit},
-    }
+    params = {"locations": daily_locations, "aggregation_unit": aggregation_unit}
+    if incremental:
+        params["incremental"] = True
+    return {"query_kind": "modal_location", "params": params}
 
 
 def modal_location_from_dates(
@@ -951,6 +1270,7 @@ def modal_location_from_dates(
     aggregation_unit: str,
     daily_location_method: str,
     subscriber_subset: Union[dict, None] = None,
+    incremental: bool = False,
 ) -> dict:
     """
     Return query spec for a modal location query for an (inclusive) date range and unit of aggregation.
@@ -969,6 +1289,10 @@ def modal_location_from_dates(
         Subset of subscribers to retrieve modal locations for. Must be None
         (= all subscribers) or a dictionary with the specification of a
         subset query.
+    incremental : bool, default False
+        If True, FlowMachine stores the result for each day separately and
+        builds the result from them, so running the query again over a
+        longer range only computes the new days.
 
     Returns
     -------
@@ -988,7 +1312,9 @@ def modal_location_from_dates(
         )
         for date in dates
     ]
-    return modal_location(*daily_locations, aggregation_unit=aggregation_unit)
+    return modal_location(
+        *daily_locations, aggregation_unit=aggregation_unit, incremental=incremental
+    )
 
 
 def flows(
@@ -39,7 +39,7 @@ setup(
     packages=["flowclient"],
     include_package_data=True,
     install_requires=["pandas", "requests", "pyjwt", "ujson"],
-    extras_require={"test": test_requirements},
+    extras_require={"test": test_requirements, "arrow": ["pyarrow"]},
     tests_require=test_requirements,
     setup_requires=["pytest-runner"],
     platforms=["MacOS X", "Linux"],
@@ -0,0 +1,77 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from unittest.mock import Mock
+
+import pytest
+
+import flowclient
+from flowclient.client import FlowclientConnectionError
+
+
+def test_run_queries():
+    """ Test that query ids are returned in the order of the queries. """
+    con_mock = Mock()
+    con_mock.post_json.return_value.json.return_value = {
+        "queries": [
+            {"status": "accepted", "query_id": "a"},
+            {"status": "accepted", "query_id": "b"},
+        ]
+    }
+    queries = [{"query_kind": "foo"}, {"query_kind": "bar"}]
+    assert ["a", "b"] == flowclient.run_queries(con_mock, queries)
+    con_mock.post_json.assert_called_once_with(
+        route="run_batch", data={"queries": queries}
+    )
+
+
+def test_run_queries_error():
+    """ Test that an error is raised if any query can't be run. """
+    con_mock = Mock()
+    con_mock.post_json.return_value.json.return_value = {
+        "queries": [
+            {"status": "accepted", "query_id": "a"},
+            {"status": "Error", "msg": "DUMMY_ERROR"},
+        ]
+    }
+    with pytest.raises(FlowclientConnectionError, match="DUMMY_ERROR"):
+        flowclient.run_queries(con_mock, [{"query_kind": "foo"}, {"query_kind": "bar"}])
+
+
+def test_get_results_backs_off(monkeypatch):
+    """ Test that only unfinished queries are polled, with doubling waits between polls. """
+    sleeps = []
+    monkeypatch.setattr("time.sleep", sleeps.append)
+    con_mock = Mock()
+    con_mock.post_json.return_value.json.side_effect = [
+        {
+            "queries": [
+                {"query_id": "a", "status": "running"},
+                {"query_id": "b", "status": "done"},
+            ]
+        },
+        {"queries": [{"query_id": "a", "status": "running"}]},
+        {"queries": [{"query_id": "a", "status": "done"}]},
+    ]
+    con_mock.get_url.return_value.status_code = 200
+    con_mock.get_url.return_value.json.return_value = {
+        "query_result": [{"name": "foo"}]
+    }
+    results = flowclient.get_results(con_mock, ["a", "b"], poll_interval=1)
+    assert [1, 2] == sleeps
+    assert ["a"] == con_mock.post_json.call_args[1]["data"]["query_ids"]
+    assert 2 == len(results)
+    assert ["foo"] == results[0].name.tolist()
+    con_mock.get_url.assert_any_call("get/a")
+    con_mock.get_url.assert_any_call("get/b")
+
+
+def test_get_results_raises_for_missing_query(monkeypatch):
+    """ Test that an error is raised if a query is neither done nor running. """
+    con_mock = Mock()
+    con_mock.post_json.return_value.json.return_value = {
+        "queries": [{"query_id": "a", "status": "awol"}]
+    }
+    with pytest.raises(FlowclientConnectionError, match="Status: awol"):
+        flowclient.get_results(con_mock, ["a"])
@@ -47,3 +47,16 @@ def test_get_geography_no_msg_error(token):
         match=f"Could not get result. API returned with status code: 404.",
     ):
         get_geography(connection_mock, "DUMMY_AGGREGATION")
+
+
+def test_get_geography_simplified(token):
+    """
+    Test that a level of detail is asked for if given.
+    """
+    connection_mock = Mock()
+    connection_mock.get_url.return_value.status_code = 200
+    connection_mock.get_url.return_value.json.return_value = {"some": "json"}
+    get_geography(connection_mock, "DUMMY_AGGREGATION", simplify="low")
+    connection_mock.get_url.assert_called_once_with(
+        "geography/DUMMY_AGGREGATION?simplify=low"
+    )
@@ -7,7 +7,7 @@ import flowclient
 from flowclient.client import FlowclientConnectionError
 
 
-@pytest.mark.parametrize("status_code", [202])
+@pytest.mark.parametrize("status_code", [200, 202])
 def test_post_json_good_statuses(status_code, session_mock, token):
     """response object should be returned for OK status codes.."""
     session_mock.post.return_value.status_code = status_code
@@ -2,8 +2,10 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import io
 from unittest.mock import Mock, PropertyMock, MagicMock, call
 
+import pandas as pd
 import pytest
 import flowclient
 import flowclient.client
@@ -29,7 +31,7 @@ def test_get_result_by_params(monkeypatch, token):
         connection_mock, {"query_kind": "query_type", "params": {"param": "value"}}
     )
     # Should request the query by id
-    dummy_method.assert_called_with(connection_mock, "99")
+    dummy_method.assert_called_with(connection_mock, "99", "json", 30)
 
 
 def test_get_result_by_id(token):
@@ -49,7 +51,7 @@ def test_get_result_by_id(token):
     df = get_result_by_query_id(connection_mock, "99")
 
     # Query id should be requested
-    assert call("poll/99") in connection_mock.get_url.call_args_list
+    assert call("poll/99?wait=30") in connection_mock.get_url.call_args_list
 
     # Query json should be requested
     assert call("foo/Test") in connection_mock.get_url.call_args_list
@@ -58,6 +60,72 @@ def test_get_result_by_id(token):
     assert "foo" == df.name[0]
 
 
+def _result_response(connection_mock, body):
+    """
+    Set up the connection mock to report the query ready at once, and return body as the result.
+    """
+    type(connection_mock.get_url.return_value).status_code = PropertyMock(
+        side_effect=(303, 200)
+    )
+    connection_mock.get_url.return_value.headers = {"Location": "/api/0/foo/Test"}
+    connection_mock.get_url.return_value.raw = io.BytesIO(body)
+
+
+def test_get_result_by_id_as_csv(token):
+    """
+    Test that a result requested as csv is asked for with the right Accept header and decoded.
+    """
+    connection_mock = Mock()
+    _result_response(connection_mock, b"name,value\nfoo,1.5\n")
+
+    df = get_result_by_query_id(connection_mock, "99", result_format="csv")
+
+    assert (
+        call("foo/Test", headers={"Accept": "text/csv"}, stream=True)
+        in connection_mock.get_url.call_args_list
+    )
+    assert ["foo"] == df.name.tolist()
+    assert [1.5] == df.value.tolist()
+
+
+def test_get_result_by_id_as_arrow(token):
+    """
+    Test that a result requested as Arrow is asked for with the right Accept header and decoded.
+    """
+    pa = pytest.importorskip("pyarrow")
+    table = pa.Table.from_pandas(
+        pd.DataFrame({"name": ["foo"], "value": [1.5]}), preserve_index=False
+    )
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    connection_mock = Mock()
+    _result_response(connection_mock, sink.getvalue())
+
+    df = get_result_by_query_id(connection_mock, "99", result_format="arrow")
+
+    assert (
+        call(
+            "foo/Test",
+            headers={"Accept": "application/vnd.apache.arrow.stream"},
+            stream=True,
+        )
+        in connection_mock.get_url.call_args_list
+    )
+    assert ["foo"] == df.name.tolist()
+    assert [1.5] == df.value.tolist()
+
+
+def test_get_result_by_id_unknown_format(token):
+    """
+    Test that asking for an unknown result format raises an error.
+    """
+    connection_mock = Mock()
+    _result_response(connection_mock, b"")
+    with pytest.raises(ValueError, match="Unknown result format 'xml'"):
+        get_result_by_query_id(connection_mock, "99", result_format="xml")
+
+
 @pytest.mark.parametrize("http_code", [401, 404, 418, 400])
 def test_get_result_by_id_error(monkeypatch, http_code, token):
     """
@@ -68,7 +136,7 @@ def test_get_result_by_id_error(monkeypatch, http_code, token):
     monkeypatch.setattr(
         flowclient.client,
         "query_is_ready",
-        lambda connection, query_id: (True, dummy_reply),
+        lambda connection, query_id, wait: (True, dummy_reply),
     )
     connection_mock = Mock()
     connection_mock.get_url.return_value.status_code = http_code
@@ -83,11 +151,31 @@ def test_get_result_by_id_error(monkeypatch, http_code, token):
 
 def test_get_result_by_id_poll_loop(monkeypatch):
     """
-    Test requesting a query polls.
+    Test requesting a query polls, no more than once a second.
     """
+    sleeps = []
+    monkeypatch.setattr("time.sleep", sleeps.append)
     ready_mock = Mock(side_effect=[(False, None), StopIteration])
     monkeypatch.setattr("flowclient.client.query_is_ready", ready_mock)
     with pytest.raises(StopIteration):
         get_result_by_query_id("placeholder", "99")
 
     assert 2 == ready_mock.call_count
+    assert 1 == len(sleeps)
+    assert 0 < sleeps[0] <= 1
+
+
+def test_get_result_by_id_without_waiting(monkeypatch):
+    """
+    Test that the server is asked to wait for the query only if a wait is given.
+    """
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    connection_mock = Mock()
+    connection_mock.get_url.return_value.status_code = 202
+    connection_mock.get_url.side_effect = [
+        connection_mock.get_url.return_value,
+        StopIteration,
+    ]
+    with pytest.raises(StopIteration):
+        get_result_by_query_id(connection_mock, "99", wait=0)
+    assert [call("poll/99"), call("poll/99")] == connection_mock.get_url.call_args_list
@@ -24,3 +24,12 @@ def test_query_ready_raises():
     con_mock.get_url.return_value = Mock(status_code=999)
     with pytest.raises(FlowclientConnectionError):
         query_is_ready(con_mock, "foo")
+
+
+def test_query_ready_long_poll():
+    """ Test that the server is asked to wait for the query when a wait is given. """
+    con_mock = Mock()
+    con_mock.get_url.return_value = Mock(status_code=303)
+    is_ready, reply = query_is_ready(con_mock, "foo", wait=10)
+    assert is_ready
+    con_mock.get_url.assert_called_once_with("poll/foo?wait=10")
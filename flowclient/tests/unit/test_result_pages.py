@@ -0,0 +1,66 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from unittest.mock import Mock
+
+import pytest
+
+import flowclient
+from flowclient.client import FlowclientConnectionError
+
+
+def test_get_result_page():
+    """ Test that a page is returned as a dataframe, with the cursor for the next page. """
+    con_mock = Mock()
+    con_mock.get_url.return_value.status_code = 200
+    con_mock.get_url.return_value.json.return_value = {
+        "query_id": "a",
+        "query_result": [{"pcod": "foo", "total": 1}],
+        "next": "/api/0/get/a?limit=1&after=DUMMY_CURSOR",
+    }
+    df, cursor = flowclient.get_result_page(con_mock, "a", limit=1, after="PREVIOUS")
+    con_mock.get_url.assert_called_once_with("get/a?limit=1&after=PREVIOUS")
+    assert ["foo"] == df.pcod.tolist()
+    assert "DUMMY_CURSOR" == cursor
+
+
+def test_get_last_result_page():
+    """ Test that no cursor is returned with the last page. """
+    con_mock = Mock()
+    con_mock.get_url.return_value.status_code = 200
+    con_mock.get_url.return_value.json.return_value = {
+        "query_id": "a",
+        "query_result": [],
+        "next": None,
+    }
+    df, cursor = flowclient.get_result_page(con_mock, "a", limit=1)
+    con_mock.get_url.assert_called_once_with("get/a?limit=1")
+    assert cursor is None
+
+
+@pytest.mark.parametrize(
+    "exact, route", [(False, "count/a"), (True, "count/a?exact=true")]
+)
+def test_get_row_count(exact, route):
+    """ Test that the row count is requested, and returned. """
+    con_mock = Mock()
+    con_mock.get_url.return_value.status_code = 200
+    con_mock.get_url.return_value.json.return_value = {
+        "query_id": "a",
+        "count": 10,
+        "exact": exact,
+    }
+    assert 10 == flowclient.get_row_count(con_mock, "a", exact=exact)
+    con_mock.get_url.assert_called_once_with(route)
+
+
+@pytest.mark.parametrize(
+    "func, args", [(flowclient.get_result_page, (10,)), (flowclient.get_row_count, ())]
+)
+def test_result_not_ready(func, args):
+    """ Test that an error is raised if the query hasn't finished. """
+    con_mock = Mock()
+    con_mock.get_url.return_value.status_code = 202
+    with pytest.raises(FlowclientConnectionError, match="status code: 202"):
+        func(con_mock, "a", *args)
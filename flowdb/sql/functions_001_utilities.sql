@@ -255,7 +255,8 @@ SET search_path = public, pg_temp;
 /*********************************
 ### table_size ###
 
-Get the size on disk in bytes of a table in the database.
+Get the size on disk in bytes of a table in the database. For a
+partitioned table, this is the total size of its partitions.
 
 ***********************************/
 
@@ -264,10 +265,13 @@ CREATE OR REPLACE FUNCTION table_size(IN tablename TEXT, IN table_schema TEXT)
 $$
   DECLARE table_size float;
   BEGIN
-  SELECT pg_total_relation_size(c.oid) INTO table_size
+  SELECT CASE WHEN relkind = 'p' THEN
+                (SELECT coalesce(sum(pg_total_relation_size(i.inhrelid)), 0)
+                   FROM pg_inherits i WHERE i.inhparent = c.oid)
+              ELSE pg_total_relation_size(c.oid) END INTO table_size
               FROM pg_class c
               LEFT JOIN pg_namespace n ON n.oid = c.relnamespace
-              WHERE relkind = 'r' AND relname=tablename AND nspname=table_schema;
+              WHERE relkind IN ('r', 'p') AND relname=tablename AND nspname=table_schema;
   RETURN table_size;
   END
 $$ LANGUAGE plpgsql
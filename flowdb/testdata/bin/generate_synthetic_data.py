@@ -14,10 +14,20 @@ Cell data is generated from a GeoJSON file with (simplified) admin3 boundaries f
 Nepal found in ../synthetic_data/data/NPL_admbnda_adm3_Districts_simplified.geojson
 
 Makes use of the tohu module for generation of random data.
+
+With `--ingest-mode copy`, calls are instead generated with numpy, with
+heavy-tailed call volumes per subscriber, and subscribers who are mostly
+seen at a home or work cell. Each day is generated by a separate worker
+process, and streamed straight into its own events.calls_YYYYMMDD table
+using binary COPY, which is then indexed and analysed. This is much
+faster, and needs no disk space beyond the database itself, so can be
+used to generate hundreds of millions of calls.
 """
 
 import os
+import struct
 import pandas as pd
+import numpy as np
 from tohu import *
 import argparse
 import datetime
@@ -56,6 +66,30 @@ parser.add_argument(
     default="",
     help="Root directory under which output .csv and .sql files are stored (in appropriate subfolders).",
 )
+parser.add_argument(
+    "--ingest-mode",
+    choices=["csv", "copy"],
+    default="csv",
+    help="Write calls to csv files to be ingested by the generated sql, or generate them with numpy and copy them straight into the database.",
+)
+parser.add_argument(
+    "--connection-string",
+    type=str,
+    default="",
+    help="libpq connection string for the database to copy calls into. Defaults to using the PG* environment variables.",
+)
+parser.add_argument(
+    "--n-workers",
+    type=int,
+    default=None,
+    help="Number of days to generate at once. Defaults to the number of cpus.",
+)
+parser.add_argument(
+    "--chunk-size",
+    type=int,
+    default=1_000_000,
+    help="Number of calls to generate at a time in each worker, when copying.",
+)
 
 
 class CellGenerator(CustomGenerator):
@@ -230,7 +264,348 @@ def write_day_csv(subscribers, cells, date, num_calls, call_seed, output_root_di
     return ingest_sql
 
 
-def write_ingest_sql(tables, output_root_dir):
+# Share of each hour of the day in the day's calls
+DIURNAL_PROFILE = np.array(
+    [1, 0.5, 0.3, 0.2, 0.2, 0.4, 1, 2, 3, 4, 4.5, 4.5]
+    + [4, 4, 4, 4, 4.5, 5, 5.5, 5.5, 5, 4, 3, 2]
+)
+# Chance of an event being at the subscriber's home cell, work cell, or anywhere else
+HOME_WORK_ELSEWHERE = np.array([0.6, 0.25, 0.15])
+# Microseconds from the postgres epoch to the unix epoch
+POSTGRES_EPOCH_OFFSET = 946_684_800 * 10 ** 6
+
+# Set in each worker process by init_copy_worker
+_population = None
+
+
+def hex_strings(words):
+    """
+    Hex encode rows of 32 bit words as fixed width byte strings.
+
+    Parameters
+    ----------
+    words: numpy.ndarray
+        Array of shape (n, k), which is cast to uint32
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of n byte strings of length 8 * k
+    """
+    words = np.asarray(words, dtype=np.uint32)
+    nibbles = (words[..., None] >> np.arange(28, -4, -4, dtype=np.uint32)) & 0xF
+    chars = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)[nibbles]
+    return (
+        np.ascontiguousarray(chars.reshape(len(words), -1))
+        .view(f"S{8 * words.shape[1]}")
+        .ravel()
+    )
+
+
+def numeric_binary(values):
+    """
+    Encode non-negative integers below 10^8 in postgres' binary format for
+    numerics, as two base 10000 digits. Postgres strips the leading zero
+    digit when it reads them.
+
+    Parameters
+    ----------
+    values: numpy.ndarray
+        Integers to encode
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (n, 6) of int16 - number of digits, weight, sign,
+        display scale and the two digits.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    encoded = np.empty((len(values), 6), dtype=np.int16)
+    encoded[:, 0] = 2
+    encoded[:, 1] = 1
+    encoded[:, 2] = 0
+    encoded[:, 3] = 0
+    encoded[:, 4] = values // 10000
+    encoded[:, 5] = values % 10000
+    return encoded
+
+
+def copy_row_dtype(location_id_length):
+    """
+    Numpy dtype of a row of the calls table in postgres' binary copy format.
+    Every field has a fixed width, so rows can be written directly from an
+    array of this dtype.
+
+    Parameters
+    ----------
+    location_id_length: int
+        Length of the cell ids
+
+    Returns
+    -------
+    numpy.dtype
+    """
+    return np.dtype(
+        [
+            ("n_fields", ">i2"),
+            ("id_length", ">i4"),
+            ("id", "S16"),
+            ("outgoing_length", ">i4"),
+            ("outgoing", "u1"),
+            ("datetime_length", ">i4"),
+            ("datetime", ">i8"),
+            ("duration_length", ">i4"),
+            ("duration", ">i2", (6,)),
+            ("msisdn_length", ">i4"),
+            ("msisdn", "S40"),
+            ("msisdn_counterpart_length", ">i4"),
+            ("msisdn_counterpart", "S40"),
+            ("location_id_length", ">i4"),
+            ("location_id", f"S{location_id_length}"),
+            ("tac_length", ">i4"),
+            ("tac", ">i2", (6,)),
+        ]
+    )
+
+
+COPY_COLUMNS = (
+    "id, outgoing, datetime, duration, msisdn, msisdn_counterpart, location_id, tac"
+)
+
+
+def make_population(n_subscribers, cell_ids, seed):
+    """
+    Generate subscribers, with heavy-tailed activity and a home and work
+    cell each, and the popularity of each cell.
+
+    Parameters
+    ----------
+    n_subscribers: int
+        Number of subscribers
+    cell_ids: numpy.ndarray
+        Byte string ids of the cells
+    seed: int
+        Random seed
+
+    Returns
+    -------
+    dict
+    """
+    rng = np.random.RandomState(seed)
+    n_cells = len(cell_ids)
+    cell_popularity = np.cumsum(rng.lognormal(0, 1, n_cells))
+    activity = np.cumsum(rng.pareto(1.5, n_subscribers) + 0.1)
+    return dict(
+        msisdn=hex_strings(rng.randint(0, 2 ** 32, (n_subscribers, 5), np.uint64)),
+        tac=rng.randint(10000, 100_000, n_subscribers),
+        activity=activity / activity[-1],
+        home=np.searchsorted(
+            cell_popularity,
+            rng.uniform(0, cell_popularity[-1], n_subscribers),
+            side="right",
+        ),
+        work=np.searchsorted(
+            cell_popularity,
+            rng.uniform(0, cell_popularity[-1], n_subscribers),
+            side="right",
+        ),
+        cell_popularity=cell_popularity / cell_popularity[-1],
+        cell_ids=cell_ids,
+    )
+
+
+def init_copy_worker(n_subscribers, cell_ids, seed):
+    """
+    Generate the subscribers once in each worker process.
+    """
+    global _population
+    _population = make_population(n_subscribers, cell_ids, seed)
+
+
+def make_calls(population, date, day_index, first_call, n_calls, rng):
+    """
+    Generate calls in two line format, as rows in postgres' binary copy format.
+
+    Parameters
+    ----------
+    population: dict
+        Subscribers and cells, from make_population
+    date: datetime.date
+        Date calls should occur on
+    day_index: int
+        Index of the day, used to give calls on different days different ids
+    first_call: int
+        Index of the first call in the day, used to give each call a different id
+    n_calls: int
+        Number of calls to generate
+    rng: numpy.random.RandomState
+        Random state to generate the calls with
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of 2 * n_calls rows, the outgoing then the incoming side of each call
+    """
+    pick_subscribers = lambda: np.searchsorted(
+        population["activity"], rng.uniform(0, 1, n_calls), side="right"
+    )
+    callers = pick_subscribers()
+    callees = pick_subscribers()
+    # Nobody calls themselves
+    same = callers == callees
+    callees[same] = (callees[same] + 1) % len(population["activity"])
+
+    day_start = (
+        int(pd.Timestamp(date).value // 1000) - POSTGRES_EPOCH_OFFSET
+    )  # Microseconds
+    hours = rng.choice(24, n_calls, p=DIURNAL_PROFILE / DIURNAL_PROFILE.sum())
+    start_times = day_start + (hours * 3600 + rng.randint(0, 3600, n_calls)) * 10 ** 6
+    durations = numeric_binary(
+        np.clip(rng.lognormal(4, 1.2, n_calls).astype(np.int64), 0, 7200)
+    )
+    call_ids = hex_strings(
+        np.column_stack(
+            [np.full(n_calls, day_index), np.arange(first_call, first_call + n_calls)]
+        )
+    )
+
+    def locations(subscribers):
+        where = rng.choice(3, len(subscribers), p=HOME_WORK_ELSEWHERE)
+        elsewhere = np.searchsorted(
+            population["cell_popularity"],
+            rng.uniform(0, 1, len(subscribers)),
+            side="right",
+        )
+        cells = np.where(
+            where == 0,
+            population["home"][subscribers],
+            np.where(where == 1, population["work"][subscribers], elsewhere),
+        )
+        return population["cell_ids"][cells]
+
+    cell_ids = population["cell_ids"]
+    rows = np.empty(2 * n_calls, dtype=copy_row_dtype(cell_ids.dtype.itemsize))
+    rows["n_fields"] = 8
+    rows["id_length"] = 16
+    rows["outgoing_length"] = 1
+    rows["datetime_length"] = 8
+    rows["duration_length"] = 12
+    rows["msisdn_length"] = 40
+    rows["msisdn_counterpart_length"] = 40
+    rows["location_id_length"] = cell_ids.dtype.itemsize
+    rows["tac_length"] = 12
+    for side, (subscribers, counterparts) in enumerate(
+        [(callers, callees), (callees, callers)]
+    ):
+        half = rows[side * n_calls : (side + 1) * n_calls]
+        half["id"] = call_ids
+        half["outgoing"] = side == 0
+        half["datetime"] = start_times
+        half["duration"] = durations
+        half["msisdn"] = population["msisdn"][subscribers]
+        half["msisdn_counterpart"] = population["msisdn"][counterparts]
+        half["location_id"] = locations(subscribers)
+        half["tac"] = numeric_binary(population["tac"][subscribers])
+    return rows
+
+
+class CopyStream:
+    """
+    Read-only file-like object over an iterator of byte strings, so that
+    psycopg2 can copy data as it is generated.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = b""
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            try:
+                self.buffer += next(self.chunks)
+            except StopIteration:
+                break
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def copy_day(
+    date, day_index, num_calls, call_seed, connection_string, chunk_size=1_000_000
+):
+    """
+    Generate a day of calls, and copy them into a new table for the day,
+    which is then indexed and analysed. Replaces any existing table for the day.
+
+    Parameters
+    ----------
+    date: datetime.date
+        Date calls should occur on
+    day_index: int
+        Index of the day
+    num_calls: int
+        Number of calls to generate
+    call_seed: int
+        Random seed to use for generating calls
+    connection_string: str
+        libpq connection string for the database
+    chunk_size: int
+        Number of calls to generate at a time
+
+    Returns
+    -------
+    str
+        Name of the table
+    """
+    import psycopg2
+
+    table = f"events.calls_{date.strftime('%Y%m%d')}"
+    end_date = (date + datetime.timedelta(days=1)).strftime("%Y%m%d")
+    rng = np.random.RandomState(call_seed)
+
+    def chunks():
+        # Header - signature, flags and header extension length
+        yield b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+        for first_call in range(0, num_calls, chunk_size):
+            yield make_calls(
+                _population,
+                date,
+                day_index,
+                first_call,
+                min(chunk_size, num_calls - first_call),
+                rng,
+            ).tobytes()
+        yield struct.pack(">h", -1)
+
+    with psycopg2.connect(connection_string) as connection:
+        with connection.cursor() as cursor:
+            # Creating the table in the same transaction as the copy lets postgres skip the WAL
+            cursor.execute(
+                f"""
+                DROP TABLE IF EXISTS {table};
+                CREATE TABLE {table} (
+                    CHECK ( datetime >= '{date.strftime('%Y%m%d')}'::TIMESTAMPTZ
+                    AND datetime < '{end_date}'::TIMESTAMPTZ)
+                ) INHERITS (events.calls);
+                """
+            )
+            cursor.copy_expert(
+                f"COPY {table} ({COPY_COLUMNS}) FROM STDIN WITH (FORMAT binary)",
+                CopyStream(chunks()),
+            )
+        connection.commit()
+        with connection.cursor() as cursor:
+            for column in ["msisdn", "msisdn_counterpart", "tac", "location_id"]:
+                cursor.execute(f"CREATE INDEX ON {table} ({column});")
+            cursor.execute(f"CREATE INDEX ON {table} (datetime);")
+            cursor.execute(f"ANALYZE {table};")
+    connection.close()
+    print(f"Copied {2 * num_calls} rows into {table}.")
+    return table
+
+
+def write_ingest_sql(tables, output_root_dir, clear_calls=True):
     """
     Write to `{output_root_dir}/sql/syntheticdata/ingest_calls.sql` an ingestion
     script that wraps the list of table creation statements provided in tables.
@@ -239,9 +614,14 @@ def write_ingest_sql(tables, output_root_dir):
     ----------
     tables: list of str
         List of SQL strings, each of which is a table creation statement.
+    clear_calls: bool, default True
+        Delete any existing calls before creating the tables. Set to False
+        if the calls have already been copied into the database.
     """
     ingest_head = """
-        BEGIN;
+        BEGIN;"""
+    if clear_calls:
+        ingest_head += """
         DELETE FROM events.calls;"""
     ingest_tail = """
         ANALYZE events.calls;
@@ -270,10 +650,6 @@ if __name__ == "__main__":
     output_root_dir = args.output_root_dir
     os.makedirs(os.path.join(output_root_dir, "data", "infrastructure"), exist_ok=True)
 
-    print("Generating {} subscribers.".format(num_subscribers))
-    sg = SubscriberGenerator()
-    subscribers = list(sg.generate(num_subscribers, seed=subscriber_seed))
-
     print("Generating {} cells.".format(num_cells))
     cg = CellGenerator()
     cells = cg.generate(num_cells, seed=cell_seed)
@@ -293,11 +669,40 @@ if __name__ == "__main__":
     print("Generating {} days of calls.".format(args.n_days))
     dates = pd.date_range(start="2016-01-01", periods=args.n_days)
 
-    def write_f(seed_inc, date):
-        return write_day_csv(
-            subscribers, cells, date, num_calls, call_seed + seed_inc, output_root_dir
-        )
-
-    with ProcessPoolExecutor() as pool:
-        tables = list(pool.map(write_f, *zip(*enumerate(dates))))
-    write_ingest_sql(tables, output_root_dir)
+    if args.ingest_mode == "copy":
+        cell_ids = np.array([cell.cell_id for cell in cells], dtype=bytes)
+        with ProcessPoolExecutor(
+            args.n_workers,
+            initializer=init_copy_worker,
+            initargs=(num_subscribers, cell_ids, subscriber_seed),
+        ) as pool:
+            list(
+                pool.map(
+                    copy_day,
+                    dates,
+                    range(len(dates)),
+                    [num_calls] * len(dates),
+                    [call_seed + day_index for day_index in range(len(dates))],
+                    [args.connection_string] * len(dates),
+                    [args.chunk_size] * len(dates),
+                )
+            )
+        write_ingest_sql([], output_root_dir, clear_calls=False)
+    else:
+        print("Generating {} subscribers.".format(num_subscribers))
+        sg = SubscriberGenerator()
+        subscribers = list(sg.generate(num_subscribers, seed=subscriber_seed))
+
+        def write_f(seed_inc, date):
+            return write_day_csv(
+                subscribers,
+                cells,
+                date,
+                num_calls,
+                call_seed + seed_inc,
+                output_root_dir,
+            )
+
+        with ProcessPoolExecutor(args.n_workers) as pool:
+            tables = list(pool.map(write_f, *zip(*enumerate(dates))))
+        write_ingest_sql(tables, output_root_dir)
@@ -21,7 +21,10 @@ if [ -f /opt/synthetic_data/generate_synthetic_data.py ]; then
       --cells-seed ${CELLS_SEED} \
       --calls-seed ${CALLS_SEED} \
       --n-days ${N_DAYS} \
-      --output-root-dir ${OUTPUT_ROOT_DIR}
+      --output-root-dir ${OUTPUT_ROOT_DIR} \
+      --ingest-mode ${INGEST_MODE} \
+      --connection-string "dbname=${POSTGRES_DB}" \
+      ${N_WORKERS:+--n-workers ${N_WORKERS}}
 fi
 
 
@@ -7,19 +7,117 @@
 """
 Functions which deal with inspecting and managing the query cache.
 """
+import json
 import logging
 import pickle
+import time
+from contextlib import ExitStack
+from uuid import uuid4
 
 from typing import TYPE_CHECKING, Tuple, List
 
 from psycopg2 import InternalError
 
+from flowmachine.core.catalog_cache import refresh_catalog_cache
+from flowmachine.utils import rlock
+
 if TYPE_CHECKING:
+    import redis
     from .query import Query
     from .connection import Connection
 
 logger = logging.getLogger("flowmachine").getChild(__name__)
 
+# Redis key holding a token which changes whenever a query is stored or removed
+# from cache, so that SQL built on the basis of what was stored can be reused
+# until it does
+CACHE_GENERATION_KEY = "flowmachine_cache_generation"
+
+
+def get_cache_generation(redis_client: "redis.StrictRedis") -> bytes:
+    """
+    Get the token identifying the current contents of the cache. The token
+    changes whenever a query is stored in or removed from cache.
+
+    Parameters
+    ----------
+    redis_client : redis.StrictRedis
+
+    Returns
+    -------
+    bytes
+        The current token
+    """
+    generation = redis_client.get(CACHE_GENERATION_KEY)
+    if generation is None:
+        # Never the same as any token seen before redis was emptied
+        redis_client.set(CACHE_GENERATION_KEY, uuid4().hex, nx=True)
+        generation = redis_client.get(CACHE_GENERATION_KEY)
+    return generation
+
+
+def bump_cache_generation(redis_client: "redis.StrictRedis") -> None:
+    """
+    Change the token identifying the current contents of the cache. Call this
+    after storing a query or removing one from cache.
+
+    Parameters
+    ----------
+    redis_client : redis.StrictRedis
+    """
+    redis_client.set(CACHE_GENERATION_KEY, uuid4().hex)
+
+
+# Postgres channel on which a notification is sent whenever storing a query in
+# cache finishes, so that clients can wait for a query instead of polling it
+QUERY_STORED_CHANNEL = "flowmachine_query_stored"
+
+
+def notify_query_stored(
+    connection: "Connection", query_id: str, status: str = "done"
+) -> None:
+    """
+    Notify anyone listening on `QUERY_STORED_CHANNEL` that storing a query
+    has finished. The payload is a JSON object with keys "query_id" and
+    "status". Call this after the storage lock is released, so that polling
+    the query gives its new status.
+
+    Failing to notify is logged, but isn't an error.
+
+    Parameters
+    ----------
+    connection : Connection
+    query_id : str
+        md5 id of the query
+    status : {"done", "error"}, default "done"
+        Whether the query was stored, or storing it failed
+    """
+    payload = json.dumps({"query_id": query_id, "status": status})
+    try:
+        with connection.engine.begin() as trans:
+            trans.execute("SELECT pg_notify(%s, %s)", (QUERY_STORED_CHANNEL, payload))
+    except Exception as e:
+        logger.error(f"Failed to notify that {query_id} was stored: {e}")
+
+
+def touch_cache_many(connection: "Connection", query_ids: List[str]) -> None:
+    """
+    'Touch' several cache records at once and update their cache scores.
+    Ids which are not in cache are ignored.
+
+    Parameters
+    ----------
+    connection : Connection
+    query_ids : list of str
+        md5 ids of the queries to touch
+    """
+    if len(query_ids) == 0:
+        return
+    ids = ", ".join(f"'{query_id}'" for query_id in query_ids)
+    connection.fetch(
+        f"SELECT touch_cache(query_id) FROM cache.cached WHERE query_id IN ({ids})"
+    )
+
 
 def touch_cache(connection: "Connection", query_id: str) -> float:
     """
@@ -51,6 +149,8 @@ def reset_cache(connection: "Connection") -> None:
     ----------
     connection : Connection
     """
+    from .query import Query
+
     # For deletion purposes, we ignore Table objects. These either point to something
     # outside the cache schema and hence shouldn't be removed by calling this, or
     # they point to a cache table and hence are a duplicate of a Query entry which
@@ -64,6 +164,7 @@ def reset_cache(connection: "Connection") -> None:
             trans.execute(f"DROP TABLE IF EXISTS cache.{table[0]} CASCADE")
         trans.execute("TRUNCATE cache.cached CASCADE")
         trans.execute("TRUNCATE cache.dependencies CASCADE")
+    bump_cache_generation(Query.redis)
 
 
 def invalidate_cache_by_id(
@@ -91,6 +192,65 @@ def invalidate_cache_by_id(
     return query_obj
 
 
+class CachedQuery:
+    """
+    Stand-in for a query object stored in cache, which knows the query's id,
+    class and table from the cache record, and only unpickles the object
+    the first time anything else is needed from it. Other attributes and
+    methods are those of the query object.
+
+    Parameters
+    ----------
+    query_id : str
+        md5 id of the query
+    class_name : str
+        Name of the query's class
+    fully_qualified_table_name : str
+        Schema qualified name of the query's table
+    obj : bytes
+        The pickled query object
+
+    Examples
+    --------
+    >>> cached = get_cached_query_objects_ordered_by_score(connection)[0][0]
+    >>> cached.md5  # Doesn't unpickle
+    '5d6b1ec5ac1a4bd0b21e8ee5bfff84a0'
+    >>> cached.invalidate_db_cache()  # Does
+    """
+
+    def __init__(
+        self,
+        query_id: str,
+        class_name: str,
+        fully_qualified_table_name: str,
+        obj: bytes,
+    ):
+        self.md5 = query_id
+        self.class_name = class_name
+        self.fully_qualified_table_name = fully_qualified_table_name
+        self._obj = obj
+        self._query = None
+
+    @property
+    def query(self) -> "Query":
+        """
+        The query object, unpickled on first use.
+        """
+        if self._query is None:
+            self._query = pickle.loads(self._obj)
+            self._obj = None
+        return self._query
+
+    def __getattr__(self, name):
+        # Only called for attributes which aren't set on the proxy itself
+        if name in {"_obj", "_query", "query"}:
+            raise AttributeError(name)
+        return getattr(self.query, name)
+
+    def __repr__(self):
+        return f"<CachedQuery {self.class_name} {self.md5}>"
+
+
 def get_query_object_by_id(connection: "Connection", query_id: str) -> "Query":
     """
     Get a query object from cache by id.
@@ -117,7 +277,7 @@ def get_query_object_by_id(connection: "Connection", query_id: str) -> "Query":
 
 def get_cached_query_objects_ordered_by_score(
     connection: "Connection"
-) -> List[Tuple["Query", int]]:
+) -> List[Tuple[CachedQuery, int]]:
     """
     Get all cached query objects in ascending cache score order.
 
@@ -128,16 +288,179 @@ def get_cached_query_objects_ordered_by_score(
     Returns
     -------
     list of tuples
-        Returns a list of cached Query objects with their on disk sizes
+        Returns a list of cached queries with their on disk sizes. The
+        queries are `CachedQuery` stand-ins rather than Query objects, and
+        are only unpickled when needed.
 
     """
-    qry = """SELECT obj, table_size(tablename, schema) as table_size
+    qry = """SELECT query_id, class, schema || '.' || tablename, obj,
+        table_size(tablename, schema) as table_size
         FROM cache.cached
         WHERE NOT cached.class='Table'
         ORDER BY cache_score(cache_score_multiplier, compute_time, table_size(tablename, schema)) ASC
         """
     cache_queries = connection.fetch(qry)
-    return [(pickle.loads(obj), table_size) for obj, table_size in cache_queries]
+    return [
+        (CachedQuery(query_id, class_name, table_name, obj), table_size)
+        for query_id, class_name, table_name, obj, table_size in cache_queries
+    ]
+
+
+def get_cache_eviction_candidates(
+    connection: "Connection"
+) -> List[Tuple[str, str, int, float]]:
+    """
+    Get the id, table name, size and cache score of every cached query, in
+    ascending cache score order, without loading the query objects. Each
+    table's size is looked up once.
+
+    Parameters
+    ----------
+    connection : Connection
+
+    Returns
+    -------
+    list of tuples
+        Query id, table name, size in bytes and cache score of each cached query
+    """
+    qry = """SELECT query_id, tablename, table_size,
+            cache_score(cache_score_multiplier, compute_time, table_size) as score
+        FROM (SELECT query_id, tablename, cache_score_multiplier, compute_time,
+                table_size(tablename, schema) as table_size
+            FROM cache.cached
+            WHERE NOT cached.class='Table') _
+        ORDER BY score ASC
+        """
+    return [
+        (query_id, tablename, 0 if size is None else int(size), score)
+        for query_id, tablename, size, score in connection.fetch(qry)
+    ]
+
+
+def plan_cache_eviction(
+    candidates: List[Tuple[str, str, int, float]], bytes_to_free: int
+) -> List[Tuple[str, str, int, float]]:
+    """
+    Choose which cached queries to remove to free at least `bytes_to_free`,
+    losing as little cached work as possible.
+
+    Removing a query loses its cache score times its size (roughly, how long
+    it took to compute weighted by how much it has been used). Candidates
+    are taken in ascending score order until enough space is freed, and then
+    any which turned out not to be needed are put back, most valuable first.
+    If a single candidate large enough to free the space on its own would
+    lose less, that is chosen instead.
+
+    Parameters
+    ----------
+    candidates : list of tuples
+        Query id, table name, size and score of each cached query, in
+        ascending score order, as returned by `get_cache_eviction_candidates`
+    bytes_to_free : int
+        Number of bytes to free
+
+    Returns
+    -------
+    list of tuples
+        The candidates to remove, in ascending score order
+    """
+    if bytes_to_free <= 0:
+        return []
+
+    def value(candidate):
+        _, _, size, score = candidate
+        return 0 if score is None else float(score) * size
+
+    chosen = []
+    freed = 0
+    for candidate in candidates:
+        if freed >= bytes_to_free:
+            break
+        chosen.append(candidate)
+        freed += candidate[2]
+    for candidate in sorted(chosen, key=value, reverse=True):
+        if freed - candidate[2] >= bytes_to_free:
+            chosen.remove(candidate)
+            freed -= candidate[2]
+    single = min(
+        (candidate for candidate in candidates if candidate[2] >= bytes_to_free),
+        key=value,
+        default=None,
+    )
+    if single is not None and value(single) < sum(map(value, chosen)):
+        return [single]
+    return chosen
+
+
+def remove_cached_queries(connection: "Connection", query_ids: List[str]) -> None:
+    """
+    Remove several queries from cache in one transaction, dropping their
+    tables and any Table records which point to them. Queries which depend
+    on them are left in cache.
+
+    Parameters
+    ----------
+    connection : Connection
+    query_ids : list of str
+        md5 ids of the queries to remove
+    """
+    from .query import Query
+
+    if len(query_ids) == 0:
+        return
+    ids = ", ".join(f"'{query_id}'" for query_id in query_ids)
+    with ExitStack() as locks:
+        # Always lock in the same order, so two removals can't deadlock
+        for query_id in sorted(query_ids):
+            locks.enter_context(rlock(Query.redis, query_id))
+        tables = connection.fetch(
+            f"SELECT schema, tablename FROM cache.cached WHERE query_id IN ({ids})"
+        )
+        with connection.engine.begin() as trans:
+            for schema, tablename in tables:
+                trans.execute(
+                    "DELETE FROM cache.cached WHERE schema=%s AND tablename=%s",
+                    (schema, tablename),
+                )
+                trans.execute(f"DROP TABLE IF EXISTS {schema}.{tablename}")
+    for schema, tablename in tables:
+        refresh_catalog_cache(schema, tablename)
+    bump_cache_generation(Query.redis)
+    logger.debug(f"Removed {len(tables)} queries from cache.")
+
+
+def get_query_objects_by_id(
+    connection: "Connection", query_ids: List[str]
+) -> List[CachedQuery]:
+    """
+    Get several query objects from cache by id, in the order given.
+
+    Parameters
+    ----------
+    connection : Connection
+    query_ids : list of str
+        md5 ids of the queries
+
+    Returns
+    -------
+    list of CachedQuery
+        Stand-ins for the original query objects, which are only unpickled
+        when needed.
+    """
+    if len(query_ids) == 0:
+        return []
+    ids = ", ".join(f"'{query_id}'" for query_id in query_ids)
+    records = {
+        query_id: CachedQuery(query_id, class_name, table_name, obj)
+        for query_id, class_name, table_name, obj in connection.fetch(
+            f"""SELECT query_id, class, schema || '.' || tablename, obj
+            FROM cache.cached WHERE query_id IN ({ids})"""
+        )
+    }
+    try:
+        return [records[query_id] for query_id in query_ids]
+    except KeyError as e:
+        raise ValueError(f"Query id {e} is not in cache on this connection.")
 
 
 def shrink_one(connection: "Connection", dry_run: bool = False) -> "Query":
@@ -156,7 +479,8 @@ def shrink_one(connection: "Connection", dry_run: bool = False) -> "Query":
     tuple of "Query", int
         The "Query" object that was removed from cache and the size of it
     """
-    obj_to_remove, obj_size = get_cached_query_objects_ordered_by_score(connection)[0]
+    query_id, _, obj_size, _ = get_cache_eviction_candidates(connection)[0]
+    obj_to_remove = get_query_object_by_id(connection, query_id)
 
     logger.info(
         f"{'Would' if dry_run else 'Will'} remove cache record for {obj_to_remove.md5} of type {obj_to_remove.__class__}"
@@ -172,10 +496,14 @@ def shrink_one(connection: "Connection", dry_run: bool = False) -> "Query":
 
 def shrink_below_size(
     connection: "Connection", size_threshold: int = None, dry_run: bool = False
-) -> "Query":
+) -> List[CachedQuery]:
     """
     Remove queries from the cache until it is below a specified size threshold.
 
+    The queries to remove are chosen in one pass over the cache scores by
+    `plan_cache_eviction`, and removed together in one transaction. None of
+    the query objects are unpickled unless used by the caller.
+
     Parameters
     ----------
     connection : "Connection"
@@ -186,41 +514,38 @@ def shrink_below_size(
 
     Returns
     -------
-    list of "Query"
-        List of the queries that were removed
+    list of CachedQuery
+        Stand-ins for the queries that were removed, which are not
+        themselves Query objects
     """
-    initial_cache_size = get_size_of_cache(connection)
-    removed = []
+    if size_threshold is None:
+        size_threshold = get_max_size_of_cache(connection)
+    start = time.perf_counter()
+    candidates = get_cache_eviction_candidates(connection)
+    initial_cache_size = sum(size for _, _, size, _ in candidates)
     logger.info(
         f"Shrinking cache from {initial_cache_size} to below {size_threshold}{' (dry run)' if dry_run else ''}."
     )
-
-    if dry_run:
-        cached_queries = iter(get_cached_query_objects_ordered_by_score(connection))
-
-        def dry_run_shrink(connection):
-            obj, obj_size = cached_queries.__next__()
-            logger.info(
-                f"Would remove cache record for {obj.md5} of type {obj.__class__}"
-            )
-            logger.info(
-                f"Table {obj.fully_qualified_table_name} ({obj_size} bytes) would be removed."
-            )
-            return obj, obj_size
-
-        shrink = dry_run_shrink
-    else:
-        shrink = shrink_one
-
-    if size_threshold is None:
-        size_threshold = get_max_size_of_cache(connection)
-
-    while initial_cache_size > size_threshold:
-        obj_removed, cache_reduction = shrink(connection)
-        removed.append(obj_removed)
-        initial_cache_size -= cache_reduction
+    to_remove = plan_cache_eviction(candidates, initial_cache_size - size_threshold)
+    planned = time.perf_counter()
+    removed = get_query_objects_by_id(
+        connection, [query_id for query_id, _, _, _ in to_remove]
+    )
+    for obj, (_, _, obj_size, _) in zip(removed, to_remove):
+        logger.info(
+            f"{'Would' if dry_run else 'Will'} remove cache record for {obj.md5} of type {obj.class_name}"
+        )
+        logger.info(
+            f"Table {obj.fully_qualified_table_name} ({obj_size} bytes) {'would' if dry_run else 'will'} be removed."
+        )
+    if not dry_run:
+        remove_cached_queries(connection, [obj.md5 for obj in removed])
+    finished = time.perf_counter()
+    new_cache_size = initial_cache_size - sum(size for _, _, size, _ in to_remove)
+    logger.info(f"New cache size {'would' if dry_run else 'will'} be {new_cache_size}.")
     logger.info(
-        f"New cache size {'would' if dry_run else 'will'} be {initial_cache_size}."
+        f"Planned removal of {len(to_remove)} of {len(candidates)} cached queries in {(planned - start) * 1000:.1f}ms"
+        f"{'' if dry_run else f', removed them in {(finished - planned) * 1000:.1f}ms'}."
     )
     return removed
 
@@ -408,6 +733,9 @@ def cache_table_exists(connection: "Connection", query_id: str) -> bool:
     Return True if a cache table for the query with
     id `query_id` exist, otherwise return False.
 
+    Checks that the query has a cache record and that the table it
+    names exists, without loading the query object.
+
     Parameters
     ----------
     connection: "Connection"
@@ -418,8 +746,11 @@ def cache_table_exists(connection: "Connection", query_id: str) -> bool:
     -------
     bool
     """
-    try:
-        _ = get_query_object_by_id(connection, query_id)
-        return True
-    except ValueError:
-        return False
+    # Only looks at the cache record, so the query object isn't fetched or unpickled
+    qry = f"""
+    SELECT EXISTS (
+        SELECT 1 FROM cache.cached
+        WHERE query_id='{query_id}'
+        AND to_regclass(format('%I.%I', schema, tablename)) IS NOT NULL
+    )"""
+    return connection.fetch(qry)[0][0]
@@ -0,0 +1,198 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+# -*- coding: utf-8 -*-
+"""
+Process-wide cache of information from the database catalog: reflected
+sqlalchemy tables, the column names of tables, and whether tables exist.
+
+Constructing a query object typically needs this information for the
+events tables and friends, which change only when new data is ingested,
+so entries are kept for `CATALOG_CACHE_TTL` seconds (see
+`set_catalog_cache_ttl`). Call `refresh_catalog_cache` to discard entries
+immediately, e.g. after creating or dropping a table.
+
+Tables in the cache schema are never cached here, because they are created
+and dropped as queries are stored and evicted, possibly by other processes.
+"""
+import logging
+from threading import RLock
+from typing import TYPE_CHECKING, Dict, List, Union
+
+from cachetools import TTLCache
+from sqlalchemy import MetaData, Table
+
+if TYPE_CHECKING:
+    from .connection import Connection
+
+logger = logging.getLogger("flowmachine").getChild(__name__)
+
+# Two minutes, as for the available dates cache on Connection
+CATALOG_CACHE_TTL = 120
+UNCACHED_SCHEMAS = {"cache"}
+
+_lock = RLock()
+_reflected_tables = TTLCache(256, CATALOG_CACHE_TTL)
+_table_columns = TTLCache(1024, CATALOG_CACHE_TTL)
+_table_exists = TTLCache(1024, CATALOG_CACHE_TTL)
+_stats = {"hits": 0, "misses": 0}
+
+
+def _get_or_fetch(cache: TTLCache, key: tuple, fetch):
+    """
+    Return the cached value for key, calling fetch to get (and cache) it if
+    not already cached. Tables in uncached schemas are always fetched.
+    """
+    if key[1] in UNCACHED_SCHEMAS or _reflected_tables.ttl <= 0:
+        return fetch()
+    with _lock:
+        try:
+            value = cache[key]
+            _stats["hits"] += 1
+            return value
+        except KeyError:
+            _stats["misses"] += 1
+    value = fetch()
+    with _lock:
+        cache[key] = value
+    return value
+
+
+def get_reflected_table(engine, schema: str, name: str) -> Table:
+    """
+    Get a sqlalchemy Table object for a table, autoloaded from the database.
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine
+        SQLAlchemy engine to use for reading the table information.
+    schema : str
+        Schema of the table
+    name : str
+        Name of the table
+
+    Returns
+    -------
+    sqlalchemy.Table
+    """
+    return _get_or_fetch(
+        _reflected_tables,
+        (str(engine.url), schema, name),
+        lambda: Table(
+            name, MetaData(), schema=schema, autoload=True, autoload_with=engine
+        ),
+    )
+
+
+def get_table_columns(connection: "Connection", schema: str, name: str) -> List[str]:
+    """
+    Get the names of the columns of a table.
+
+    Parameters
+    ----------
+    connection : Connection
+    schema : str
+        Schema of the table
+    name : str
+        Name of the table
+
+    Returns
+    -------
+    list of str
+        Column names, in table order.
+    """
+
+    def fetch():
+        return [
+            column_name
+            for column_name, in connection.fetch(
+                f"""SELECT column_name FROM INFORMATION_SCHEMA.COLUMNS
+                WHERE table_name = '{name}' AND table_schema='{schema}'
+                ORDER BY ordinal_position"""
+            )
+        ]
+
+    return list(
+        _get_or_fetch(_table_columns, (str(connection.engine.url), schema, name), fetch)
+    )
+
+
+def table_exists(connection: "Connection", schema: str, name: str) -> bool:
+    """
+    Check whether a table exists in the database.
+
+    Parameters
+    ----------
+    connection : Connection
+    schema : str
+        Schema of the table
+    name : str
+        Name of the table
+
+    Returns
+    -------
+    bool
+        True if the table exists
+    """
+    return _get_or_fetch(
+        _table_exists,
+        (str(connection.engine.url), schema, name),
+        lambda: connection.has_table(name, schema=schema),
+    )
+
+
+def refresh_catalog_cache(
+    schema: Union[str, None] = None, name: Union[str, None] = None
+) -> None:
+    """
+    Discard cached catalog information, so that it will be fetched from
+    the database next time it is needed.
+
+    Parameters
+    ----------
+    schema : str, optional
+        Only discard information about tables in this schema
+    name : str, optional
+        Only discard information about tables with this name
+    """
+    with _lock:
+        for cache in (_reflected_tables, _table_columns, _table_exists):
+            for key in list(cache.keys()):
+                _, key_schema, key_name = key
+                if (schema is None or schema == key_schema) and (
+                    name is None or name == key_name
+                ):
+                    cache.pop(key, None)
+    logger.debug(f"Refreshed catalog cache for {schema}.{name}.")
+
+
+def set_catalog_cache_ttl(ttl: float) -> None:
+    """
+    Set the number of seconds catalog information is cached for, discarding
+    anything currently cached.
+
+    Parameters
+    ----------
+    ttl : float
+        Lifetime of cache entries in seconds. Set to zero to disable caching.
+    """
+    global _reflected_tables, _table_columns, _table_exists
+    with _lock:
+        _reflected_tables = TTLCache(256, ttl)
+        _table_columns = TTLCache(1024, ttl)
+        _table_exists = TTLCache(1024, ttl)
+
+
+def catalog_cache_info() -> Dict[str, int]:
+    """
+    Get the number of catalog lookups which were answered from the cache,
+    and the number which went to the database.
+
+    Returns
+    -------
+    dict
+        Dict with keys "hits" and "misses"
+    """
+    with _lock:
+        return dict(_stats)
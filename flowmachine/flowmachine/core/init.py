@@ -241,10 +241,10 @@ def _init_logging(log_level, write_log_file):
         logger.info(f"Added log file handler, logging to {log_file}")
 
 
-def _start_threadpool(thread_pool_size=None):
+def _start_threadpool(thread_pool_size: int):
     """
     Start the threadpool flowmachine uses for executing queries
-    asynchronously.
+    asynchronously, and record its size as `Query.thread_pool_size`.
 
     Parameters
     ----------
@@ -257,3 +257,4 @@ def _start_threadpool(thread_pool_size=None):
 
     """
     Query.tp = ThreadPoolExecutor(thread_pool_size)
+    Query.thread_pool_size = thread_pool_size
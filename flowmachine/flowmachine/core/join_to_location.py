@@ -246,6 +246,13 @@ class JoinToLocation(Query):
         return left_columns + right_columns
 
     def _make_query(self):
+        if self.time_col == "time" and hasattr(self.left, "_sightings_sql"):
+            # Subscriber locations, which may have stored sightings at this level
+            sightings_sql = self.left._sightings_sql(
+                self.level, self.column_names, self.column_name
+            )
+            if sightings_sql is not None:
+                return sightings_sql
 
         right_columns = get_columns_for_level(self.level, self.column_name)
         left_columns = self.left.column_names
@@ -255,6 +262,15 @@ class JoinToLocation(Query):
         right_columns_str = ", ".join([f"sites.{c}" for c in right_columns])
         left_columns_str = ", ".join([f"l.{c}" for c in left_columns])
 
+        if "valid_period" in self.right_query.column_names:
+            # Stored cell mappings have an index on the location and the period in service
+            in_service = f"sites.valid_period @> l.{self.time_col}::date::timestamptz"
+        else:
+            in_service = f"""l.{self.time_col}::date BETWEEN coalesce(sites.date_of_first_service,
+                                                '-infinity'::timestamptz) AND
+                                       coalesce(sites.date_of_last_service,
+                                                'infinity'::timestamptz)"""
+
         sql = f"""
         SELECT
             {left_columns_str},
@@ -266,10 +282,7 @@ class JoinToLocation(Query):
         ON
             l.location_id = sites.location_id
           AND
-            l.{self.time_col}::date BETWEEN coalesce(sites.date_of_first_service,
-                                                '-infinity'::timestamptz) AND
-                                       coalesce(sites.date_of_last_service,
-                                                'infinity'::timestamptz)
+            {in_service}
         """
 
         return sql
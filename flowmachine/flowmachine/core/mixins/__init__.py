@@ -10,5 +10,6 @@ from the Query class.
 """
 from .graph_mixin import GraphMixin
 from .geodata_mixin import GeoDataMixin
+from .incremental_mixin import IncrementalMixin
 
-__all__ = ["GraphMixin", "GeoDataMixin"]
+__all__ = ["GraphMixin", "GeoDataMixin", "IncrementalMixin"]
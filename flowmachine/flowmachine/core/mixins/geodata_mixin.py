@@ -11,11 +11,90 @@ Mixin providing utility methods for geographic type queries.
 """
 import json
 import logging
+from threading import Lock
+from typing import Optional, Union
+
+from cachetools import LRUCache
 
 from flowmachine.utils import proj4string
 
 logger = logging.getLogger("flowmachine").getChild(__name__)
 
+# Most characters of encoded geojson to keep in memory, over all queries
+GEOJSON_CACHE_SIZE = 256 * 1024 * 1024
+# Tolerances for simplifying geometries, in the units of the stored
+# geometries (degrees for the FlowDB geography tables). Roughly 10m, 100m
+# and 1km at the equator.
+SIMPLIFICATION_TOLERANCES = {"high": 0.0001, "medium": 0.001, "low": 0.01}
+
+_geojson_cache_lock = Lock()
+# Encoded geojson feature collections, keyed by (query md5, proj4 string, simplification tolerance)
+_geojson_cache = LRUCache(GEOJSON_CACHE_SIZE, getsizeof=len)
+
+
+def set_geojson_cache_size(max_size: int) -> None:
+    """
+    Set the most characters of encoded geojson to keep in memory, discarding
+    anything currently cached.
+
+    Parameters
+    ----------
+    max_size : int
+        Total length of the cached geojson strings. Set to zero to disable caching.
+    """
+    global _geojson_cache
+    with _geojson_cache_lock:
+        _geojson_cache = LRUCache(max_size, getsizeof=len)
+
+
+def clear_geojson_cache(md5: Optional[str] = None) -> None:
+    """
+    Discard cached geojson.
+
+    Parameters
+    ----------
+    md5 : str, optional
+        Only discard geojson for the query with this md5.
+    """
+    with _geojson_cache_lock:
+        if md5 is None:
+            _geojson_cache.clear()
+        else:
+            for key in [key for key in _geojson_cache if key[0] == md5]:
+                del _geojson_cache[key]
+
+
+def simplification_tolerance(
+    simplify: Union[str, float, None] = None
+) -> Optional[float]:
+    """
+    Get the tolerance to simplify geometries with.
+
+    Parameters
+    ----------
+    simplify : {None, 'full', 'high', 'medium', 'low'} or float
+        Level of detail, or a tolerance in the units of the stored geometries.
+        None or 'full' for no simplification.
+
+    Returns
+    -------
+    float or None
+        Tolerance, or None if geometries should not be simplified.
+    """
+    if simplify is None or simplify == "full":
+        return None
+    if isinstance(simplify, str):
+        try:
+            return SIMPLIFICATION_TOLERANCES[simplify]
+        except KeyError:
+            raise ValueError(
+                f"Unrecognised simplification level '{simplify}', must be one of: {['full', *SIMPLIFICATION_TOLERANCES]}"
+            )
+    tolerance = float(simplify)
+    if tolerance < 0:
+        raise ValueError("Simplification tolerance must not be negative.")
+    return tolerance if tolerance > 0 else None
+
 
 try:
     import geopandas
@@ -162,7 +241,7 @@ class GeoDataMixin:
         cols = list(set(self.column_names + ["gid", "geom"]))
         return joined_query, cols
 
-    def geojson_query(self, crs=None):
+    def geojson_query(self, crs=None, simplify=None):
         """
         Create a query which will transform each row into a geojson
         feature.
@@ -171,15 +250,24 @@ class GeoDataMixin:
         ----------
         crs : int or str
             Optionally give an integer srid, or valid proj4 string to transform output to 
+        simplify : {None, 'full', 'high', 'medium', 'low'} or float
+            Optionally simplify the geometries, preserving topology, to a level
+            of detail or with a tolerance in the units of the stored geometries.
+            Centroids are always those of the full geometries.
         
         Returns
         -------
         str
             A json aggregation query string
         """
+        tolerance = simplification_tolerance(simplify)
+        geom = "geom"
+        if tolerance is not None:
+            geom = f"ST_SimplifyPreserveTopology(geom::geometry, {tolerance!r})"
         crs_trans = "geom"
         if crs:
             crs_trans = "ST_Transform(geom::geometry, {0!r})".format(crs)
+            geom = "ST_Transform({0}::geometry, {1!r})".format(geom, crs)
         joined_query, cols = self._geo_augmented_query()
         properties = [f"'{col}', {col}" for col in cols if col not in ("geom", "gid")]
         properties.append(
@@ -190,14 +278,14 @@ class GeoDataMixin:
                 SELECT
                     'Feature' AS type,
                     gid AS id,
-                    ST_AsGeoJSON({crs_trans})::json AS geometry,
+                    ST_AsGeoJSON({geom})::json AS geometry,
                     json_build_object({", ".join(properties)}) AS properties
                 FROM (SELECT * FROM ({joined_query}) AS J) AS row
         """
 
         return json_query
 
-    def to_geojson_file(self, filename, crs=None):
+    def to_geojson_file(self, filename, crs=None, simplify=None):
         """
         Export this query to a GeoJson FeatureCollection file.
         
@@ -207,106 +295,111 @@ class GeoDataMixin:
             File to save resulting geojson as.
         crs : int or str
             Optionally give an integer srid, or valid proj4 string to transform output to
+        simplify : {None, 'full', 'high', 'medium', 'low'} or float
+            Optionally simplify the geometries, see `geojson_query`
         """
         with open(filename, "w") as fout:
-            json.dump(self.to_geojson(crs=crs), fout)
+            fout.write(self.to_geojson_string(crs=crs, simplify=simplify))
 
-    def to_geojson_string(self, crs=None):
+    def to_geojson_string(self, crs=None, simplify=None):
         """
         Parameters
         ----------
         crs : int or str
             Optionally give an integer srid, or valid proj4 string to transform output to
+        simplify : {None, 'full', 'high', 'medium', 'low'} or float
+            Optionally simplify the geometries, see `geojson_query`
         
         Returns
         -------
         str
             A string containing the this query as a GeoJson FeatureCollection.
         """
-        return json.dumps(self.to_geojson(crs=crs))
+        proj4_string = proj4string(self.connection, crs)
+        tolerance = simplification_tolerance(simplify)
+        key = (self.md5, proj4_string, tolerance)
+        with _geojson_cache_lock:
+            try:
+                return _geojson_cache[key]
+            except KeyError:
+                pass
+        js = self._get_geojson(proj4_string, tolerance)
+        if self._cache:
+            with _geojson_cache_lock:
+                try:
+                    _geojson_cache[key] = js
+                except ValueError:
+                    logger.debug(f"Geojson for {self.md5} is too large to cache.")
+        return js
 
-    def _get_geojson(self, proj4):
+    def _get_geojson(self, proj4, simplify=None):
         """
         Helper function that actually retrieves geojson from the
-        database, combines into a geojson featurecollection, and
-        sets a proj4 string on it.
+        database, combined into a geojson featurecollection with
+        a proj4 string set on it, and encoded in the database.
 
 
         Parameters
         ----------
         proj4 : str
             Valid proj4 string to project to.
+        simplify : {None, 'full', 'high', 'medium', 'low'} or float
+            Optionally simplify the geometries, see `geojson_query`
 
         Returns
         -------
-        dict
+        str
 
         """
-        features = [
-            {"type": x[0], "id": x[1], "geometry": x[2], "properties": x[3]}
-            for x in self.connection.fetch(self.geojson_query(crs=proj4))
-        ]
-        js = {
-            "properties": {"crs": proj4},
-            "type": "FeatureCollection",
-            "features": features,
-        }
-        return js
-
-    def to_geojson(self, crs=None):
+        quoted_proj4 = proj4.replace("'", "''")
+        return self.connection.fetch(
+            f"""
+            SELECT json_build_object(
+                'properties', json_build_object('crs', '{quoted_proj4}'::text),
+                'type', 'FeatureCollection',
+                'features', COALESCE(json_agg(features), '[]'::json)
+            )::text
+            FROM ({self.geojson_query(crs=proj4, simplify=simplify)}) AS features
+            """
+        )[0][0]
+
+    def to_geojson(self, crs=None, simplify=None):
         """
         Parameters
         ----------
         crs : int or str
             Optionally give an integer srid, or valid proj4 string to transform output to
+        simplify : {None, 'full', 'high', 'medium', 'low'} or float
+            Optionally simplify the geometries, see `geojson_query`
         
         Returns
         -------
         dict
             This query as a GeoJson FeatureCollection in dict form.
-        """
-        proj4_string = proj4string(self.connection, crs)
-        try:
-            js = self._geojson.get(proj4_string, self._get_geojson(proj4_string))
-        except AttributeError:
-            self._geojson = {}
-            js = self._get_geojson(proj4_string)
-        if self._cache:
-            self._geojson[proj4_string] = js
-        return js.copy()
-
-    def __getstate__(self):
-        """
-        Removes properties which should not be pickled, or hashed. Override
-        this method in your subclass if you need to add more.
 
-        Overridden to remove geojson storage.
-
-        Returns
-        -------
-        dict
-            A picklable and hash-safe copy of this objects internal dict.
+        Notes
+        -----
+        The encoded geojson is kept in a cache shared by all queries, limited
+        to `GEOJSON_CACHE_SIZE` characters in total, which discards the least
+        recently used geojson first.
         """
-        state = super().__getstate__()
-        try:
-            del state["_geojson"]
-        except:
-            pass  # Not a problem if it doesn't exist
-        return state
+        return json.loads(self.to_geojson_string(crs=crs, simplify=simplify))
 
     def turn_off_caching(self):
         """
         Turn off caching. Overridden to also remove cached geojson.
         """
-        self._geojson = {}
+        clear_geojson_cache(self.md5)
         super().turn_off_caching()
 
-    def to_geopandas(self, crs=None):
+    def to_geopandas(self, crs=None, simplify=None):
         """
         Parameters
         ----------
         crs : int or str
             Optionally give an integer srid, or valid proj4 string to transform output to
+        simplify : {None, 'full', 'high', 'medium', 'low'} or float
+            Optionally simplify the geometries, see `geojson_query`
 
         Returns
         -------
@@ -314,7 +407,7 @@ class GeoDataMixin:
             This query as a GeoPandas GeoDataFrame.
         """
 
-        js = self.to_geojson(crs=crs)
+        js = self.to_geojson(crs=crs, simplify=simplify)
         gdf = geopandas.GeoDataFrame.from_features(js["features"])
         gdf.crs = js["properties"]["crs"]
 
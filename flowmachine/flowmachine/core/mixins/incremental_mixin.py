@@ -0,0 +1,79 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Mixin for queries over a range of dates which can be assembled
+from per-day parts stored as their own cache entries.
+"""
+import logging
+from abc import ABCMeta, abstractmethod
+from typing import List
+
+logger = logging.getLogger("flowmachine").getChild(__name__)
+
+
+class IncrementalMixin(metaclass=ABCMeta):
+    """
+    Supplies incremental storage for queries over a date range which are
+    built from one part per day. When such a query is created with
+    `incremental=True` and stored, each of its parts which is not already
+    stored is stored first as its own cache entry, and the query is then
+    assembled from the stored parts. Storing the same query over a range
+    one day longer therefore only computes the new day.
+
+    Classes using this mixin must define `_incremental_parts`, and set the
+    `incremental` attribute when it is True. The attribute is left out of
+    the query's state when it is False, so the md5 of a query which isn't
+    incremental is the same as it would be without the mixin.
+
+    An incremental query over a date range is assembled from whole days, so
+    it covers the days from start up to, but not including, stop. Classes
+    whose non-incremental queries also include events at exactly midnight
+    on the stop date must say so in their docstrings.
+    """
+
+    incremental = False
+
+    @property
+    @abstractmethod
+    def _incremental_parts(self) -> List["Query"]:
+        """
+        The per-day parts this query is assembled from.
+        """
+        raise NotImplementedError
+
+    def store_parts(self) -> List["Query"]:
+        """
+        Store each per-day part of this query which is not already stored,
+        one at a time, in the calling thread.
+
+        Returns
+        -------
+        list of Query
+            The parts which were stored
+        """
+        newly_stored = []
+        for part in self._incremental_parts:
+            if not part.is_stored:
+                schema, name = part.fully_qualified_table_name.split(".")
+                part._to_sql(name, schema=schema)
+                newly_stored.append(part)
+        logger.debug(
+            f"Stored {len(newly_stored)} of {len(self._incremental_parts)} parts for {self.md5}."
+        )
+        return newly_stored
+
+    def _make_sql(self, name: str, schema=None, force=False) -> List[str]:
+        # Only compute missing parts if this query is actually going to be written
+        if self.incremental and (
+            force or not self.connection.has_table(name, schema=schema)
+        ):
+            self.store_parts()
+        return super()._make_sql(name, schema=schema, force=force)
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        if not state.get("incremental", False):
+            state.pop("incremental", None)
+        return state
@@ -18,6 +18,8 @@ from typing import List, Union
 import pandas as pd
 
 from flowmachine.utils import rlock
+from .cache import bump_cache_generation
+from .catalog_cache import refresh_catalog_cache
 from .query import Query
 
 logger = logging.getLogger("flowmachine").getChild(__name__)
@@ -166,6 +168,8 @@ class ModelResult(Query):
                         "No dataframe to store, presumably because this"
                         " was retrieved from the db."
                     )
+                refresh_catalog_cache(schema, name)
+                bump_cache_generation(self.redis)
             logger.debug("Released storage lock.")
             return self
 
@@ -0,0 +1,237 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Layouts for storing query results as declaratively partitioned tables,
+so that reads restricted to a range of dates, or to some subscribers,
+only scan the partitions they need.
+
+A partitioning is passed to `Query.store`, e.g.
+
+>>> sl = subscriber_locations("2016-01-01", "2016-03-01", level="admin3")
+>>> sl.store(partition_by=DatePartitions("2016-01-01", "2016-03-01", column="time"))
+"""
+
+import logging
+from abc import ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from flowmachine.utils import list_of_dates, time_period_add
+from .query import ROW_NUMBER_COLUMN
+
+if TYPE_CHECKING:
+    from .query import Query
+
+logger = logging.getLogger("flowmachine").getChild(__name__)
+
+
+class Partitioning(metaclass=ABCMeta):
+    """
+    Base class for ways of partitioning a stored query result.
+
+    Parameters
+    ----------
+    column : str
+        Column to partition by
+    """
+
+    def __init__(self, column: str):
+        self.column = column
+
+    @property
+    @abstractmethod
+    def partition_by(self) -> str:
+        """
+        The PARTITION BY clause for the parent table.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def partitions(self) -> List[Tuple[str, str]]:
+        """
+        The partitions to create.
+
+        Returns
+        -------
+        list of tuple
+            The suffix to append to the table name, and the bound specification
+            (e.g. "FOR VALUES FROM (...) TO (...)"), for each partition
+        """
+        raise NotImplementedError
+
+
+class DatePartitions(Partitioning):
+    """
+    Partition a stored query by day, with one partition for each day from
+    start up to stop and a default partition for any rows outside that range.
+
+    Parameters
+    ----------
+    start, stop : str
+        ISO format dates of the first day, and the day after the last day
+    column : str, default "date"
+        Date or timestamp column to partition by
+    """
+
+    def __init__(self, start: str, stop: str, column: str = "date"):
+        self.dates = list_of_dates(start, stop)[:-1]
+        if len(self.dates) == 0:
+            raise ValueError("Date partitions must cover at least one day.")
+        self.start = start
+        self.stop = stop
+        super().__init__(column)
+
+    @property
+    def partition_by(self) -> str:
+        return f"RANGE ({self.column})"
+
+    def partitions(self) -> List[Tuple[str, str]]:
+        return [
+            (
+                date.replace("-", ""),
+                f"FOR VALUES FROM ('{date}') TO ('{time_period_add(date, 1)}')",
+            )
+            for date in self.dates
+        ] + [("default", "DEFAULT")]
+
+
+class SubscriberHashPartitions(Partitioning):
+    """
+    Partition a stored query by a hash of the subscriber column.
+
+    Parameters
+    ----------
+    n_partitions : int, default 8
+        Number of partitions
+    column : str, default "subscriber"
+        Column to hash
+    """
+
+    def __init__(self, n_partitions: int = 8, column: str = "subscriber"):
+        if n_partitions < 1:
+            raise ValueError("Must have at least one partition.")
+        self.n_partitions = n_partitions
+        super().__init__(column)
+
+    @property
+    def partition_by(self) -> str:
+        return f"HASH ({self.column})"
+
+    def partitions(self) -> List[Tuple[str, str]]:
+        return [
+            (
+                f"p{remainder}",
+                f"FOR VALUES WITH (MODULUS {self.n_partitions}, REMAINDER {remainder})",
+            )
+            for remainder in range(self.n_partitions)
+        ]
+
+
+def _explain_analyse_time(connection, sql: str) -> float:
+    """
+    Run sql under EXPLAIN ANALYSE, and return the execution time in ms.
+    """
+    with connection.engine.begin() as trans:
+        plan = trans.execute(
+            f"EXPLAIN (ANALYZE TRUE, TIMING FALSE, FORMAT JSON) {sql}"
+        ).fetchall()
+    try:
+        return plan[0][0][0]["Execution Time"]
+    except (IndexError, KeyError):
+        return 0
+
+
+def _store_incremental_parts(query: "Query") -> None:
+    """
+    Store the per-day parts of an incremental query which are not already
+    stored, at most as many at once as there are query threads (and so
+    database connections).
+    """
+    parts = [part for part in query._incremental_parts if not part.is_stored]
+    if len(parts) == 0:
+        return
+
+    def store_part(part):
+        schema, name = part.fully_qualified_table_name.split(".")
+        part._to_sql(name, schema=schema)
+
+    with ThreadPoolExecutor(
+        min(query.thread_pool_size, len(parts)), thread_name_prefix="flowmachine-part"
+    ) as pool:
+        list(pool.map(store_part, parts))
+    logger.debug(f"Stored {len(parts)} parts for {query.md5}.")
+
+
+def store_partitioned(
+    query: "Query", name: str, schema: Optional[str], partitioning: Partitioning
+) -> float:
+    """
+    Store the result of a query as a partitioned table, with its indexes
+    created on every partition, and its rows numbered as for any stored result.
+
+    The query is run once, by a single insert into the partitioned table,
+    and postgres routes each row to its partition. An incremental query
+    first stores each of the per-day parts it is assembled from which is
+    not already stored, several at once, so the insert reads them from cache.
+
+    The caller should hold the query's storage lock. If filling fails, the
+    table is dropped.
+
+    Parameters
+    ----------
+    query : Query
+        Query to store
+    name : str
+        Name of the table
+    schema : str or None
+        Schema of the table, or None to use the postgres default
+    partitioning : Partitioning
+        How to partition the table
+
+    Returns
+    -------
+    float
+        Total time spent computing the partitions, in ms
+    """
+    full_name = name if schema is None else f"{schema}.{name}"
+    if getattr(query, "incremental", False):
+        _store_incremental_parts(query)
+    select = f"""SELECT {query.column_names_as_string_list}, row_number() OVER () AS {ROW_NUMBER_COLUMN}
+        FROM ({query.get_query()}) _"""
+    partitions = partitioning.partitions()
+    con = query.connection.engine
+    with con.begin() as trans:
+        # Get the column types without running the query
+        trans.execute(
+            f"CREATE TEMPORARY TABLE {name}_template ON COMMIT DROP AS {select} WITH NO DATA"
+        )
+        trans.execute(
+            f"CREATE TABLE {full_name} (LIKE {name}_template) PARTITION BY {partitioning.partition_by}"
+        )
+        for suffix, bounds in partitions:
+            trans.execute(
+                f"CREATE TABLE {full_name}_{suffix} PARTITION OF {full_name} {bounds}"
+            )
+    logger.debug(f"Created {len(partitions)} partitions for {full_name}.")
+    try:
+        compute_time = _explain_analyse_time(
+            query.connection, f"INSERT INTO {full_name} {select}"
+        )
+        with con.begin() as trans:
+            trans.execute(f"CREATE INDEX ON {full_name} ({ROW_NUMBER_COLUMN})")
+            for ix in query.index_cols:
+                trans.execute(
+                    "CREATE INDEX ON {tbl} ({ixen})".format(
+                        tbl=full_name, ixen=",".join(ix) if isinstance(ix, list) else ix
+                    )
+                )
+            trans.execute(f"ANALYZE {full_name}")
+    except Exception as e:
+        logger.error(f"Error filling partitions of {full_name}: {e}")
+        with con.begin() as trans:
+            trans.execute(f"DROP TABLE IF EXISTS {full_name} CASCADE")
+        raise
+    logger.debug(f"Filled partitions of {full_name} in {compute_time}ms.")
+    return compute_time
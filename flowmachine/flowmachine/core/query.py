@@ -11,9 +11,11 @@ defines methods that returns the query as a string and as a pandas dataframe.
 import json
 import pickle
 import logging
+import threading
 import weakref
+from collections import Counter
 from concurrent.futures import Future
-from typing import List, Union
+from typing import List, Optional, Union, TYPE_CHECKING
 
 import psycopg2
 import networkx as nx
@@ -23,7 +25,14 @@ from hashlib import md5
 
 from sqlalchemy.exc import ResourceClosedError
 
-from flowmachine.core.cache import touch_cache
+from flowmachine.core.cache import (
+    bump_cache_generation,
+    notify_query_stored,
+    get_cache_generation,
+    touch_cache,
+    touch_cache_many,
+)
+from flowmachine.core.catalog_cache import refresh_catalog_cache
 from flowmachine.utils import rlock
 from abc import ABCMeta, abstractmethod
 
@@ -31,6 +40,9 @@ from .errors import NameTooLongError, NotConnectedError
 
 import flowmachine
 
+if TYPE_CHECKING:
+    from .partitioning import Partitioning
+
 logger = logging.getLogger("flowmachine").getChild(__name__)
 
 # This is the maximum length that postgres will allow for its
@@ -38,6 +50,141 @@ logger = logging.getLogger("flowmachine").getChild(__name__)
 # and removes this restriction.
 MAX_POSTGRES_NAME_LENGTH = 63
 
+# Holds the _SQLResolution for the get_query call currently building sql in this thread
+_resolving = threading.local()
+
+# Default number of rows fetched at a time when getting a dataframe in chunks
+DEFAULT_CHUNKSIZE = 100_000
+
+# Column numbering the rows of a stored result, which is indexed so that the
+# result can be paged through in a stable order
+ROW_NUMBER_COLUMN = "_row_number"
+
+
+def _compact_dtypes(df: pd.DataFrame, categorical_columns: List[str]) -> pd.DataFrame:
+    """
+    Shrink the dtypes of a dataframe in place: integer columns are downcast
+    to the smallest integer type which holds them, and the named columns
+    are made categorical.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Dataframe to shrink
+    categorical_columns : list of str
+        Columns to make categorical, where present
+
+    Returns
+    -------
+    pandas.DataFrame
+        The same dataframe
+    """
+    for column in df.columns:
+        if column in categorical_columns:
+            df[column] = df[column].astype("category")
+        elif pd.api.types.is_integer_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], downcast="integer")
+    return df
+
+
+def _concat_chunks(chunks: List[pd.DataFrame], columns: List[str]) -> pd.DataFrame:
+    """
+    Concatenate dataframes fetched in chunks, keeping categorical columns
+    categorical by giving them the union of the categories in every chunk.
+
+    Parameters
+    ----------
+    chunks : list of pandas.DataFrame
+        Chunks to concatenate
+    columns : list of str
+        Columns of the result, used when there are no chunks
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    if len(chunks) == 0:
+        return pd.DataFrame(columns=columns)
+    for column in chunks[0].columns:
+        if pd.api.types.is_categorical_dtype(chunks[0][column]):
+            categories = pd.api.types.union_categoricals(
+                [chunk[column] for chunk in chunks]
+            ).categories
+            for chunk in chunks:
+                chunk[column] = chunk[column].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True, copy=False)
+
+
+class _SQLResolution:
+    """
+    The stored tables for the queries in a tree, shared by all the
+    `get_query` calls made while building the sql for the root of the tree.
+    Which queries are stored is looked up for the whole tree at once.
+
+    Parameters
+    ----------
+    connection : Connection
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.stored_tables = {}  # md5 -> stored table name, or None if not stored
+        self.used = set()  # md5s of the stored queries the sql selects from
+        self.making = set()  # md5s of the queries currently making their sql
+        self.lookups = 0
+        self.get_query_calls = 0
+
+    def look_up(self, query: "Query") -> None:
+        """
+        Find out which queries in the tree below `query` are stored, for
+        any not already known, in one database query.
+        """
+        unknown = {}
+        openlist = [query]
+        while openlist:
+            q = openlist.pop()
+            if q.md5 in self.stored_tables or q.md5 in unknown:
+                continue
+            try:
+                unknown[q.md5] = q.fully_qualified_table_name
+            except NotImplementedError:
+                self.stored_tables[q.md5] = None
+            openlist += list(q.dependencies)
+        if len(unknown) == 0:
+            return
+        ids = ", ".join(f"'{md5}'" for md5 in unknown)
+        stored = {
+            query_id
+            for query_id, in self.connection.fetch(
+                f"""SELECT query_id FROM cache.cached
+                WHERE query_id IN ({ids}) AND NOT class='Table'
+                AND to_regclass(schema || '.' || tablename) IS NOT NULL"""
+            )
+        }
+        self.lookups += 1
+        for md5, table_name in unknown.items():
+            self.stored_tables[md5] = table_name if md5 in stored else None
+
+    def get_query(self, query: "Query") -> str:
+        """
+        Get the sql for a query in the tree, selecting from its table if it is stored.
+        """
+        self.get_query_calls += 1
+        if query.md5 in self.making:
+            # A query whose sql depends on storing itself, as for model results
+            return query._get_query_checking_stored()
+        if query.md5 not in self.stored_tables:
+            self.look_up(query)
+        table_name = self.stored_tables[query.md5]
+        if table_name is not None:
+            self.used.add(query.md5)
+            return f"SELECT {query.column_names_as_string_list} FROM {table_name}"
+        self.making.add(query.md5)
+        try:
+            return query._make_query()
+        finally:
+            self.making.discard(query.md5)
+
 
 class Query(metaclass=ABCMeta):
     """
@@ -54,6 +201,13 @@ class Query(metaclass=ABCMeta):
     """
 
     _QueryPool = weakref.WeakValueDictionary()
+    # Counts of sql built from scratch ("resolutions"), sql reused ("memo_hits"), and
+    # database and redis round trips saved compared with checking each query in the tree
+    sql_resolution_stats = Counter()
+    _sql_resolution_stats_lock = threading.Lock()
+    # Queries which many others are built from, and are stored before any query
+    # using them is stored, so that its sql selects from their table
+    _store_before_use = False
 
     def __init__(self, cache=True):
         obj = Query._QueryPool.get(self.md5)
@@ -181,12 +335,65 @@ class Query(metaclass=ABCMeta):
         Returns a  string representing an SQL query. The string will point
         to the database cache of this query if it exists.
 
+        Which of the queries in the tree are stored is looked up for the
+        whole tree at once, and the sql is remembered until a query is next
+        stored in or removed from cache.
+
         Returns
         -------
         str
             SQL query string.
 
         """
+        resolution = getattr(_resolving, "resolution", None)
+        if resolution is not None:
+            # Part of building the sql for a query above this one
+            return resolution.get_query(self)
+        generation = get_cache_generation(self.redis)
+        try:
+            memo_generation, sql, used, round_trips = self._sql_memo
+            if memo_generation == generation:
+                touch_cache_many(self.connection, used)
+                Query._count_sql_resolution(
+                    memo_hits=1, round_trips_saved=round_trips - 1 - (1 if used else 0)
+                )
+                return sql
+        except AttributeError:
+            pass  # Not built yet
+
+        resolution = _SQLResolution(self.connection)
+        _resolving.resolution = resolution
+        try:
+            sql = resolution.get_query(self)
+        finally:
+            _resolving.resolution = None
+        used = sorted(resolution.used)
+        touch_cache_many(self.connection, used)
+        # Checking each query separately takes a lock and a table lookup for each,
+        # and touches the cache record of each stored query used
+        round_trips = 2 * resolution.get_query_calls + len(used)
+        self._sql_memo = (generation, sql, used, round_trips)
+        Query._count_sql_resolution(
+            resolutions=1,
+            round_trips_saved=round_trips - 1 - resolution.lookups - (1 if used else 0),
+        )
+        return sql
+
+    @classmethod
+    def _count_sql_resolution(cls, **counts):
+        with cls._sql_resolution_stats_lock:
+            cls.sql_resolution_stats.update(counts)
+
+    def _get_query_checking_stored(self):
+        """
+        Returns a string representing an SQL query, checking whether this
+        query alone is stored.
+
+        Returns
+        -------
+        str
+            SQL query string.
+        """
         try:
             table_name = self.fully_qualified_table_name
             schema, name = table_name.split(".")
@@ -199,16 +406,120 @@ class Query(metaclass=ABCMeta):
                         # which will call through to this method from their `_make_query` method while writing metadata.
                     # In that scenario, the table _is_ written, but won't be visible from the connection touch_cache uses
                     # as the cache metadata transaction isn't complete!
-                    return "SELECT * FROM {}".format(table_name)
+                    return "SELECT {} FROM {}".format(
+                        self.column_names_as_string_list, table_name
+                    )
         except NotImplementedError:
             pass
         return self._make_query()
 
-    def get_dataframe_async(self):
+    @property
+    def _categorical_columns(self) -> List[str]:
+        """
+        Columns which hold location codes, and so take few distinct values
+        relative to the number of rows. These are made categorical when
+        getting the result in chunks with compact dtypes.
+        """
+        try:
+            from flowmachine.utils import get_columns_for_level
+
+            location_columns = [
+                col
+                for col in get_columns_for_level(
+                    self.level, getattr(self, "column_name", None)
+                )
+                if col not in {"lat", "lon"}
+            ]
+        except (AttributeError, ValueError):
+            return []
+        return [
+            col
+            for col in self.column_names
+            if col in location_columns
+            or any(
+                col == f"{loc}_{end}"
+                for loc in location_columns
+                for end in ("from", "to")
+            )
+        ]
+
+    def iter_dataframes(self, chunksize: int = DEFAULT_CHUNKSIZE, compact: bool = True):
+        """
+        Execute the query and yield the result as a sequence of pandas
+        dataframes of at most `chunksize` rows.
+
+        The result is read through a server side cursor, so at most one
+        chunk is held in memory at once, however large the result.
+        Does not use or fill the cached dataframe.
+
+        Parameters
+        ----------
+        chunksize : int, default 100000
+            Most rows in each dataframe
+        compact : bool, default True
+            If True, downcast integer columns to the smallest integer type
+            which holds them, and make location code columns categorical.
+
+        Yields
+        ------
+        pandas.DataFrame
+            The next chunk of rows of the result
+
+        Examples
+        --------
+        >>> sizes = [len(chunk) for chunk in daily_location("2016-01-01").iter_dataframes(chunksize=200)]
+        [200, 200, 100]
+        """
+        if chunksize < 1:
+            raise ValueError("chunksize must be at least 1.")
+        qur = f"SELECT {self.column_names_as_string_list} FROM ({self.get_query()}) _"
+        columns = self.column_names
+        categorical_columns = self._categorical_columns if compact else []
+        conn = self.connection.engine.raw_connection()
+        try:
+            # A named cursor is a server side cursor, which fetches only as many rows as asked for
+            with conn.cursor(name=f"iter_{self.md5}_{id(conn)}") as cur:
+                cur.itersize = chunksize
+                cur.execute(qur)
+                while True:
+                    rows = cur.fetchmany(chunksize)
+                    if len(rows) == 0:
+                        break
+                    chunk = pd.DataFrame.from_records(
+                        rows, columns=columns, coerce_float=True
+                    )
+                    del rows
+                    if compact:
+                        chunk = _compact_dtypes(chunk, categorical_columns)
+                    yield chunk
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_dataframe_async(
+        self,
+        chunked: bool = False,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+        copy: bool = True,
+    ):
         """
         Execute the query in a worker thread and return a future object
         which will contain the result as a pandas dataframe when complete.
 
+        Parameters
+        ----------
+        chunked : bool, default False
+            If True, read the result in chunks through a server side cursor,
+            and give it compact dtypes (see `iter_dataframes`), instead of
+            reading it all at once. Chunked results are never cached.
+        chunksize : int, default 100000
+            Rows to read at a time when `chunked` is True
+        copy : bool, default True
+            If caching is on, return a copy of the cached dataframe, so that
+            changes to it don't affect the cache. Set to False to return the
+            cached dataframe itself, which avoids holding two copies of large
+            results in memory, but must not be modified.
+
         Returns
         -------
         Future
@@ -221,37 +532,66 @@ class Query(metaclass=ABCMeta):
 
         """
 
+        def fetch():
+            if chunked:
+                return _concat_chunks(
+                    list(self.iter_dataframes(chunksize=chunksize)), self.column_names
+                )
+            qur = (
+                f"SELECT {self.column_names_as_string_list} FROM ({self.get_query()}) _"
+            )
+            with self.connection.engine.begin():
+                return pd.read_sql_query(qur, con=self.connection.engine)
+
         def do_get():
-            if self._cache:
+            # Only whole results are cached, so that a chunked result's dtypes
+            # don't change what later plain calls return
+            if self._cache and not chunked:
                 try:
-                    return self._df.copy()
+                    df = self._df
                 except AttributeError:
-                    qur = f"SELECT {self.column_names_as_string_list} FROM ({self.get_query()}) _"
-                    with self.connection.engine.begin():
-                        self._df = pd.read_sql_query(qur, con=self.connection.engine)
-
-                    return self._df.copy()
+                    df = fetch()
+                    self._df = df
+                return df.copy() if copy else df
             else:
-                qur = f"SELECT {self.column_names_as_string_list} FROM ({self.get_query()}) _"
-                with self.connection.engine.begin():
-                    return pd.read_sql_query(qur, con=self.connection.engine)
+                return fetch()
 
         df_future = self.tp.submit(do_get)
         return df_future
 
-    def get_dataframe(self):
+    def get_dataframe(
+        self,
+        chunked: bool = False,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+        copy: bool = True,
+    ):
         """
         Executes the query and return the result as a pandas dataframe.
         This should be executed with care, as the results may consume large
         amounts of memory.
 
+        Parameters
+        ----------
+        chunked : bool, default False
+            If True, read the result in chunks through a server side cursor,
+            and give it compact dtypes (see `iter_dataframes`), instead of
+            reading it all at once. Chunked results are never cached.
+        chunksize : int, default 100000
+            Rows to read at a time when `chunked` is True
+        copy : bool, default True
+            If caching is on, return a copy of the cached dataframe. Set to
+            False to return the cached dataframe itself, which must then not
+            be modified.
+
         Returns
         -------
         pandas.DataFrame
             DataFrame containing results of the query.
 
         """
-        return self.get_dataframe_async().result()
+        return self.get_dataframe_async(
+            chunked=chunked, chunksize=chunksize, copy=copy
+        ).result()
 
     @property
     @abstractmethod
@@ -344,7 +684,7 @@ class Query(metaclass=ABCMeta):
 
         from .union import Union
 
-        return Union(self, other, all)
+        return Union(self, other, all=all)
 
     def join(
         self,
@@ -429,7 +769,8 @@ class Query(metaclass=ABCMeta):
     ) -> List[str]:
         """
         Create the SQL necessary to store the result of the calculation back
-        into the database.
+        into the database. The stored rows are numbered in an indexed column,
+        `ROW_NUMBER_COLUMN`, so that the result can be paged through.
 
         Parameters
         ----------
@@ -458,8 +799,10 @@ class Query(metaclass=ABCMeta):
             return []
 
         Q = f"""EXPLAIN (ANALYZE TRUE, TIMING FALSE, FORMAT JSON) CREATE TABLE {full_name} AS 
-            (SELECT {self.column_names_as_string_list} FROM ({self._make_query() if force else self.get_query()}) _)"""
+            (SELECT {self.column_names_as_string_list}, row_number() OVER () AS {ROW_NUMBER_COLUMN}
+            FROM ({self._make_query() if force else self.get_query()}) _)"""
         queries.append(Q)
+        queries.append(f"CREATE INDEX ON {full_name} ({ROW_NUMBER_COLUMN})")
         for ix in self.index_cols:
             queries.append(
                 "CREATE INDEX ON {tbl} ({ixen})".format(
@@ -469,7 +812,11 @@ class Query(metaclass=ABCMeta):
         return queries
 
     def to_sql(
-        self, name: str, schema: Union[str, None] = None, force: bool = False
+        self,
+        name: str,
+        schema: Union[str, None] = None,
+        force: bool = False,
+        partition_by: Optional["Partitioning"] = None,
     ) -> Future:
         """
         Store the result of the calculation back into the database.
@@ -483,6 +830,8 @@ class Query(metaclass=ABCMeta):
             see postgres docs for more info.
         force : bool, default False
             Will overwrite an existing table if the name already exists
+        partition_by : Partitioning, optional
+            Store the result as a partitioned table, laid out as given.
 
         Returns
         -------
@@ -501,44 +850,166 @@ class Query(metaclass=ABCMeta):
             ).format(name, len(name), MAX_POSTGRES_NAME_LENGTH)
             raise NameTooLongError(err_msg)
 
-        def do_query() -> Query:
+        store_future = self.tp.submit(self._to_sql, name, schema, force, partition_by)
+        return store_future
+
+    def _to_sql(
+        self,
+        name: str,
+        schema: Union[str, None] = None,
+        force: bool = False,
+        partition_by: Optional["Partitioning"] = None,
+    ) -> "Query":
+        """
+        Store the result of the calculation back into the database, blocking
+        until it is stored. Called in a worker thread by `to_sql`. Queries
+        below this one which are stored before use are stored first.
+
+        Parameters
+        ----------
+        name : str
+            name of the table
+        schema : str, default None
+            Name of an existing schema. If none will use the postgres default,
+            see postgres docs for more info.
+        force : bool, default False
+            Will overwrite an existing table if the name already exists
+        partition_by : Partitioning, optional
+            Store the result as a partitioned table, laid out as given.
+
+        Returns
+        -------
+        Query
+            This query
+        """
+        try:
+            self._store_dependencies_stored_before_use()
             logger.debug("Getting storage lock.")
             with rlock(self.redis, self.md5):
                 logger.debug("Obtained storage lock.")
-                query_ddl_ops = self._make_sql(name, schema=schema, force=force)
-                logger.debug("Made SQL.")
-                con = self.connection.engine
-                if force:
-                    self.invalidate_db_cache(name, schema=schema)
-                plan_time = 0
-                with con.begin():
-                    ddl_op_results = []
-                    for ddl_op in query_ddl_ops:
-                        try:
-                            ddl_op_result = con.execute(ddl_op)
-                        except Exception as e:
-                            logger.error(
-                                f"Error executing SQL: '{ddl_op}'. Error was {e}"
-                            )
-                            raise e
-                        try:
-                            ddl_op_results.append(ddl_op_result.fetchall())
-                        except ResourceClosedError:
-                            pass  # Nothing to do here
-                        for ddl_op_result in ddl_op_results:
-                            try:
-                                plan = ddl_op_result[0][0][0]  # Should be a query plan
-                                plan_time += plan["Execution Time"]
-                            except (IndexError, KeyError):
-                                pass  # Not an explain result
-                    logger.debug("Executed queries.")
-                    if schema == "cache":
-                        self._db_store_cache_metadata(compute_time=plan_time)
-            logger.debug("Released storage lock.")
-            return self
+                if partition_by is not None:
+                    self._to_partitioned_sql(name, schema, force, partition_by)
+                else:
+                    self._to_unpartitioned_sql(name, schema, force)
+        except Exception:
+            if schema == "cache":
+                notify_query_stored(self.connection, self.md5, "error")
+            raise
+        logger.debug("Released storage lock.")
+        if schema == "cache":
+            notify_query_stored(self.connection, self.md5)
+        return self
 
-        store_future = self.tp.submit(do_query)
-        return store_future
+    def _store_dependencies_stored_before_use(self) -> None:
+        """
+        Store any unstored queries in the tree below this one which are
+        stored before they are used (`_store_before_use`), blocking until
+        they are stored. Called by `_to_sql` before storing this query.
+        """
+        seen = set()
+        openlist = list(self.dependencies)
+        while openlist:
+            query = openlist.pop()
+            if query.md5 in seen:
+                continue
+            seen.add(query.md5)
+            if query._store_before_use and not query.is_stored:
+                schema, name = query.fully_qualified_table_name.split(".")
+                query._to_sql(name, schema=schema)
+            openlist += list(query.dependencies)
+
+    def _to_unpartitioned_sql(
+        self, name: str, schema: Union[str, None], force: bool
+    ) -> "Query":
+        """
+        Store the result of the calculation as a single table. Should be
+        called by `_to_sql` while holding the storage lock.
+
+        Parameters
+        ----------
+        name : str
+            name of the table
+        schema : str or None
+            Name of an existing schema, or None to use the postgres default
+        force : bool
+            Will overwrite an existing table if the name already exists
+
+        Returns
+        -------
+        Query
+            This query
+        """
+        query_ddl_ops = self._make_sql(name, schema=schema, force=force)
+        logger.debug("Made SQL.")
+        con = self.connection.engine
+        if force:
+            self.invalidate_db_cache(name, schema=schema)
+        plan_time = 0
+        with con.begin():
+            ddl_op_results = []
+            for ddl_op in query_ddl_ops:
+                try:
+                    ddl_op_result = con.execute(ddl_op)
+                except Exception as e:
+                    logger.error(f"Error executing SQL: '{ddl_op}'. Error was {e}")
+                    raise e
+                try:
+                    ddl_op_results.append(ddl_op_result.fetchall())
+                except ResourceClosedError:
+                    pass  # Nothing to do here
+                for ddl_op_result in ddl_op_results:
+                    try:
+                        plan = ddl_op_result[0][0][0]  # Should be a query plan
+                        plan_time += plan["Execution Time"]
+                    except (IndexError, KeyError):
+                        pass  # Not an explain result
+            logger.debug("Executed queries.")
+            if schema == "cache":
+                self._db_store_cache_metadata(compute_time=plan_time)
+        refresh_catalog_cache(schema, name)
+        bump_cache_generation(self.redis)
+        return self
+
+    def _to_partitioned_sql(
+        self,
+        name: str,
+        schema: Union[str, None],
+        force: bool,
+        partition_by: "Partitioning",
+    ) -> "Query":
+        """
+        Store the result of the calculation as a partitioned table. Should be
+        called by `_to_sql` while holding the storage lock.
+
+        Parameters
+        ----------
+        name : str
+            name of the table
+        schema : str or None
+            Name of an existing schema, or None to use the postgres default
+        force : bool
+            Will overwrite an existing table if the name already exists
+        partition_by : Partitioning
+            How to partition the table
+
+        Returns
+        -------
+        Query
+            This query
+        """
+        from .partitioning import store_partitioned
+
+        if self.connection.has_table(name, schema=schema) and not force:
+            logger.info("Table already exists")
+            return self
+        if force:
+            self.invalidate_db_cache(name, schema=schema)
+        compute_time = store_partitioned(self, name, schema, partition_by)
+        if schema == "cache":
+            self._db_store_cache_metadata(compute_time=compute_time)
+        refresh_catalog_cache(schema, name)
+        bump_cache_generation(self.redis)
+        return self
 
     def explain(self, format="text", analyse=False):
         """
@@ -642,7 +1113,7 @@ class Query(metaclass=ABCMeta):
         except NotImplementedError:
             return False
 
-    def store(self, force=False):
+    def store(self, force=False, partition_by=None):
         """
         Store the results of this computation with the correct table
         name using a background thread.
@@ -651,6 +1122,9 @@ class Query(metaclass=ABCMeta):
         ----------
         force : bool, default False
             Will overwrite an existing table if the name already exists
+        partition_by : Partitioning, optional
+            Store the result as a partitioned table, laid out as given, e.g.
+            `DatePartitions(start, stop)` for one partition per day.
 
         Returns
         -------
@@ -666,9 +1140,42 @@ class Query(metaclass=ABCMeta):
 
         schema, name = table_name.split(".")
 
-        store_future = self.to_sql(name, schema=schema, force=force)
+        if partition_by is None:
+            store_future = self.to_sql(name, schema=schema, force=force)
+        else:
+            store_future = self.to_sql(
+                name, schema=schema, force=force, partition_by=partition_by
+            )
         return store_future
 
+    def store_with_dependencies(self, max_parallel=None):
+        """
+        Store the results of this computation, after storing each unstored
+        query it is built from, starting with those which depend on nothing
+        unstored. Queries which don't depend on each other are stored in
+        parallel, and the stored subqueries stay in cache for reuse.
+
+        Parameters
+        ----------
+        max_parallel : int, optional
+            Most queries to store at once. Defaults to the size of the
+            thread pool.
+
+        Returns
+        -------
+        Future
+            Future object which can be queried to check the query
+            is stored.
+
+        See Also
+        --------
+        flowmachine.core.store_scheduler.StoreScheduler
+            To follow the progress of the stores, and see how long each took.
+        """
+        from .store_scheduler import StoreScheduler
+
+        return StoreScheduler(self, max_parallel=max_parallel).start()
+
     def _db_store_cache_metadata(self, compute_time=None):
         """
         Helper function for store, updates flowmachine metadata table to
@@ -840,6 +1347,8 @@ class Query(metaclass=ABCMeta):
                                 self.fully_qualified_table_name
                             )
                         )
+                if drop:
+                    refresh_catalog_cache(*self.fully_qualified_table_name.split("."))
 
                 if cascade:
                     for rec in deps:
@@ -862,6 +1371,9 @@ class Query(metaclass=ABCMeta):
             logger.debug("Dropping {}".format(full_name))
             with con.begin():
                 con.execute("DROP TABLE IF EXISTS {}".format(full_name))
+            if name is not None:
+                refresh_catalog_cache(schema, name)
+            bump_cache_generation(self.redis)
 
     @property
     def index_cols(self):
@@ -926,6 +1438,7 @@ class Query(metaclass=ABCMeta):
             "_cols",
             "_md5",
             "_runtime",
+            "_sql_memo",
         ]
         for k in bad_keys:
             try:
@@ -0,0 +1,212 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger("flowmachine").getChild(__name__)
+
+# Actions which construct query objects or generate sql, and may take a while.
+# Everything else is a quick lookup, except get_query_metadata when it is asked
+# for the sql too.
+QUERY_ACTIONS = {"run_query", "run_query_batch", "get_sql", "get_geography"}
+
+
+class ServerBusyError(Exception):
+    """
+    Custom exception to indicate that an action could not be accepted
+    because the pool it runs in is full.
+    """
+
+
+class ActionMetrics:
+    """
+    Records how long each action spends waiting for a thread and in total,
+    and how many times it was turned away because the server was busy.
+
+    Parameters
+    ----------
+    n_samples : int, default 1000
+        Number of recent durations to keep for each action, used for percentiles.
+    """
+
+    def __init__(self, n_samples: int = 1000):
+        self.counts = defaultdict(int)
+        self.rejected = defaultdict(int)
+        self.queue_times = defaultdict(lambda: deque(maxlen=n_samples))
+        self.durations = defaultdict(lambda: deque(maxlen=n_samples))
+
+    def record(self, action: str, queue_time: float, duration: float) -> None:
+        """
+        Record one completed action.
+
+        Parameters
+        ----------
+        action : str
+            Name of the action
+        queue_time : float
+            Seconds spent waiting for a thread
+        duration : float
+            Seconds from submission to completion
+        """
+        self.counts[action] += 1
+        self.queue_times[action].append(queue_time)
+        self.durations[action].append(duration)
+
+    def record_rejected(self, action: str) -> None:
+        """
+        Record that an action was turned away.
+
+        Parameters
+        ----------
+        action : str
+            Name of the action
+        """
+        self.rejected[action] += 1
+
+    def summary(self) -> Dict[str, dict]:
+        """
+        Summarise the metrics for each action.
+
+        Returns
+        -------
+        dict
+            Mapping from action name to a dict of the number completed and
+            rejected, and the median, 99th percentile and maximum durations
+            and mean queue time in seconds, over recent calls.
+        """
+        summary = {}
+        for action in set(self.counts) | set(self.rejected):
+            durations = sorted(self.durations[action])
+            queue_times = self.queue_times[action]
+            summary[action] = dict(
+                count=self.counts[action],
+                rejected=self.rejected[action],
+                p50=_percentile(durations, 50),
+                p99=_percentile(durations, 99),
+                max=durations[-1] if durations else None,
+                mean_queue_time=sum(queue_times) / len(queue_times)
+                if queue_times
+                else None,
+            )
+        return summary
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[int(round(q / 100 * (len(sorted_values) - 1)))]
+
+
+class ActionExecutor:
+    """
+    Runs action handlers in bounded thread pools, so that their blocking
+    database and redis calls don't hold up the event loop which receives
+    and answers messages.
+
+    Quick lookups and slower query actions run in separate pools, so that
+    a backlog of query construction doesn't delay polling. Once a pool has
+    `max_queued` actions waiting on top of those running, further actions
+    for it are rejected with a `ServerBusyError` rather than queued.
+
+    Parameters
+    ----------
+    lookup_threads : int
+        Number of threads for quick lookups (e.g. poll, get_params)
+    query_threads : int
+        Number of threads for query actions (see `QUERY_ACTIONS`)
+    max_queued : int
+        Number of actions which may wait for a thread in each pool
+    """
+
+    def __init__(self, lookup_threads: int, query_threads: int, max_queued: int):
+        sizes = {"lookup": lookup_threads, "query": query_threads}
+        self.pools = {
+            name: ThreadPoolExecutor(
+                size, thread_name_prefix=f"flowmachine-server-{name}"
+            )
+            for name, size in sizes.items()
+        }
+        self.capacity = {name: size + max_queued for name, size in sizes.items()}
+        self.in_flight = {name: 0 for name in sizes}
+        self.metrics = ActionMetrics()
+
+    @staticmethod
+    def pool_for(action: str, action_params: Optional[dict] = None) -> str:
+        """
+        Name of the pool the given action runs in, with the given parameters.
+        """
+        if action == "get_query_metadata":
+            include_sql = (action_params or {}).get("include_sql", False)
+            return "query" if include_sql else "lookup"
+        return "query" if action in QUERY_ACTIONS else "lookup"
+
+    async def run(
+        self, action: str, func: Callable, *args, action_params: Optional[dict] = None
+    ):
+        """
+        Run func(*args) in the pool for action, and return the result.
+
+        Parameters
+        ----------
+        action : str
+            Name of the action, used to pick a pool and record metrics
+        func : callable
+            Blocking function to run
+        args
+            Arguments to pass to func
+        action_params : dict, optional
+            Parameters of the action, for actions whose pool depends on them
+
+        Returns
+        -------
+        Whatever func returns
+
+        Raises
+        ------
+        ServerBusyError
+            If the pool is full
+        """
+        pool = self.pool_for(action, action_params)
+        if self.in_flight[pool] >= self.capacity[pool]:
+            self.metrics.record_rejected(action)
+            raise ServerBusyError(
+                f"Server is busy, too many '{pool}' actions waiting. Try again later."
+            )
+        self.in_flight[pool] += 1
+        loop = asyncio.get_event_loop()
+        submitted = time.monotonic()
+        started = submitted
+
+        def timed():
+            nonlocal started
+            started = time.monotonic()
+            return func(*args)
+
+        def done(finished: float):
+            self.in_flight[pool] -= 1
+            self.metrics.record(action, started - submitted, finished - submitted)
+            logger.debug(
+                f"Action '{action}' waited {started - submitted:.4f}s and took {finished - started:.4f}s."
+            )
+
+        future = self.pools[pool].submit(timed)
+        # The slot is only freed once the thread has finished with the action,
+        # even if whatever awaits it is cancelled first. Added before awaiting,
+        # so the slot is free by the time the result is returned.
+        future.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(done, time.monotonic())
+        )
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def shutdown(self) -> None:
+        """
+        Shut down the thread pools, without waiting for running actions.
+        """
+        for pool in self.pools.values():
+            pool.shutdown(wait=False)
@@ -8,6 +8,8 @@ from json import dumps, loads, JSONDecodeError
 
 from flowmachine.core import Query, GeoTable
 from flowmachine.core.cache import get_query_object_by_id, cache_table_exists
+from flowmachine.core.catalog_cache import get_table_columns
+from flowmachine.core.query import ROW_NUMBER_COLUMN
 from flowmachine.features import (
     daily_location,
     ModalLocation,
@@ -211,6 +213,7 @@ def construct_query_object(query_kind, params):  # pragma: no cover
                 table=event_types,
                 level=level,
                 subscriber_subset=subscriber_subset,
+                incremental=params.get("incremental", False),
             )
             logger.debug(f"Made TotalLocationEvents query. {q.__dict__}")
         except Exception as e:
@@ -218,6 +221,7 @@ def construct_query_object(query_kind, params):  # pragma: no cover
     elif "modal_location" == query_kind:
         locations = params["locations"]
         aggregation_unit = params["aggregation_unit"]
+        incremental = params.get("incremental", False)
         try:
             location_objects = []
             for loc in locations:
@@ -233,7 +237,7 @@ def construct_query_object(query_kind, params):  # pragma: no cover
                 params = loc["params"]
                 dl = construct_query_object(query_kind, params)
                 location_objects.append(dl)
-            q = ModalLocation(*location_objects)
+            q = ModalLocation(*location_objects, incremental=incremental)
         except Exception as e:
             raise QueryProxyError(f"{error_msg_prefix}: '{e}'")
 
@@ -369,6 +373,40 @@ def get_sql_for_query_id(query_id):
     return sql
 
 
+def get_result_info_for_query_id(query_id):
+    """
+    Return the name of the table which stores the result of the query with
+    the given id, its columns, and the indexed column numbering its rows,
+    which is the key to page through the result by.
+
+    Parameters
+    ----------
+    query_id : str
+        The query id
+
+    Returns
+    -------
+    dict
+        With keys "table_name", "columns" and "key_column"
+
+    Raises
+    ------
+    QueryProxyError
+        If the stored result has no row numbers to page by
+    """
+    q = get_query_object_by_id(Query.connection, query_id)
+    schema, name = q.fully_qualified_table_name.split(".")
+    if ROW_NUMBER_COLUMN not in get_table_columns(Query.connection, schema, name):
+        raise QueryProxyError(
+            f"Result of query with id '{query_id}' can't be paged through."
+        )
+    return {
+        "table_name": q.fully_qualified_table_name,
+        "columns": q.column_names,
+        "key_column": ROW_NUMBER_COLUMN,
+    }
+
+
 class QueryProxy:
     """
     This class acts as the interface and "translator" between the
@@ -517,3 +555,60 @@ class QueryProxy:
             raise MissingQueryError(
                 query_id, msg=f"Query with id '{query_id}' does not exist"
             )
+
+    def get_result_info(self):
+        """
+        For a query which has been completed, return the name of the table
+        storing its result, its columns and the column to page through it by.
+
+        Returns
+        -------
+        dict
+            With keys "table_name", "columns" and "key_column"
+
+        """
+        query_id = self._get_query_id_from_redis()
+        try:
+            if self.redis_interface.has_lock(query_id):
+                raise QueryProxyError(f"Query with id '{query_id}' is still running.")
+            else:
+                return get_result_info_for_query_id(query_id)
+        except (AttributeError, ValueError):
+            raise MissingQueryError(
+                query_id, msg=f"Query with id '{query_id}' does not exist"
+            )
+
+    def get_metadata(self, include_sql=False):
+        """
+        Return the kind, parameters and status of a submitted query together,
+        and optionally the SQL which returns its result if it is complete.
+
+        Parameters
+        ----------
+        include_sql : bool, default False
+            If True, and the query is complete, include the SQL code which,
+            when run against flowdb, returns the output.
+
+        Returns
+        -------
+        dict
+            With keys "id", "query_kind", "params" and "status", and "sql" if
+            it was asked for and the query is complete.
+
+        """
+        query_id = self._get_query_id_from_redis()
+        status = self.poll()
+        metadata = {
+            "id": query_id,
+            "query_kind": self.query_kind,
+            "params": self.params,
+            "status": status,
+        }
+        if include_sql and status == "done":
+            try:
+                metadata["sql"] = get_sql_for_query_id(query_id)
+            except (AttributeError, ValueError):
+                raise MissingQueryError(
+                    query_id, msg=f"Query with id '{query_id}' does not exist"
+                )
+        return metadata
@@ -9,12 +9,16 @@ import asyncio
 import logging
 import os
 import signal
+from functools import partial
 from logging.handlers import TimedRotatingFileHandler
-from typing import Any
+from typing import Any, Callable, List
 
 import zmq
 from zmq.asyncio import Context
 from flowmachine.core import connect
+from flowmachine.features.utilities.subscriber_sightings import (
+    store_subscriber_sightings,
+)
 from .query_proxy import (
     QueryProxy,
     MissingQueryError,
@@ -23,6 +27,7 @@ from .query_proxy import (
     InvalidGeographyError,
 )
 from .zmq_interface import ZMQMultipartMessage, ZMQInterfaceError
+from .action_executor import ActionExecutor, ServerBusyError
 
 import structlog
 
@@ -60,11 +65,18 @@ query_run_log.addHandler(fh)
 query_run_log = structlog.wrap_logger(query_run_log)
 
 
-async def get_reply_for_message(zmq_msg: ZMQMultipartMessage) -> dict:
+# Errors raised by action handlers which are reported back in the reply
+HANDLED_ERRORS = (KeyError, QueryProxyError, MissingQueryError, InvalidGeographyError)
+
+
+def get_reply_for_message(zmq_msg: ZMQMultipartMessage) -> dict:
     """
     Dispatches the message to the appropriate handling function
     based on the specified action and returns the reply.
 
+    The handlers make blocking calls to the database and redis, so this
+    should be run in an executor (see `dispatch_message`).
+
     Parameters
     ----------
     zmq_msg : ZMQMultipartMessage
@@ -85,21 +97,32 @@ async def get_reply_for_message(zmq_msg: ZMQMultipartMessage) -> dict:
         )
         if "run_query" == action:
             logger.debug(f"Trying to run query.  Message: {zmq_msg.msg_str}")
-
-            query_proxy = QueryProxy(
-                zmq_msg.action_params["query_kind"], zmq_msg.action_params["params"]
-            )
-            query_id = query_proxy.run_query_async()
-            query_run_log.info("run_query", query_id=query_id, **run_log_dict)
-            reply = {"status": "accepted", "id": query_id}
+            reply = run_query_reply(zmq_msg.action_params, run_log_dict)
+
+        elif "run_query_batch" == action:
+            logger.debug(f"Trying to run queries.  Message: {zmq_msg.msg_str}")
+            reply = {
+                "status": "done",
+                "results": [
+                    reply_or_error(run_query_reply, query, run_log_dict)
+                    for query in zmq_msg.action_params["queries"]
+                ],
+            }
 
         elif "poll" == action:
             logger.debug(f"Trying to poll query.  Message: {zmq_msg.msg_str}")
-            query_id = zmq_msg.action_params["query_id"]
-            query_proxy = QueryProxy.from_query_id(query_id)
-            status = query_proxy.poll()
-            query_run_log.info("poll", query_id=query_id, status=status, **run_log_dict)
-            reply = {"status": status, "id": query_id}
+            reply = poll_reply(zmq_msg.action_params["query_id"], run_log_dict)
+            reply.pop("query_kind")
+
+        elif "poll_batch" == action:
+            logger.debug(f"Trying to poll queries.  Message: {zmq_msg.msg_str}")
+            reply = {
+                "status": "done",
+                "results": [
+                    reply_or_error(poll_reply, query_id, run_log_dict)
+                    for query_id in zmq_msg.action_params["query_ids"]
+                ],
+            }
 
         elif "get_sql" == action:
             logger.debug(f"Trying to get query result. Message: {zmq_msg.msg_str}")
@@ -109,6 +132,14 @@ async def get_reply_for_message(zmq_msg: ZMQMultipartMessage) -> dict:
             query_run_log.info("get_sql", query_id=query_id, **run_log_dict)
             reply = {"status": "done", "sql": sql}
 
+        elif "get_result_info" == action:
+            logger.debug(f"Trying to get result info. Message: {zmq_msg.msg_str}")
+            query_id = zmq_msg.action_params["query_id"]
+            query_proxy = QueryProxy.from_query_id(query_id)
+            result_info = query_proxy.get_result_info()
+            query_run_log.info("get_result_info", query_id=query_id, **run_log_dict)
+            reply = {"status": "done", **result_info}
+
         elif "get_params" == action:
             logger.debug(f"Trying to get query parameters. Message: {zmq_msg.msg_str}")
             query_id = zmq_msg.action_params["query_id"]
@@ -133,13 +164,34 @@ async def get_reply_for_message(zmq_msg: ZMQMultipartMessage) -> dict:
             )
             reply = {"id": query_id, "query_kind": query_proxy.query_kind}
 
+        elif "get_query_metadata" == action:
+            logger.debug(f"Trying to get query metadata. Message: {zmq_msg.msg_str}")
+            query_id = zmq_msg.action_params["query_id"]
+            query_proxy = QueryProxy.from_query_id(query_id)
+            metadata = query_proxy.get_metadata(
+                include_sql=zmq_msg.action_params.get("include_sql", False)
+            )
+            query_run_log.info(
+                "get_query_metadata",
+                query_id=query_id,
+                query_kind=metadata["query_kind"],
+                status=metadata["status"],
+                **run_log_dict,
+            )
+            reply = metadata
+
         elif "get_geography" == action:
             logger.debug(f"Trying to get geography. Message: {zmq_msg.msg_str}")
             # TODO: Once we have refactored QueryProxy, we won't want to
             # directly import 'construct_query_object' here.
             q = construct_query_object("geography", zmq_msg.action_params["params"])
             # Explicitly project to WGS84 (SRID=4326) to conform with GeoJSON standard
-            sql = q.geojson_query(crs=4326)
+            try:
+                sql = q.geojson_query(
+                    crs=4326, simplify=zmq_msg.action_params.get("simplify")
+                )
+            except ValueError as e:
+                raise QueryProxyError(f"Invalid geography request: '{e}'")
             query_run_log.info("get_geography", **run_log_dict)
             reply = {"status": "done", "sql": sql}
 
@@ -147,21 +199,160 @@ async def get_reply_for_message(zmq_msg: ZMQMultipartMessage) -> dict:
             logger.debug(f"Unknown action: '{action}'")
             reply = {"status": "error", "error": f"Unknown action: '{action}'"}
 
-    except KeyError as e:
-        reply = {"status": "error", "error": f"Missing key {e}"}
-    except QueryProxyError as e:
-        reply = {"status": "error", "error": f"{e}"}
-    except MissingQueryError as e:
-        reply = {"status": "awol", "id": e.missing_query_id, "error": f"{e}"}
-    except InvalidGeographyError as e:
-        reply = {"status": "awol", "error": f"{e}"}
+    except HANDLED_ERRORS as e:
+        reply = error_reply(e)
     logger.debug(f"Received reply {reply} to message: {zmq_msg.msg_str}")
     return reply
 
 
-async def recv(port):
+def error_reply(error: Exception) -> dict:
+    """
+    Construct the reply to a message whose handler raised one of `HANDLED_ERRORS`.
+
+    Parameters
+    ----------
+    error : Exception
+        The error raised
+
+    Returns
+    -------
+    dict
+    """
+    if isinstance(error, KeyError):
+        return {"status": "error", "error": f"Missing key {error}"}
+    elif isinstance(error, MissingQueryError):
+        return {"status": "awol", "id": error.missing_query_id, "error": f"{error}"}
+    elif isinstance(error, InvalidGeographyError):
+        return {"status": "awol", "error": f"{error}"}
+    else:
+        return {"status": "error", "error": f"{error}"}
+
+
+def reply_or_error(handler: Callable, item: Any, run_log_dict: dict) -> dict:
+    """
+    Call handler for one item of a batch, returning an error reply for that
+    item if the handler fails.
+
+    Parameters
+    ----------
+    handler : callable
+        Function taking the item and run_log_dict, and returning a reply
+    item
+        Item of the batch
+    run_log_dict : dict
+        Details of the message to include in the query run log
+
+    Returns
+    -------
+    dict
+    """
+    try:
+        return handler(item, run_log_dict)
+    except HANDLED_ERRORS as e:
+        return error_reply(e)
+
+
+def run_query_reply(query: dict, run_log_dict: dict) -> dict:
+    """
+    Set a query running, and return a reply with its id.
+
+    Parameters
+    ----------
+    query : dict
+        Query specification, with keys "query_kind" and "params"
+    run_log_dict : dict
+        Details of the message to include in the query run log
+
+    Returns
+    -------
+    dict
+    """
+    query_proxy = QueryProxy(query["query_kind"], query["params"])
+    query_id = query_proxy.run_query_async()
+    query_run_log.info("run_query", query_id=query_id, **run_log_dict)
+    return {"status": "accepted", "id": query_id}
+
+
+def poll_reply(query_id: str, run_log_dict: dict) -> dict:
+    """
+    Return a reply with the status and kind of a query.
+
+    Parameters
+    ----------
+    query_id : str
+        Id of the query to poll
+    run_log_dict : dict
+        Details of the message to include in the query run log
+
+    Returns
+    -------
+    dict
+    """
+    query_proxy = QueryProxy.from_query_id(query_id)
+    status = query_proxy.poll()
+    query_run_log.info("poll", query_id=query_id, status=status, **run_log_dict)
+    return {"status": status, "id": query_id, "query_kind": query_proxy.query_kind}
+
+
+async def dispatch_message(
+    zmq_msg: ZMQMultipartMessage, executor: ActionExecutor
+) -> dict:
+    """
+    Get the reply to a message, running the action handler in the executor
+    so that other messages can be received and answered in the meantime.
+
+    Parameters
+    ----------
+    zmq_msg : ZMQMultipartMessage
+        The message received via zeromq.
+    executor : ActionExecutor
+        Executor to run the action handler in.
+
+    Returns
+    -------
+    dict
+        The reply to the message. This has status "busy" if the executor
+        was too busy to accept the action.
+    """
+    if "get_server_metrics" == zmq_msg.action:
+        return {"status": "done", "metrics": executor.metrics.summary()}
+    try:
+        return await executor.run(
+            zmq_msg.action,
+            get_reply_for_message,
+            zmq_msg,
+            action_params=zmq_msg.action_params,
+        )
+    except ServerBusyError as e:
+        logger.info(f"Turned away message: {zmq_msg.msg_str}. {e}")
+        return {"status": "busy", "error": f"{e}"}
+
+
+async def maintain_subscriber_sightings(levels: List[str], interval: float):
+    """
+    Store the subscriber sightings at each of the levels for every day of
+    events which doesn't have them yet, now and then every `interval`
+    seconds, so that sightings are stored for each newly ingested day.
+    """
+    loop = asyncio.get_event_loop()
+    while True:
+        try:
+            futures = await loop.run_in_executor(
+                None, partial(store_subscriber_sightings, levels=levels)
+            )
+            await asyncio.gather(*[asyncio.wrap_future(f) for f in futures])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to store subscriber sightings: {e}")
+        await asyncio.sleep(interval)
+
+
+async def recv(port, executor: ActionExecutor, sightings_levels: List[str] = ()):
     """
     Listen for messages coming in via zeromq on the given port, and dispatch them.
+    If `sightings_levels` are given, also keep the subscriber sightings at
+    those levels stored for every day (see `maintain_subscriber_sightings`).
     """
 
     ctx = Context.instance()
@@ -186,6 +377,13 @@ async def recv(port):
     # Get the loop and attach a sigterm handler to allow coverage data to be written
     main_loop = asyncio.get_event_loop()
     main_loop.add_signal_handler(signal.SIGTERM, shutdown)
+    if len(sightings_levels) > 0:
+        main_loop.create_task(
+            maintain_subscriber_sightings(
+                sightings_levels,
+                float(os.getenv("FLOWMACHINE_SUBSCRIBER_SIGHTINGS_INTERVAL", 3600)),
+            )
+        )
 
     while True:
         try:
@@ -200,10 +398,11 @@ async def recv(port):
             logger.error("Task cancelled. Shutting down.")
             break
 
-        reply_coroutine = get_reply_for_message(zmq_msg)
+        reply_coroutine = dispatch_message(zmq_msg, executor)
         zmq_msg.send_reply_async(socket, reply_coroutine)
 
     socket.close()
+    executor.shutdown()
 
 
 async def get_next_zmq_message(socket):
@@ -230,13 +429,24 @@ def main():
     port = os.getenv("FLOWMACHINE_PORT", 5555)
     connect()
     debug_mode = "True" == os.getenv("DEBUG", "False")
+    executor = ActionExecutor(
+        lookup_threads=int(os.getenv("FLOWMACHINE_SERVER_LOOKUP_THREADS", 4)),
+        query_threads=int(os.getenv("FLOWMACHINE_SERVER_QUERY_THREADS", 2)),
+        max_queued=int(os.getenv("FLOWMACHINE_SERVER_MAX_QUEUED", 16)),
+    )
+
+    sightings_levels = [
+        level.strip()
+        for level in os.getenv("FLOWMACHINE_SUBSCRIBER_SIGHTINGS_LEVELS", "").split(",")
+        if level.strip() != ""
+    ]
 
     if debug_mode:
         logger.info("Enabling asyncio's debugging mode.")
     try:
-        asyncio.run(recv(port), debug=debug_mode)
+        asyncio.run(recv(port, executor, sightings_levels), debug=debug_mode)
     except AttributeError:
         main_loop = asyncio.get_event_loop()
         if debug_mode:
             main_loop.set_debug(True)
-        main_loop.run_until_complete(recv(port))
+        main_loop.run_until_complete(recv(port, executor, sightings_levels))
@@ -39,7 +39,7 @@ def send_message_and_receive_reply(msg, port=5555, host="localhost"):
     {'status': 'accepted', 'id': 'ddc61a04f608dee16fff0655f91c2057'}
 
     >>> send_message_and_receive_reply({"action": "get_sql", "request_id": "DUMMY_ID", "query_id": "ddc61a04f608dee16fff0655f91c2057"})
-    {'status': 'done', 'sql': 'SELECT * FROM cache.xddc61a04f608dee16fff0655f91c2057'}
+    {'status': 'done', 'sql': 'SELECT pcod, total FROM cache.xddc61a04f608dee16fff0655f91c2057'}
     """
     context = zmq.Context.instance()
     socket = context.socket(zmq.REQ)
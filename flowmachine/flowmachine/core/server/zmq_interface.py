@@ -20,36 +20,56 @@ class ZMQMultipartMessage:
     Its responsibility is to receive a multipart message obtained from ZMQ,
     deconstruct it into the return address and the actual message, and to
     send back replies over the socket.
+
+    Messages from REQ sockets have the form (<return_address>, <empty_delimiter>, <message>).
+    Messages from a DEALER socket (as used by FlowAPI) also carry a message id,
+    (<return_address>, <message_id>, <empty_delimiter>, <message>), which is
+    sent back with the reply so the client can match it to the request.
     """
 
     def __init__(self, multipart_msg):
         # Deconstruct multipart message into return address and the actual message
-        self.return_address, self.msg_str = self._get_parts(multipart_msg)
+        self.return_address, self.message_id, self.msg_str = self._get_parts(
+            multipart_msg
+        )
         self.action, self.action_params, self.api_request_id = self._deconstruct_message_string(
             self.msg_str
         )
 
     def send_reply_async(self, socket, reply_coroutine):
-        asyncio.create_task(send_reply(socket, self.return_address, reply_coroutine))
+        asyncio.create_task(send_reply(socket, self.return_envelope, reply_coroutine))
+
+    @property
+    def return_envelope(self):
+        """
+        The frames which must precede the empty delimiter when replying to this message.
+        """
+        if self.message_id is None:
+            return [self.return_address]
+        return [self.return_address, self.message_id]
 
     def _get_parts(self, multipart_msg):
         """
-        Validate that the incoming multipart_msg contains three parts (and that the middle
-        part is an empty delimiter) and return the first and third part which represent
-        the return address and the message contents, respectively.
+        Validate that the incoming multipart_msg contains three parts, or four
+        if it carries a message id (and that the second to last part is an empty
+        delimiter) and return the return address, message id and message contents.
 
         Returns
         -------
-        pair of str
-            The pair `(return_address, msg_contents)`.
+        tuple of bytes
+            The tuple `(return_address, message_id, msg_contents)`, where
+            message_id is None if the message did not have one.
         """
-        if len(multipart_msg) != 3:
-            error_msg = f"Multipart message is not of the form (<return_address>, <empty_delimiter>, <message>): {multipart_msg}"
+        if len(multipart_msg) == 3:
+            return_address, empty_delimiter, msg_str = multipart_msg
+            message_id = None
+        elif len(multipart_msg) == 4:
+            return_address, message_id, empty_delimiter, msg_str = multipart_msg
+        else:
+            error_msg = f"Multipart message is not of the form (<return_address>, [<message_id>], <empty_delimiter>, <message>): {multipart_msg}"
             logger.error(error_msg)
             raise ZMQInterfaceError(error_msg)
 
-        return_address, empty_delimiter, msg_str = multipart_msg
-
         if empty_delimiter != b"":
             error_msg = (
                 f"Expected empty delimiter in multipart message, got: {empty_delimiter}"
@@ -57,7 +77,7 @@ class ZMQMultipartMessage:
             logger.error(error_msg)
             raise ZMQInterfaceError(error_msg)
 
-        return return_address, msg_str
+        return return_address, message_id, msg_str
 
     def _deconstruct_message_string(self, msg_str):
         try:
@@ -83,13 +103,15 @@ class ZMQMultipartMessage:
         return action, action_params, api_request_id
 
 
-async def send_reply(socket, return_address, reply_coroutine):
+async def send_reply(socket, return_envelope, reply_coroutine):
     """
 
     Parameters
     ----------
     socket : zmq.asyncio.Socket
         zmq socket to use for sending the message
+    return_envelope : list of bytes
+        Frames identifying the recipient, which precede the empty delimiter
     reply_coroutine : awaitable
         Coroutine which will eventually return a dict
 
@@ -99,6 +121,7 @@ async def send_reply(socket, return_address, reply_coroutine):
     """
     logger.debug(f"Awaiting {reply_coroutine}")
     reply = await reply_coroutine
-    logger.debug(f"Returning message {reply} to {return_address}")
-    socket.send_multipart([return_address, b"", dumps(reply).encode()])
-    logger.debug(f"Sent {[return_address, b'', dumps(reply).encode()]}")
+    logger.debug(f"Returning message {reply} to {return_envelope}")
+    multipart_reply = [*return_envelope, b"", dumps(reply).encode()]
+    socket.send_multipart(multipart_reply)
+    logger.debug(f"Sent {multipart_reply}")
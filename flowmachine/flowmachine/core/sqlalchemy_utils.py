@@ -3,10 +3,12 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 import pandas as pd
-from sqlalchemy import Table, MetaData
+from sqlalchemy import Table
 from sqlalchemy.dialects import postgresql
 from sqlalchemy.sql import Selectable
 
+from .catalog_cache import get_reflected_table
+
 
 def get_sqlalchemy_table_definition(fully_qualified_table_name, *, engine):
     """
@@ -22,6 +24,10 @@ def get_sqlalchemy_table_definition(fully_qualified_table_name, *, engine):
     Returns
     -------
     sqlalchemy.Table
+
+    Notes
+    -----
+    Table definitions are shared process-wide, see `flowmachine.core.catalog_cache`.
     """
     try:
         schema, table_name = fully_qualified_table_name.split(".")
@@ -30,10 +36,7 @@ def get_sqlalchemy_table_definition(fully_qualified_table_name, *, engine):
             f"Fully qualified table name must be of the form '<schema>.<table>'. Got: {fully_qualified_table_name}"
         )
 
-    metadata = MetaData()
-    return Table(
-        table_name, metadata, schema=schema, autoload=True, autoload_with=engine
-    )
+    return get_reflected_table(engine, schema, table_name)
 
 
 def get_sql_string(sqlalchemy_query):
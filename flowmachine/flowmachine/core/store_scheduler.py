@@ -0,0 +1,194 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Stores a query together with the queries it is built from, starting
+from the leaves of its dependency tree and storing independent queries
+in parallel.
+
+Storing a composite query on its own runs the whole tree of subqueries
+as a single statement in one database backend. Storing the subqueries
+first spreads the work over several connections, and leaves each of them
+in cache to be reused by other queries.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import TYPE_CHECKING, Dict, Set, Tuple
+
+if TYPE_CHECKING:
+    from .query import Query
+
+logger = logging.getLogger("flowmachine").getChild(__name__)
+
+
+def _is_cacheable(query: "Query") -> bool:
+    """
+    True if the query can be stored under its own table name in cache.
+    """
+    try:
+        query.fully_qualified_table_name
+        return True
+    except NotImplementedError:
+        return False
+
+
+class StoreScheduler:
+    """
+    Stores a query and every unstored query in its dependency tree which
+    can be stored, storing each only once all the queries below it are
+    stored. Queries whose dependencies are all stored are stored in
+    parallel on the query thread pool.
+
+    Queries which can't be stored are skipped, and the queries below them
+    are treated as dependencies of the nearest query above them which can.
+    Stored queries, and anything below them, are left alone.
+
+    Parameters
+    ----------
+    query : Query
+        Query to store
+    max_parallel : int, optional
+        Most queries to store at once. Defaults to the size of the query
+        thread pool, which is the size of the database connection pool.
+
+    Examples
+    --------
+    >>> ml = ModalLocation(*[daily_location(d) for d in list_of_dates("2016-01-01", "2016-01-07")])
+    >>> scheduler = StoreScheduler(ml)
+    >>> future = scheduler.start()
+    >>> scheduler.progress
+    (3, 8)
+    >>> future.result()
+    >>> scheduler.timings
+    {'2e9a4d...': 1.92, ...}
+    """
+
+    def __init__(self, query: "Query", max_parallel: int = None):
+        if not _is_cacheable(query):
+            raise ValueError("Cannot store an object of this type with these params")
+        from .query import Query
+
+        if max_parallel is None:
+            max_parallel = Query.thread_pool_size
+        if max_parallel < 1:
+            raise ValueError("max_parallel must be at least 1.")
+        self.query = query
+        self.max_parallel = max_parallel
+        self.queries: Dict[str, "Query"] = {}
+        self.waiting_on: Dict[str, Set[str]] = {}
+        self.dependents: Dict[str, Set[str]] = {}
+        self.timings: Dict[str, float] = {}
+        if not query.is_stored:
+            self._add(query)
+
+    def _add(self, query: "Query") -> None:
+        """
+        Add a query which needs storing, and the unstored queries it is built from.
+        """
+        self.queries[query.md5] = query
+        self.waiting_on[query.md5] = set()
+        self.dependents.setdefault(query.md5, set())
+        openlist = list(query.dependencies)
+        while openlist:
+            dependency = openlist.pop()
+            if not _is_cacheable(dependency):
+                openlist += list(dependency.dependencies)
+            elif dependency.md5 in self.queries or not dependency.is_stored:
+                if dependency.md5 not in self.queries:
+                    self._add(dependency)
+                self.waiting_on[query.md5].add(dependency.md5)
+                self.dependents[dependency.md5].add(query.md5)
+
+    @property
+    def progress(self) -> Tuple[int, int]:
+        """
+        The number of queries stored so far, and the number there are to store.
+        """
+        return len(self.timings), len(self.queries)
+
+    def _store(self, query: "Query") -> None:
+        """
+        Store one query, blocking until it is stored, and record how long it took.
+        """
+        start = time.perf_counter()
+        schema, name = query.fully_qualified_table_name.split(".")
+        query._to_sql(name, schema=schema)
+        self.timings[query.md5] = time.perf_counter() - start
+        done, total = self.progress
+        logger.info(
+            f"Stored {query.__class__.__name__} {query.md5} in {self.timings[query.md5]:.2f}s ({done}/{total})."
+        )
+
+    def run(self) -> "Query":
+        """
+        Store the queries, blocking until they are all stored.
+
+        Returns
+        -------
+        Query
+            The query being stored
+
+        Raises
+        ------
+        Exception
+            The first error raised while storing a query. No more queries are
+            started after an error, but those already running are allowed to
+            finish.
+        """
+        from .query import Query
+
+        waiting_on = {md5: set(deps) for md5, deps in self.waiting_on.items()}
+        ready = deque(md5 for md5, deps in waiting_on.items() if len(deps) == 0)
+        running = {}
+        logger.debug(
+            f"Storing {len(self.queries)} queries for {self.query.md5}, up to {self.max_parallel} at once."
+        )
+        while ready or running:
+            while ready and len(running) < self.max_parallel:
+                md5 = ready.popleft()
+                running[Query.tp.submit(self._store, self.queries[md5])] = md5
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                md5 = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    logger.error(
+                        f"Error storing {self.queries[md5].__class__.__name__} {md5}: {error}"
+                    )
+                    wait(running)
+                    raise error
+                for dependent in self.dependents[md5]:
+                    waiting_on[dependent].discard(md5)
+                    if len(waiting_on[dependent]) == 0:
+                        ready.append(dependent)
+        return self.query
+
+    def start(self) -> Future:
+        """
+        Store the queries in a background thread.
+
+        Returns
+        -------
+        Future
+            Future which will contain the query once it and its
+            dependencies are stored.
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+
+        def run():
+            try:
+                future.set_result(self.run())
+            except Exception as e:
+                future.set_exception(e)
+
+        # The scheduler waits on the thread pool, so it must not run in it
+        threading.Thread(
+            target=run, name=f"flowmachine-store-{self.query.md5}", daemon=True
+        ).start()
+        return future
@@ -1,14 +1,29 @@
 # This Source Code Form is subject to the terms of the Mozilla Public
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
+import csv
+import io
+import logging
+import time
 from typing import List
 
 import numpy as np
 import pandas as pd
 
 from abc import abstractmethod
-from sqlalchemy.sql import ClauseElement, select, text, column
+from sqlalchemy import TEXT
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.sql import ClauseElement, select, text, column, func
+from .cache import bump_cache_generation
+from .catalog_cache import refresh_catalog_cache
 from .query import Query
+from .sqlalchemy_utils import get_sql_string
+
+logger = logging.getLogger("flowmachine").getChild(__name__)
+
+# Explicit subsets with more subscribers than this are stored in a table rather
+# than written into the sql as a list
+MAX_INLINE_SUBSET_SIZE = 1000
 
 __all__ = [
     "make_subscriber_subsetter",
@@ -195,6 +210,74 @@ class SubscriberSubsetterForFlowmachineQuery(SubscriberSubsetterBase):
         return res
 
 
+class _SubscriberSubsetTable(Query):
+    """
+    Table of the distinct subscribers in an explicit subset. Its md5 depends
+    only on the subscribers, so every subset with the same subscribers
+    shares one table. It is stored in the cache before any query using it is
+    stored, so that it is counted, evicted and reset along with them, and
+    the subscribers are copied into the table rather than selected by sql.
+
+    Parameters
+    ----------
+    subscribers : list, tuple, numpy.ndarray or pandas.Series
+        Subscribers in the subset
+    """
+
+    _store_before_use = True
+
+    def __init__(self, subscribers):
+        self.subscribers = sorted({str(subscriber) for subscriber in subscribers})
+        super().__init__()
+
+    @property
+    def column_names(self) -> List[str]:
+        return ["subscriber"]
+
+    def _make_query(self):
+        # Only used until the table is stored
+        subscribers = array(self.subscribers, type_=TEXT)
+        return get_sql_string(select([func.unnest(subscribers).label("subscriber")]))
+
+    def _to_unpartitioned_sql(self, name, schema, force):
+        if force:
+            self.invalidate_db_cache(name, schema=schema)
+        start = time.monotonic()
+        if not self.connection.has_table(name, schema=schema):
+            logger.debug(
+                f"Storing subset of {len(self.subscribers)} subscribers as {schema}.{name}."
+            )
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(
+                [subscriber] for subscriber in self.subscribers
+            )
+            buffer.seek(0)
+            raw_connection = self.connection.engine.raw_connection()
+            try:
+                with raw_connection.cursor() as cursor:
+                    cursor.execute(
+                        f"CREATE TABLE {schema}.{name} (subscriber TEXT PRIMARY KEY)"
+                    )
+                    cursor.copy_expert(
+                        f"COPY {schema}.{name} (subscriber) FROM STDIN WITH (FORMAT csv)",
+                        buffer,
+                    )
+                    cursor.execute(f"ANALYZE {schema}.{name}")
+                raw_connection.commit()
+            except Exception:
+                raw_connection.rollback()
+                raise
+            finally:
+                raw_connection.close()
+        if schema == "cache":
+            self._db_store_cache_metadata(
+                compute_time=(time.monotonic() - start) * 1000
+            )
+        refresh_catalog_cache(schema, name)
+        bump_cache_generation(self.redis)
+        return self
+
+
 class SubscriberSubsetterForExplicitSubset(SubscriberSubsetterBase):
     """
     Represents a subset given by an explicit list of subscribers.
@@ -210,6 +293,9 @@ class SubscriberSubsetterForExplicitSubset(SubscriberSubsetterBase):
             )
 
         self.subscribers = subscribers
+        if len(subscribers) > MAX_INLINE_SUBSET_SIZE:
+            # Too many subscribers to list in the sql, so select them from a table instead
+            self.subset_table = _SubscriberSubsetTable(subscribers)
 
     def _make_query(self):
         # Return a dummy string representing this subset. This is only needed
@@ -236,7 +322,22 @@ class SubscriberSubsetterForExplicitSubset(SubscriberSubsetterBase):
         assert isinstance(sql, ClauseElement)
         assert len(sql.froms) == 1
         parent_table = sql.froms[0]
-        return sql.where(parent_table.c[subscriber_identifier].in_(self.subscribers))
+        try:
+            subset_table = self.subset_table
+        except AttributeError:
+            return sql.where(
+                parent_table.c[subscriber_identifier].in_(self.subscribers)
+            )
+        subset_query = (
+            text(subset_table.get_query())
+            .columns(column("subscriber"))
+            .alias("subset_table")
+        )
+        return sql.where(
+            parent_table.c[subscriber_identifier].in_(
+                select([subset_query.c.subscriber])
+            )
+        )
 
 
 def make_subscriber_subsetter(subset):
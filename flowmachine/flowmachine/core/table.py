@@ -10,8 +10,9 @@ database.
 import logging
 from typing import List
 
+from .catalog_cache import get_table_columns, table_exists
 from .errors import NotConnectedError
-from .query import Query
+from .query import Query, ROW_NUMBER_COLUMN
 from .subset import subset_factory
 
 logger = logging.getLogger("flowmachine").getChild(__name__)
@@ -83,18 +84,12 @@ class Table(Query):
             raise ValueError("{} is not a known table.".format(self.fqn))
 
         # Get actual columns of this table from the database
-        db_columns = list(
-            zip(
-                *self.connection.fetch(
-                    f"""SELECT column_name from INFORMATION_SCHEMA.COLUMNS
-             WHERE table_name = '{self.name}' AND table_schema='{self.schema}'"""
-                )
-            )
-        )[0]
+        db_columns = get_table_columns(self.connection, self.schema, self.name)
         if (
             columns is None or columns == []
         ):  # No columns specified, setting them from the database
-            columns = db_columns
+            # Leaving out the numbering of the rows of stored query results
+            columns = [column for column in db_columns if column != ROW_NUMBER_COLUMN]
         else:
             self.parent_table = Table(
                 schema=self.schema, name=self.name
@@ -138,7 +133,7 @@ class Table(Query):
 
     @property
     def is_stored(self):
-        return self.connection.has_table(self.name, self.schema)
+        return table_exists(self.connection, self.schema, self.name)
 
     @property
     def fully_qualified_table_name(self):
@@ -9,33 +9,47 @@ from .query import Query
 
 class Union(Query):
     """
-    Represents concatenating two tables on top of each other with duplicates removed,
-    exactly as the postgres UNION.
+    Represents concatenating any number of tables on top of each other, exactly
+    as the postgres UNION, or UNION ALL which keeps duplicates.
+
+    All the tables are combined in a single flat UNION, rather than one
+    nested query for each pair.
 
     Parameters
     ----------
-    top, bottom : flowmachine.Query object
-        First and second tables respectively
+    queries : flowmachine.Query object
+        Tables to concatenate, in order
+    all : bool, default True
+        If true keep duplicates (UNION ALL), otherwise remove them (UNION)
+
+    Examples
+    --------
+    >>> dls = [daily_location(date) for date in ("2016-01-01", "2016-01-02", "2016-01-03")]
+    >>> Union(*dls).get_query()
+    '(SELECT subscriber, pcod FROM cache.x5f...) UNION ALL (SELECT subscriber, pcod FROM cache.x2c...) UNION ALL (...)'
     """
 
-    def __init__(self, top, bottom, all=True):
-        """
-
-
-        """
-
-        self.top = top
-        self.bottom = bottom
+    def __init__(self, *queries, all=True):
+        if len(queries) == 0:
+            raise ValueError("Union needs at least one query.")
+        self.queries = queries
         self.all = all
 
         super().__init__()
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        # The queries are only hashed as a set of dependencies, so add their
+        # md5s in order to tell apart unions which repeat queries or take
+        # them in a different order. Joined, because lists are sorted when hashed.
+        state["_query_md5s"] = ",".join(query.md5 for query in self.queries)
+        return state
+
     @property
     def column_names(self) -> List[str]:
-        return list(self.top.column_names)
+        return list(self.queries[0].column_names)
 
     def _make_query(self):
-
-        return """({}) UNION {} ({})""".format(
-            self.top.get_query(), "ALL" if self.all else "", self.bottom.get_query()
+        return f"\nUNION {'ALL' if self.all else ''}\n".join(
+            f"({query.get_query()})" for query in self.queries
         )
@@ -91,6 +91,8 @@ ut = [
     "UniqueSubscribers",
     "EventsTablesUnion",
     "EventTableSubset",
+    "SubscriberSightings",
+    "store_subscriber_sightings",
 ]
 
 sub_modules = ["location", "subscriber", "network", "utilities", "raster", "spatial"]
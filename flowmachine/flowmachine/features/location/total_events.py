@@ -4,6 +4,7 @@
 
 # -*- coding: utf-8 -*-
 
+import datetime
 from typing import List, Union
 
 """
@@ -17,9 +18,14 @@ from ...core import JoinToLocation
 from ..utilities import EventsTablesUnion
 
 from ...core import Query
-from ...core.mixins import GeoDataMixin
+from ...core.mixins import GeoDataMixin, IncrementalMixin
 
-from flowmachine.utils import get_columns_for_level
+from flowmachine.utils import (
+    get_columns_for_level,
+    list_of_dates,
+    parse_datestring,
+    time_period_add,
+)
 
 
 class _TotalCellEvents(Query):
@@ -123,7 +129,45 @@ class _TotalCellEvents(Query):
         return sql
 
 
-class TotalLocationEvents(GeoDataMixin, Query):
+class _TotalCellEventsByDay(Query):
+    """
+    Total events per cell as `_TotalCellEvents`, assembled from a separate
+    `_TotalCellEvents` for each day from start up to, but not including, stop.
+    Each day's counts can then be stored and reused on their own.
+    """
+
+    def __init__(self, start: str, stop: str, **kwargs):
+        for date in (start, stop):
+            if parse_datestring(date).time() != datetime.time():
+                raise ValueError(
+                    f"Incremental counts must start and stop on whole days, got '{date}'."
+                )
+        dates = list_of_dates(start, stop)[:-1]
+        if len(dates) == 0:
+            raise ValueError("Incremental counts must cover at least one day.")
+        self.start = start
+        self.stop = stop
+        self.days = [
+            _TotalCellEvents(date, time_period_add(date, 1), **kwargs) for date in dates
+        ]
+        self.time_cols = self.days[0].time_cols
+        self.groups = self.days[0].groups
+        super().__init__()
+
+    @property
+    def column_names(self) -> List[str]:
+        return self.days[0].column_names
+
+    def _make_query(self):
+        # Each day's counts also include any events at exactly midnight at the
+        # end of the day, so keep only the rows for the day itself.
+        return " UNION ALL ".join(
+            f"SELECT * FROM ({day.get_query()}) _ WHERE date = '{day.start}'"
+            for day in self.days
+        )
+
+
+class TotalLocationEvents(GeoDataMixin, IncrementalMixin, Query):
     """
     Calculates the total number of events on an hourly basis
     per location (such as a tower or admin region),
@@ -171,6 +215,15 @@ class TotalLocationEvents(GeoDataMixin, Query):
         Option, none-standard, name of the column that identifies the
         spatial level, i.e. could pass admin3pcod to use the admin 3 pcode
         as opposed to the name of the region.
+    incremental : bool, default False
+        If True, the counts for each day are stored as their own cache
+        entries when this query is stored, and the counts for the whole
+        range are assembled from them, so counts over a range one day longer
+        than one already stored only scan the new day's events. Start and
+        stop must be dates, and the counts cover the days from start up to,
+        but not including, stop. Counts which are not incremental also
+        include any events at exactly midnight at the start of stop, so the
+        two differ if there are events at that moment.
 
     """
 
@@ -192,6 +245,7 @@ class TotalLocationEvents(GeoDataMixin, Query):
         size=None,
         polygon_table=None,
         geom_col="geom",
+        incremental: bool = False,
     ):
 
         self.start = start
@@ -208,7 +262,9 @@ class TotalLocationEvents(GeoDataMixin, Query):
                     self.allowed_intervals, self.interval
                 )
             )
-        self._obj = _TotalCellEvents(
+        if incremental:
+            self.incremental = True
+        self._obj = (_TotalCellEventsByDay if incremental else _TotalCellEvents)(
             start,
             stop,
             table=table,
@@ -230,6 +286,11 @@ class TotalLocationEvents(GeoDataMixin, Query):
             )
         super().__init__()
 
+    @property
+    def _incremental_parts(self) -> List[Query]:
+        cell_events = self._obj.left if self.level != "cell" else self._obj
+        return cell_events.days
+
     @property
     def column_names(self) -> List[str]:
         cols = get_columns_for_level(self.level, self.column_name) + ["date"]
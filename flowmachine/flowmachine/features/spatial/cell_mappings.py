@@ -7,17 +7,29 @@ Classes that deal with mapping cells (or towers or sites)
 to a spatial level, mostly be performing a spatial join.
 Examples of this include CellToAdmin or CellToGrid.
 """
-from typing import List
+import logging
+from typing import List, Union
 
 from ...core import Query
 from .grid import Grid
 
+logger = logging.getLogger("flowmachine").getChild(__name__)
+
 
 class CellToPolygon(Query):
     """
     Class that maps a cell with a lat-lon to a geographical
     region.
 
+    The spatial join is the same for every query which uses the mapping,
+    so the mapping is stored in cache before the first query which uses it
+    is stored, and queries select from the stored table rather than
+    repeating the join.
+    The period each cell version was in service is given as a tstzrange
+    (`valid_period`), which has a GiST index, and the location id is indexed,
+    so a mapping can be joined to events with an equality and a range
+    containment.
+
     Parameters
     ----------
     column_name : str, optional
@@ -31,6 +43,8 @@ class CellToPolygon(Query):
         column that defines the geography.
     """
 
+    _store_before_use = True
+
     def __init__(self, *, column_name, polygon_table, geom_col="geom"):
 
         if type(column_name) is str:
@@ -65,9 +79,34 @@ class CellToPolygon(Query):
             "version",
             "date_of_first_service",
             "date_of_last_service",
+            "valid_period",
         ] + self.column_name
 
     def _make_query(self):
+        return self._spatial_join_sql()
+
+    def _make_sql(
+        self, name: str, schema: Union[str, None] = None, force: bool = False
+    ) -> List[str]:
+        if schema is not None:
+            full_name = "{}.{}".format(schema, name)
+        else:
+            full_name = name
+        if self.connection.has_table(name, schema=schema) and (not force):
+            logger.info("Table already exists")
+            return []
+        return [
+            f"""EXPLAIN (ANALYZE TRUE, TIMING FALSE, FORMAT JSON) CREATE TABLE {full_name} AS 
+            ({self._make_query()})""",
+            f"CREATE INDEX ON {full_name} (location_id)",
+            f"CREATE INDEX ON {full_name} USING gist (valid_period)",
+            f"ANALYZE {full_name}",
+        ]
+
+    def _spatial_join_sql(self):
+        """
+        Sql which maps each cell to a region.
+        """
 
         # if the subscriber wants to select a geometry from the sites table there
         # is no need to join the table with itself.
@@ -85,6 +124,11 @@ class CellToPolygon(Query):
                 locinfo.version,
                 locinfo.date_of_first_service,
                 locinfo.date_of_last_service,
+                tstzrange(
+                    coalesce(locinfo.date_of_first_service::timestamptz, '-infinity'),
+                    coalesce(locinfo.date_of_last_service::timestamptz, 'infinity'),
+                    '[]'
+                ) AS valid_period,
                 {columns}
             FROM
                 {self.location_info_table_fqn} AS locinfo
@@ -101,6 +145,11 @@ class CellToPolygon(Query):
                 locinfo.version,
                 locinfo.date_of_first_service,
                 locinfo.date_of_last_service,
+                tstzrange(
+                    coalesce(locinfo.date_of_first_service::timestamptz, '-infinity'),
+                    coalesce(locinfo.date_of_last_service::timestamptz, 'infinity'),
+                    '[]'
+                ) AS valid_period,
                 {columns}
             FROM
                 {self.location_info_table_fqn} AS locinfo
@@ -7,12 +7,59 @@ Utility methods for calculating a distance
 matrix from a given point collection.
 
 """
-from typing import List
+import io
+import logging
+import time
+from typing import List, Optional, Union
+
+import numpy as np
+import pandas as pd
 
 from flowmachine.utils import get_columns_for_level
+from ...core.cache import bump_cache_generation
+from ...core.catalog_cache import refresh_catalog_cache
 from ...core.query import Query
 from ...core.mixins import GraphMixin
 
+logger = logging.getLogger("flowmachine").getChild(__name__)
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+    logger.debug(
+        "SciPy not found. DistanceMatrix will not use a spatial index for `max_distance`."
+    )
+
+# Mean radius of the earth in km
+EARTH_RADIUS = 6371.0088
+
+
+def haversine(lon_from, lat_from, lon_to, lat_to):
+    """
+    Great circle distance in km between points given in degrees, on a
+    sphere with the mean radius of the earth. Broadcasts like any numpy
+    function.
+
+    Parameters
+    ----------
+    lon_from, lat_from, lon_to, lat_to : array_like
+        Coordinates of the points, in degrees
+
+    Returns
+    -------
+    numpy.ndarray
+        Distances in km
+    """
+    lon_from, lat_from, lon_to, lat_to = (
+        np.radians(x) for x in (lon_from, lat_from, lon_to, lat_to)
+    )
+    a = (
+        np.sin((lat_to - lat_from) / 2) ** 2
+        + np.cos(lat_from) * np.cos(lat_to) * np.sin((lon_to - lon_from) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
 
 class DistanceMatrix(GraphMixin, Query):
     """
@@ -49,6 +96,22 @@ class DistanceMatrix(GraphMixin, Query):
         is an useful option if one is computing
         other geographic properties out of the
 
+    engine : {'sql', 'numpy'}, default 'sql'
+        Where to calculate the distances. 'sql' calculates them in the
+        database, on the spheroid. 'numpy' fetches the coordinates of each
+        location once, calculates great circle (haversine) distances in
+        blocks in Python, and copies the result back into the database,
+        which is much faster for large numbers of locations. The 'numpy'
+        engine is used when the matrix is stored, so store it before using
+        it; until then, its sql calculates the distances in the database.
+        Distances from the two engines differ by up to about 0.5%. The
+        'numpy' engine can't return geometries.
+
+    max_distance : float, optional
+        Only include pairs of locations at most this many km apart. With
+        the 'numpy' engine, pairs are found using a spatial index if SciPy
+        is installed.
+
     Examples
     --------
     >>> DistanceMatrix().get_dataframe()
@@ -59,20 +122,46 @@ class DistanceMatrix(GraphMixin, Query):
     3   j1m77j   8wPojr        786.102789
     4   DbWg4K   8wPojr        757.977718
 
+    >>> DistanceMatrix(level="versioned-site", engine="numpy", max_distance=50).store()
+
     """
 
-    def __init__(self, level="versioned-cell", date=None, return_geometry=False):
+    # Only set on instances when not the default, so that the md5s of
+    # existing distance matrices are unchanged
+    engine = "sql"
+    max_distance = None
+    # Number of origins to calculate distances from at once with the numpy engine
+    block_size = 1000
+
+    def __init__(
+        self,
+        level="versioned-cell",
+        date=None,
+        return_geometry=False,
+        engine="sql",
+        max_distance=None,
+    ):
 
         if level not in {"versioned-site", "versioned-cell"}:
             raise ValueError("Only point locations are supported at this time.")
+        if engine not in {"sql", "numpy"}:
+            raise ValueError(f"'{engine}' is not a valid engine. Use 'sql' or 'numpy'.")
+        if engine == "numpy" and return_geometry:
+            raise ValueError("The numpy engine can't return geometries.")
+        if max_distance is not None and max_distance <= 0:
+            raise ValueError("max_distance must be positive.")
         self.level = level
         self.date = date
         self.return_geometry = return_geometry
+        if engine != "sql":
+            self.engine = engine
+        if max_distance is not None:
+            self.max_distance = float(max_distance)
 
         super().__init__()
 
     @property
-    def column_names(self) -> List[str]:
+    def _id_cols(self) -> List[str]:
         cols = get_columns_for_level(self.level)
 
         try:
@@ -80,6 +169,17 @@ class DistanceMatrix(GraphMixin, Query):
             cols.remove("lon")
         except ValueError:
             pass  # Nothing to remove
+        return cols
+
+    @property
+    def _location_table(self) -> str:
+        return "infrastructure." + (
+            "sites" if self.level == "versioned-site" else "cells"
+        )
+
+    @property
+    def column_names(self) -> List[str]:
+        cols = self._id_cols
 
         col_names = [f"{c}_from" for c in cols]
         col_names += [f"{c}_to" for c in cols]
@@ -91,15 +191,16 @@ class DistanceMatrix(GraphMixin, Query):
         return col_names
 
     def _make_query(self):
-        cols = get_columns_for_level(self.level)
-        sql_location_table = "SELECT * FROM infrastructure." + (
-            "sites" if self.level == "versioned-site" else "cells"
-        )
-        try:
-            cols.remove("lat")
-            cols.remove("lon")
-        except ValueError:
-            pass  # Nothing to remove
+        # The numpy engine is only used to store the distances, so until they
+        # are stored they are calculated by the sql engine
+        return self._distance_sql()
+
+    def _distance_sql(self):
+        """
+        SQL which calculates the distances in the database.
+        """
+        cols = self._id_cols
+        sql_location_table = f"SELECT * FROM {self._location_table}"
 
         from_cols = ", ".join(
             "A.{c_id_safe} AS {c}_from".format(
@@ -122,6 +223,16 @@ class DistanceMatrix(GraphMixin, Query):
                 B.geom_point AS geom_destination
             """
 
+        max_distance_statement = ""
+        if self.max_distance is not None:
+            max_distance_statement = f"""
+            WHERE ST_DWithin(
+                A.geom_point::geography,
+                B.geom_point::geography,
+                {self.max_distance * 1000}
+            )
+            """
+
         sql = """
 
             SELECT
@@ -138,6 +249,7 @@ class DistanceMatrix(GraphMixin, Query):
                 {return_geometry_statement}
             FROM ({location_table_statement}) AS A
             CROSS JOIN ({location_table_statement}) AS B
+            {max_distance_statement}
             ORDER BY distance DESC
             
         """.format(
@@ -145,6 +257,176 @@ class DistanceMatrix(GraphMixin, Query):
             froms=from_cols,
             tos=to_cols,
             return_geometry_statement=return_geometry_statement,
+            max_distance_statement=max_distance_statement,
         )
 
         return sql
+
+    def _to_partitioned_sql(
+        self,
+        name: str,
+        schema: Union[str, None],
+        force: bool,
+        partition_by: "Partitioning",
+    ) -> "Query":
+        if self.engine == "numpy":
+            raise ValueError("The numpy engine can't store a partitioned table.")
+        return super()._to_partitioned_sql(name, schema, force, partition_by)
+
+    def _to_unpartitioned_sql(
+        self, name: str, schema: Union[str, None], force: bool
+    ) -> "Query":
+        if self.engine == "sql":
+            return super()._to_unpartitioned_sql(name, schema, force)
+        full_name = name if schema is None else f"{schema}.{name}"
+        if self.connection.has_table(name, schema=schema) and not force:
+            logger.info("Table already exists")
+            return self
+        if force:
+            self.invalidate_db_cache(name, schema=schema)
+        start = time.perf_counter()
+        self._store_distances(full_name)
+        compute_time = (time.perf_counter() - start) * 1000
+        if schema == "cache":
+            self._db_store_cache_metadata(compute_time=compute_time)
+        refresh_catalog_cache(schema, name)
+        bump_cache_generation(self.redis)
+        return self
+
+    def _locations(self) -> pd.DataFrame:
+        """
+        Fetch the id, version and coordinates of every location.
+        """
+        return pd.DataFrame(
+            self.connection.fetch(
+                f"""
+                SELECT id, version, ST_X(geom_point::geometry), ST_Y(geom_point::geometry)
+                FROM {self._location_table}
+                """
+            ),
+            columns=["id", "version", "lon", "lat"],
+        )
+
+    def _distance_blocks(self, locations: pd.DataFrame):
+        """
+        Calculate the distances between locations a block of origins at a time.
+
+        Parameters
+        ----------
+        locations : pandas.DataFrame
+            Locations, as returned by `_locations`
+
+        Yields
+        ------
+        pandas.DataFrame
+            Rows of the distance matrix, for a block of origins
+        """
+        lon = locations.lon.values.astype(float)
+        lat = locations.lat.values.astype(float)
+        n_locations = len(locations)
+        tree = None
+        if self.max_distance is not None and cKDTree is not None:
+            # Neighbours are found by the straight line distance between points on
+            # the unit sphere, which is the chord subtending the great circle distance
+            has_coords = ~(np.isnan(lon) | np.isnan(lat))
+            lon_rad, lat_rad = np.radians(lon), np.radians(lat)
+            xyz = np.column_stack(
+                [
+                    np.cos(lat_rad) * np.cos(lon_rad),
+                    np.cos(lat_rad) * np.sin(lon_rad),
+                    np.sin(lat_rad),
+                ]
+            )
+            chord = 2 * np.sin(min(self.max_distance / EARTH_RADIUS, np.pi) / 2)
+            indexed = np.flatnonzero(has_coords)
+            tree = cKDTree(xyz[indexed])
+        for block_start in range(0, n_locations, self.block_size):
+            block = np.arange(
+                block_start, min(block_start + self.block_size, n_locations)
+            )
+            if tree is not None:
+                neighbours = tree.query_ball_point(xyz[block], chord * (1 + 1e-9))
+                origins = np.repeat(block, [len(n) for n in neighbours])
+                destinations = indexed[np.concatenate(neighbours).astype(int)]
+            else:
+                origins = np.repeat(block, n_locations)
+                destinations = np.tile(np.arange(n_locations), len(block))
+            distance = haversine(
+                lon[origins], lat[origins], lon[destinations], lat[destinations]
+            )
+            if self.max_distance is not None:
+                within = distance <= self.max_distance
+                origins, destinations, distance = (
+                    origins[within],
+                    destinations[within],
+                    distance[within],
+                )
+            yield pd.DataFrame(
+                {
+                    "id_from": locations.id.values[origins],
+                    "id_to": locations.id.values[destinations],
+                    "version_from": locations.version.values[origins],
+                    "version_to": locations.version.values[destinations],
+                    "lon_from": lon[origins],
+                    "lat_from": lat[origins],
+                    "lon_to": lon[destinations],
+                    "lat_to": lat[destinations],
+                    "distance": distance,
+                }
+            )
+
+    def _store_distances(self, full_name: str):
+        """
+        Calculate the distances in Python, and copy them into a new table.
+
+        Parameters
+        ----------
+        full_name : str
+            Schema qualified name of the table to create
+        """
+        locations = self._locations()
+        logger.debug(
+            f"Calculating distances between {len(locations)} locations in blocks of {self.block_size}."
+        )
+        id_col, version_col = self._id_cols
+        columns = [
+            "id_from",
+            "version_from",
+            "id_to",
+            "version_to",
+            "lon_from",
+            "lat_from",
+            "lon_to",
+            "lat_to",
+            "distance",
+        ]
+        raw_connection = self.connection.engine.raw_connection()
+        try:
+            with raw_connection.cursor() as cursor:
+                # Take the column types from the sql the table would otherwise be made from
+                cursor.execute(
+                    f"CREATE TABLE {full_name} AS (SELECT {self.column_names_as_string_list} FROM ({self._distance_sql()}) _) WITH NO DATA"
+                )
+                for block in self._distance_blocks(locations):
+                    buffer = io.StringIO()
+                    block.to_csv(buffer, columns=columns, header=False, index=False)
+                    buffer.seek(0)
+                    cursor.copy_expert(
+                        f"""COPY {full_name} ({id_col}_from, {version_col}_from, {id_col}_to, {version_col}_to,
+                        lon_from, lat_from, lon_to, lat_to, distance) FROM STDIN WITH (FORMAT csv)""",
+                        buffer,
+                    )
+                for ix in self.index_cols:
+                    cursor.execute(
+                        "CREATE INDEX ON {tbl} ({ixen})".format(
+                            tbl=full_name,
+                            ixen=",".join(ix) if isinstance(ix, list) else ix,
+                        )
+                    )
+                cursor.execute(f"ANALYZE {full_name}")
+            raw_connection.commit()
+        except Exception:
+            raw_connection.rollback()
+            raise
+        finally:
+            raw_connection.close()
@@ -11,7 +11,6 @@ of events see feature subscriber_locations.
 
 """
 
-from functools import reduce
 from typing import List
 
 from flowmachine.core import Query
@@ -54,9 +53,7 @@ class DayTrajectories(MultiLocation, BaseLocation, Query):
         # This query represents the concatenated locations of the
         # subscribers. Similar to the first step when calculating
         # ModalLocations. See modal_locations.py
-        all_locs = reduce(
-            lambda x, y: x.union(y), (self._append_date(dl) for dl in self._all_dls)
-        )
+        all_locs = self._unioned_locations()
 
         sql = """
         SELECT 
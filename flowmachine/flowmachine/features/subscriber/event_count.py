@@ -92,6 +92,13 @@ class EventCount(SubscriberFeature):
     def column_names(self) -> List[str]:
         return ["subscriber", "event_count"]
 
+    def _event_aggregates(self) -> List[str]:
+        if self.direction == "both":
+            return ["COUNT(*)"]
+        return [
+            f"NULLIF(COUNT(*) FILTER (WHERE outgoing = {'TRUE' if self.direction == 'out' else 'FALSE'}), 0)"
+        ]
+
     def _make_query(self):
         where_clause = ""
         if self.direction != "both":
@@ -9,6 +9,7 @@ Here you find metaclasses for building subscriber features.
 """
 import logging
 import warnings
+from typing import List, Optional
 
 from ...core.query import Query
 from ..utilities.spatial_aggregates import JoinedSpatialAggregate
@@ -43,6 +44,22 @@ class SubscriberFeature(Query):
         """
         return JoinedSpatialAggregate(self, locations, method=method)
 
+    def _event_aggregates(self) -> Optional[List[str]]:
+        """
+        SQL aggregates which compute this feature from the rows of its
+        `unioned_query`, grouped by subscriber, for features which can be
+        computed alongside others in one pass over the same events (see
+        `feature_collection`).
+
+        Returns
+        -------
+        list of str or None
+            One aggregate for each column after the subscriber column, which
+            is null for subscribers this feature has no row for, or None if
+            the feature can't be computed this way.
+        """
+        return None
+
     def __getitem__(self, item):
 
         return self.subset(col="subscriber", subset=item)
@@ -12,22 +12,40 @@ The modal daily location of a subscriber.
 """
 from typing import List
 
-from functools import reduce
-
 from flowmachine.core import Query
+from flowmachine.core.mixins import IncrementalMixin
 from flowmachine.features.utilities.subscriber_locations import BaseLocation
 from flowmachine.utils import get_columns_for_level
 from ..utilities.multilocation import MultiLocation
 
 
-class ModalLocation(MultiLocation, BaseLocation, Query):
+class ModalLocation(IncrementalMixin, MultiLocation, BaseLocation, Query):
     """
     ModalLocation is the mode of multiple DailyLocations (or other similar
     location like objects.) It can be instantiated with either a date range
     or a list of DailyLocations (the former is more common). It gives each
     subscriber only one location.
+
+    Parameters
+    ----------
+    daily_locations : flowmachine.Query
+        Daily location objects to take the mode of
+    incremental : bool, default False
+        If True, storing this query first stores each of the daily locations
+        which is not already stored, so a modal location over a range one day
+        longer than one already stored only computes the new day. The result
+        is the same whether or not the query is incremental.
     """
 
+    def __init__(self, *daily_locations, incremental: bool = False):
+        if incremental:
+            self.incremental = True
+        super().__init__(*daily_locations)
+
+    @property
+    def _incremental_parts(self) -> List[Query]:
+        return list(self._all_dls)
+
     @property
     def column_names(self) -> List[str]:
         return ["subscriber"] + get_columns_for_level(self.level, self.column_name)
@@ -41,9 +59,7 @@ class ModalLocation(MultiLocation, BaseLocation, Query):
 
         # This query represents the concatenated locations of the
         # subscribers
-        all_locs = reduce(
-            lambda x, y: x.union(y), (self._append_date(dl) for dl in self._all_dls)
-        )
+        all_locs = self._unioned_locations()
 
         times_visited = """
         SELECT all_locs.subscriber, {rc}, count(*) AS total, max(all_locs.date) as date
@@ -95,6 +95,23 @@ class NocturnalEvents(SubscriberFeature):
     def column_names(self):
         return ["subscriber", "value"]
 
+    def _event_aggregates(self):
+        filter_clause = ""
+        if self.direction != "both":
+            filter_clause = f"FILTER (WHERE outgoing IS {'TRUE' if self.direction == 'out' else 'FALSE'})"
+        return [
+            f"""
+            AVG(
+                CASE
+                    WHEN extract(hour FROM datetime) >= {self.hours[0]}
+                      OR extract(hour FROM datetime) < {self.hours[1]}
+                    THEN 1
+                ELSE 0
+                END
+            ) {filter_clause}*100
+            """
+        ]
+
     def _make_query(self):
         where_clause = ""
         if self.direction != "both":
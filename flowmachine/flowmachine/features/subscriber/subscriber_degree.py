@@ -9,7 +9,7 @@ have done over a certain time period.
 
 
 """
-from typing import List
+from typing import List, Optional
 
 from .metaclasses import SubscriberFeature
 from ..utilities import EventsTablesUnion
@@ -103,6 +103,19 @@ class SubscriberDegree(SubscriberFeature):
     def column_names(self) -> List[str]:
         return ["subscriber", "value"]
 
+    def _event_aggregates(self) -> Optional[List[str]]:
+        if not self.exclude_self_calls:
+            # Counting distinct counterparts would miss a null counterpart
+            return None
+        filters = ["subscriber != msisdn_counterpart"]
+        if self.direction != "both":
+            filters.append(
+                f"outgoing = {'TRUE' if self.direction == 'out' else 'FALSE'}"
+            )
+        return [
+            f"NULLIF(COUNT(DISTINCT msisdn_counterpart) FILTER (WHERE {' AND '.join(filters)}), 0)"
+        ]
+
     def _make_query(self):
 
         filters = []
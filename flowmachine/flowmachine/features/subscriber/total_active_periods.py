@@ -26,7 +26,7 @@ from .metaclasses import SubscriberFeature
 from flowmachine.utils import time_period_add
 from ..utilities.sets import UniqueSubscribers
 
-from functools import reduce
+from ...core.union import Union
 
 
 class TotalActivePeriodsSubscriber(SubscriberFeature):
@@ -132,7 +132,7 @@ class TotalActivePeriodsSubscriber(SubscriberFeature):
             UniqueSubscribers(start, stop, **kwargs)
             for start, stop in zip(self.starts, self.stops)
         ]
-        return reduce(lambda x, y: x.union(y), all_subscribers)
+        return Union(*all_subscribers)
 
     @property
     def column_names(self) -> List[str]:
@@ -5,11 +5,20 @@
 """
 Class definition for feature_collection, this is a group of
 joined features.
+
+Features computed from the same events, which can be computed from them
+as aggregates for each subscriber, are computed together in one pass
+over those events rather than each scanning them separately.
 """
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
 from flowmachine.core.join import Join
+from flowmachine.core.query import Query
+from .events_tables_union import EventsTablesUnion
 
 
-def feature_collection(metrics, dropna=True) -> Join:
+def feature_collection(metrics, dropna=True, shared_scan=True) -> Query:
     """
     Joined set of features. Takes a set of features and creates
     one wide dataset about these features. Most often used to gather
@@ -24,6 +33,11 @@ def feature_collection(metrics, dropna=True) -> Join:
     dropna : bool
         Keeps rows in which a subscriber has some but not 
         all of the features. 
+    shared_scan : bool, default True
+        If True, features which are computed from the same events, such
+        as `EventCount`, `NocturnalEvents` and `SubscriberDegree` over the
+        same dates, tables, hours and subscribers, are computed together
+        in one pass over a single scan of those events.
 
     Examples
     --------
@@ -75,8 +89,9 @@ def feature_collection(metrics, dropna=True) -> Join:
 
     Returns
     -------
-    Join
-        A Join object combining all the features
+    Join or FeatureCollection
+        A Join object combining all the features, or a FeatureCollection
+        if some of them share a scan of the events
 
     Notes
     -----
@@ -86,13 +101,14 @@ def feature_collection(metrics, dropna=True) -> Join:
     multiple times but with different parameters.
 
     """
-
+    if shared_scan:
+        return _share_scans(list(metrics), dropna)
     return _join_queries(metrics, dropna)
 
 
 def feature_collection_from_list_of_classes(
-    classes, *args, dropna=False, **kwargs
-) -> Join:
+    classes, *args, dropna=False, shared_scan=True, **kwargs
+) -> Query:
     """
     Create a feature collection from uninstantiated classes with common arguments.
 
@@ -102,12 +118,196 @@ def feature_collection_from_list_of_classes(
 
     Returns
     -------
-    Join
-        A Join object combining all the features
+    Join or FeatureCollection
+        A Join object combining all the features, or a FeatureCollection
+        if some of them share a scan of the events
     """
 
     metrics = [c(*args, **kwargs) for c in classes]
-    return feature_collection(metrics, dropna=dropna)
+    return feature_collection(metrics, dropna=dropna, shared_scan=shared_scan)
+
+
+class SubscriberEventAggregates(Query):
+    """
+    Several features computed for each subscriber in one grouped pass over
+    the events they are all computed from.
+
+    Parameters
+    ----------
+    events : EventsTablesUnion
+        Events with every column the features use
+    aggregates : dict
+        Mapping from the name of each column to the SQL aggregate over the
+        events which gives it. Subscribers for whom every aggregate is null
+        are left out.
+    """
+
+    def __init__(self, events: EventsTablesUnion, aggregates: Dict[str, str]):
+        self.events = events
+        self.aggregates = aggregates
+        super().__init__()
+
+    @property
+    def column_names(self) -> List[str]:
+        return ["subscriber", *self.aggregates.keys()]
+
+    def _make_query(self):
+        targets = ", ".join(
+            f"{aggregate} AS {column}" for column, aggregate in self.aggregates.items()
+        )
+        any_value = " OR ".join(
+            f"{aggregate} IS NOT NULL" for aggregate in self.aggregates.values()
+        )
+        return f"""
+        SELECT subscriber, {targets}
+        FROM ({self.events.get_query()}) AS events
+        GROUP BY subscriber
+        HAVING {any_value}
+        """
+
+
+class FeatureCollection(Query):
+    """
+    Features joined on their first column in a single query, which may
+    select several of them from one `SubscriberEventAggregates`.
+
+    Parameters
+    ----------
+    queries : list of Query
+        Queries to join, all with the same first column
+    columns : dict
+        Mapping from the name of each column after the first to the md5 of
+        the query it comes from, and its name in that query
+    dropna : bool, default True
+        If True, only keep rows which have a value for every feature
+    """
+
+    def __init__(self, queries: List[Query], columns: Dict[str, list], dropna=True):
+        self.queries = queries
+        self.columns = columns
+        self.dropna = dropna
+        super().__init__()
+
+    @property
+    def column_names(self) -> List[str]:
+        return [self.queries[0].column_names[0], *self.columns.keys()]
+
+    def _make_query(self):
+        on = self.queries[0].column_names[0]
+        aliases = {query.md5: f"t{i}" for i, query in enumerate(self.queries)}
+        shared = {
+            query.md5
+            for query in self.queries
+            if isinstance(query, SubscriberEventAggregates)
+        }
+        targets = [on] + [
+            f"{aliases[md5]}.{column} AS {name}"
+            for name, (md5, column) in self.columns.items()
+        ]
+        join = "INNER JOIN" if self.dropna else "FULL OUTER JOIN"
+        from_clause = f"({self.queries[0].get_query()}) AS t0" + "".join(
+            f"\n{join} ({query.get_query()}) AS t{i} USING ({on})"
+            for i, query in enumerate(self.queries[1:], start=1)
+        )
+        where_clause = ""
+        if self.dropna:
+            # Features computed together have a row even if only one of them has a value
+            not_null = [
+                f"{aliases[md5]}.{column} IS NOT NULL"
+                for md5, column in self.columns.values()
+                if md5 in shared
+            ]
+            if len(not_null) > 0:
+                where_clause = f"WHERE {' AND '.join(not_null)}"
+        return f"""
+        SELECT {", ".join(targets)}
+        FROM {from_clause}
+        {where_clause}
+        """
+
+
+def _column_name(query, column, i):
+    return f"{column}_{query.__class__.__name__.lower()}_{i}"
+
+
+def _event_source(query) -> Optional[tuple]:
+    """
+    The events a feature is computed from, if it can be computed from them
+    along with other features, as a key which is the same for any features
+    computed from the same events.
+    """
+    try:
+        aggregates = query._event_aggregates()
+        events = query.unioned_query
+    except AttributeError:
+        return None
+    if aggregates is None or not isinstance(events, EventsTablesUnion):
+        return None
+    subset = events.date_subsets[0]
+    return (
+        events.start,
+        events.stop,
+        tuple(
+            date_subset.table_ORIG.fully_qualified_table_name
+            for date_subset in events.date_subsets
+        ),
+        subset.hours if isinstance(subset.hours, str) else tuple(subset.hours),
+        subset.subscriber_identifier,
+        subset.subscriber_subsetter.md5,
+    )
+
+
+def _share_scans(queries, dropna) -> Query:
+    """
+    Join queries as `_join_queries` does, but compute each group of two or
+    more features which are computed from the same events in one pass over
+    them. If no features share their events, this is just `_join_queries`.
+    """
+    groups = OrderedDict()
+    for i, query in enumerate(queries):
+        source = _event_source(query)
+        if source is not None:
+            groups.setdefault(source, []).append(i)
+
+    shared = {}  # Position in queries -> the query computing it with others
+    for source, positions in groups.items():
+        if len(positions) < 2:
+            continue
+        start, stop, tables, hours, subscriber_identifier, _ = source
+        first_subset = queries[positions[0]].unioned_query.date_subsets[0]
+        aggregates = OrderedDict()
+        columns = set()
+        for i in positions:
+            query = queries[i]
+            for column, aggregate in zip(
+                query.column_names[1:], query._event_aggregates()
+            ):
+                aggregates[_column_name(query, column, i)] = aggregate
+            columns.update(column.lower() for column in query.unioned_query.columns)
+        events = EventsTablesUnion(
+            start,
+            stop,
+            columns=sorted(columns),
+            tables=list(tables),
+            hours=hours,
+            subscriber_subset=first_subset.subscriber_subset_ORIG,
+            subscriber_identifier=subscriber_identifier,
+        )
+        shared_query = SubscriberEventAggregates(events, aggregates)
+        for i in positions:
+            shared[i] = shared_query
+    if len(shared) == 0:
+        return _join_queries(queries, dropna)
+
+    parts = OrderedDict()  # md5 -> query
+    columns = OrderedDict()
+    for i, query in enumerate(queries):
+        part = shared.get(i, query)
+        parts[part.md5] = part
+        for column in query.column_names[1:]:
+            name = _column_name(query, column, i)
+            columns[name] = [part.md5, name if i in shared else column]
+    return FeatureCollection(list(parts.values()), columns, dropna=dropna)
 
 
 # Private function that joins multiple queries together
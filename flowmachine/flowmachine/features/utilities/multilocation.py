@@ -16,6 +16,7 @@ import logging
 from flowmachine.utils import parse_datestring, get_columns_for_level
 
 from ...core import CustomQuery
+from ...core.union import Union
 
 logger = logging.getLogger("flowmachine").getChild(__name__)
 
@@ -84,6 +85,17 @@ class MultiLocation:
             sql, get_columns_for_level(self.level, self.column_name) + ["date"]
         )
 
+    def _unioned_locations(self):
+        """
+        Returns a query representing the locations of the subscribers on each
+        day, with the date, as a single union of every daily location.
+
+        Returns
+        -------
+        Union
+        """
+        return Union(*(self._append_date(dl) for dl in self._all_dls))
+
     def _get_relevant_columns(self):
         """
         Get a string of the location related columns
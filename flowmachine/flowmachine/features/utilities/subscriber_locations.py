@@ -3,7 +3,7 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 from abc import ABCMeta
 
-from typing import List
+from typing import List, Optional
 
 """
 Classes for determining elementary location elements.
@@ -25,6 +25,8 @@ logger = logging.getLogger("flowmachine").getChild(__name__)
 class _SubscriberCells(Query):
     # Passing table='all' means it will look at all tables with location
     # data.
+    read_sightings = True
+
     def __init__(
         self,
         start,
@@ -35,6 +37,7 @@ class _SubscriberCells(Query):
         ignore_nulls=True,
         *,
         subscriber_subset=None,
+        read_sightings=True,
     ):
 
         self.start = start
@@ -47,6 +50,9 @@ class _SubscriberCells(Query):
         self.column_name = None
 
         self.tables = table
+        if not read_sightings:
+            # Left out when True, so that the md5 is the same as before sightings
+            self.read_sightings = False
         cols = [self.subscriber_identifier, "datetime", "location_id"]
         self.unioned = EventsTablesUnion(
             self.start,
@@ -63,7 +69,54 @@ class _SubscriberCells(Query):
     def column_names(self) -> List[str]:
         return ["subscriber", "time", "location_id"]
 
+    def _sightings_sql(
+        self, level: str, columns: List[str], column_name=None
+    ) -> Optional[str]:
+        """
+        SQL selecting these sightings of subscribers, with their locations
+        at `level`, from the stored subscriber sightings, if they are stored
+        for every day this covers.
+
+        Parameters
+        ----------
+        level : str
+            Level the locations are resolved to
+        columns : list of str
+            Columns to select
+        column_name : str or list of str, optional
+            Location columns asked for, which must be the default ones
+
+        Returns
+        -------
+        str or None
+            The SQL, or None if the sightings aren't stored, or can't
+            give these rows.
+        """
+        if (
+            not self.read_sightings
+            or not self.ignore_nulls
+            or column_name is not None
+            or self.unioned.date_subsets[0].subscriber_subsetter.is_proper_subset
+        ):
+            return None
+        from .subscriber_sightings import (
+            stored_sightings_sql,
+        )  # Local import to avoid circular import
+
+        return stored_sightings_sql(
+            self.start,
+            self.stop,
+            level=level,
+            hours=self.hours,
+            table=self.table,
+            subscriber_identifier=self.subscriber_identifier,
+            columns=columns,
+        )
+
     def _make_query(self):
+        sightings_sql = self._sightings_sql("cell", self.column_names)
+        if sightings_sql is not None:
+            return sightings_sql
 
         if self.ignore_nulls:
             where_clause = "WHERE location_id IS NOT NULL AND location_id !=''"
@@ -130,6 +183,7 @@ def subscriber_locations(
     polygon_table=None,
     size=None,
     radius=None,
+    read_sightings=True,
 ):
     """
     Class representing all the locations for which a subscriber has been found.
@@ -183,6 +237,12 @@ def subscriber_locations(
         no information on the subscribers location, they still tell us that the subscriber made
         a call at that time.
     column_name : str or list of strings
+    read_sightings : bool, default True
+        If True, select the sightings from the stored subscriber sightings
+        for each day (see `store_subscriber_sightings`) when they are stored
+        for every day this covers, rather than from the events tables. They
+        are only used for levels in `SIGHTINGS_LEVELS`, with no subscriber
+        subset, and when ignoring nulls.
     kwargs :
         Eventually passed to flowmachine.JoinToLocation.
 
@@ -217,6 +277,7 @@ def subscriber_locations(
         subscriber_subset=subscriber_subset,
         subscriber_identifier=subscriber_identifier,
         ignore_nulls=ignore_nulls,
+        read_sightings=read_sightings,
     )
 
     if level == "cell":
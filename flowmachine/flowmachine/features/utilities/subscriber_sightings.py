@@ -0,0 +1,253 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Per-day tables of every sighting of a subscriber at a location, which
+`subscriber_locations` reads from, instead of the events tables and the
+infrastructure tables, whenever they are stored for every day it covers.
+"""
+import logging
+from concurrent.futures import Future
+from typing import List, Optional, Union
+
+import pandas as pd
+
+from ...core.errors import BadLevelError, MissingDateError
+from ...core.query import Query
+from flowmachine.utils import list_of_dates
+
+logger = logging.getLogger("flowmachine").getChild(__name__)
+
+# Levels which need no more than a level name to resolve locations to
+SIGHTINGS_LEVELS = [
+    "cell",
+    "versioned-cell",
+    "versioned-site",
+    "lat-lon",
+    "admin0",
+    "admin1",
+    "admin2",
+    "admin3",
+]
+
+
+class SubscriberSightings(Query):
+    """
+    Every sighting of a subscriber on one day: the time and cell of each
+    event with a cell, and the location at `level` of the version of the
+    cell in service that day.
+
+    These are the rows `subscriber_locations` gives for that day, and once
+    they are stored, `subscriber_locations` over any range of days which
+    all have stored sightings selects from them, rather than repeating the
+    union of the events tables, the null filtering and the join to the
+    infrastructure tables. Sightings at the "cell" level are the base for
+    any other level whose sightings aren't stored.
+
+    Parameters
+    ----------
+    date : str
+        ISO format date of the day
+    level : str, default "cell"
+        Level to resolve locations to, one of `SIGHTINGS_LEVELS`
+    table : str or list of str, default "all"
+        Events tables to take sightings from, as for `subscriber_locations`
+    subscriber_identifier : {'msisdn', 'imei'}, default 'msisdn'
+        Either msisdn, or imei, the column that identifies the subscriber.
+
+    See Also
+    --------
+    store_subscriber_sightings
+    """
+
+    def __init__(
+        self, date, *, level="cell", table="all", subscriber_identifier="msisdn"
+    ):
+        from .subscriber_locations import subscriber_locations
+
+        if level not in SIGHTINGS_LEVELS:
+            raise BadLevelError(level, SIGHTINGS_LEVELS)
+        day = pd.Timestamp(date)
+        self.date = day.strftime("%Y-%m-%d")
+        self.next_date = (day + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+        self.level = level
+        self.table = table
+        self.subscriber_identifier = subscriber_identifier
+        # Read from the events, even if the sightings for the day are stored
+        self.locations = subscriber_locations(
+            self.date,
+            self.next_date,
+            level=level,
+            table=table,
+            subscriber_identifier=subscriber_identifier,
+            read_sightings=False,
+        )
+        super().__init__()
+
+    @property
+    def column_names(self) -> List[str]:
+        return self.locations.column_names
+
+    @property
+    def index_cols(self):
+        return super().index_cols + ["time"]
+
+    def _make_query(self):
+        # Events at midnight at the end of the day belong to the next day
+        return f"""
+        SELECT {self.column_names_as_string_list}
+        FROM ({self.locations.get_query()}) AS sightings
+        WHERE time < '{self.next_date}'
+        """
+
+
+def stored_sightings_sql(
+    start,
+    stop,
+    *,
+    level,
+    hours="all",
+    table="all",
+    subscriber_identifier="msisdn",
+    columns: List[str],
+) -> Optional[str]:
+    """
+    SQL selecting the sightings between two times from the stored sightings
+    for each day, if the sightings at this level are stored for every day
+    between them which has events.
+
+    Parameters
+    ----------
+    start, stop : str
+        ISO format datetimes, as for `subscriber_locations`
+    level : str
+        Level the locations are resolved to
+    hours : tuple of ints, default 'all'
+        Only include sightings within these hours of each day
+    table : str or list of str, default "all"
+        Events tables the sightings come from
+    subscriber_identifier : {'msisdn', 'imei'}, default 'msisdn'
+        Either msisdn, or imei, the column that identifies the subscriber.
+    columns : list of str
+        Columns to select
+
+    Returns
+    -------
+    str or None
+        The SQL, or None if sightings at this level aren't stored for
+        every day.
+    """
+    if level not in SIGHTINGS_LEVELS or start is None or stop is None:
+        return None
+    if not Query.connection.fetch(
+        "SELECT EXISTS (SELECT 1 FROM cache.cached WHERE class = 'SubscriberSightings')"
+    )[0][0]:
+        # Skip checking each day when no sightings have been stored at all
+        return None
+    ts_start = pd.Timestamp(start).strftime("%Y-%m-%d %H:%M:%S")
+    ts_stop = pd.Timestamp(stop).strftime("%Y-%m-%d %H:%M:%S")
+    sightings = []
+    for date in list_of_dates(ts_start[:10], ts_stop[:10]):
+        try:
+            sightings.append(
+                SubscriberSightings(
+                    date,
+                    level=level,
+                    table=table,
+                    subscriber_identifier=subscriber_identifier,
+                )
+            )
+        except MissingDateError:
+            # No events that day, so no sightings either
+            pass
+    if len(sightings) == 0:
+        return None
+    ids = ", ".join(f"'{sighting.md5}'" for sighting in sightings)
+    n_stored = Query.connection.fetch(
+        f"""SELECT count(*) FROM cache.cached WHERE query_id IN ({ids})
+        AND to_regclass(schema || '.' || tablename) IS NOT NULL"""
+    )[0][0]
+    if n_stored < len(sightings):
+        return None
+
+    filters = [f"time >= '{ts_start}'", f"time <= '{ts_stop}'"]
+    if hours != "all":
+        hour_start, hour_end = hours
+        if hour_start < hour_end:
+            filters.append(
+                f"extract(hour FROM time) BETWEEN {hour_start} AND {hour_end - 1}"
+            )
+        else:
+            # If hours are backwards, then this will be interpreted as spanning midnight
+            filters.append(
+                f"(extract(hour FROM time) >= {hour_start} OR extract(hour FROM time) < {hour_end})"
+            )
+    unioned = "\nUNION ALL\n".join(
+        f"({sighting.get_query()})" for sighting in sightings
+    )
+    return f"""
+    SELECT {", ".join(columns)}
+    FROM ({unioned}) AS sightings
+    WHERE {" AND ".join(filters)}
+    """
+
+
+def store_subscriber_sightings(
+    start: Optional[str] = None,
+    stop: Optional[str] = None,
+    *,
+    levels: Union[str, List[str]] = "cell",
+    table: Union[str, List[str]] = "all",
+    subscriber_identifier: str = "msisdn",
+) -> List[Future]:
+    """
+    Store the subscriber sightings for every day with events which doesn't
+    already have them stored, so that `subscriber_locations` can read from
+    them. Run this after each day of events is ingested, or have the
+    FlowMachine server run it periodically (see
+    `FLOWMACHINE_SUBSCRIBER_SIGHTINGS_LEVELS`).
+
+    Parameters
+    ----------
+    start, stop : str, optional
+        ISO format dates of the first and last days to store sightings for.
+        By default, every day with events.
+    levels : str or list of str, default "cell"
+        Levels to store sightings at, from `SIGHTINGS_LEVELS`
+    table : str or list of str, default "all"
+        Events tables to take sightings from
+    subscriber_identifier : {'msisdn', 'imei'}, default 'msisdn'
+        Either msisdn, or imei, the column that identifies the subscriber.
+
+    Returns
+    -------
+    list of concurrent.futures.Future
+        Futures for the sightings being stored
+    """
+    if isinstance(levels, str):
+        levels = [levels]
+    if isinstance(table, str) and table.lower() == "all":
+        tables = "all"
+    else:
+        tables = tuple(
+            t.split(".")[-1] for t in ([table] if isinstance(table, str) else table)
+        )
+    available = Query.connection.available_dates(start=start, stop=stop, table=tables)
+    dates = sorted({date for dates in available.values() for date in dates})
+    futures = []
+    for date in dates:
+        for level in levels:
+            try:
+                sightings = SubscriberSightings(
+                    date,
+                    level=level,
+                    table=table,
+                    subscriber_identifier=subscriber_identifier,
+                )
+            except MissingDateError:
+                continue
+            if not sightings.is_stored:
+                futures.append(sightings.store())
+    logger.info(f"Storing {len(futures)} days of subscriber sightings.")
+    return futures
@@ -28,6 +28,7 @@ import logging
 import warnings
 from typing import List
 
+import numpy as np
 import pandas as pd
 
 from flowmachine.features import daily_location
@@ -288,52 +289,6 @@ class PopulationWeightedOpportunities(Model):
             distance_matrix=self.distance_matrix,
         )
 
-    def __get_population(self, df, i):
-        """
-        Protected getter method for getting
-        the location value of the self.population_df
-        DataFrame.
-
-        Parameters
-        ----------
-        i : object
-            The index in the self.population_df DataFrame
-            containing the location identifier.
-
-        Returns
-        -------
-        A float value with the population value
-        for location i.
-
-        """
-        return df.loc[tuple(i), "total"]
-
-    def __get_buffer_population(self, df, i, j):
-        """
-        Protected getter method for getting
-        the location value of the self.population_buffer
-        DataFrame.
-
-        Parameters
-        ----------
-        i : str
-            Location identifier of the origin location
-            in the self.population_buffer DataFrame.
-        j : str
-            Location identifier of the destination location
-            in the self.population_buffer DataFrame.
-
-        Returns
-        -------
-        A float value with the population value for
-        a pair of origin (i) and destination (j)
-        locations.
-
-        """
-        filtered = df.loc[tuple(i + j)]
-
-        return filtered["buffer_population"]
-
     @model_result
     def run(
         self,
@@ -372,24 +327,17 @@ class PopulationWeightedOpportunities(Model):
 
         """
 
-        if "population_buffer" not in self.__dict__.keys():
-            logger.warning(
-                " Computing Population() and DistanceMatrix() "
-                + "objects. This can take a few minutes."
-            )
-
-            population_df = self.population_object.get_dataframe()
-            population_buffer = self.population_buffer_object.get_dataframe()
-            ix = get_columns_for_level(self.level)
-            ix = ["{}_{}".format(c, d) for d in ("from", "to") for c in ix]
-            population_buffer.set_index(ix, inplace=True)
-
-            M = population_df["total"].sum()
-            N = len(population_df[get_columns_for_level(self.level)].drop_duplicates())
-            beta = 1 / M
+        logger.warning(
+            " Computing Population() and DistanceMatrix() "
+            + "objects. This can take a few minutes."
+        )
+        loc_cols = get_columns_for_level(self.level)
+        population_df = self.population_object.get_dataframe()
+        population_buffer = self.population_buffer_object.get_dataframe()
 
-            locations = population_df[get_columns_for_level(self.level)].values.tolist()
-            population_df.set_index(get_columns_for_level(self.level), inplace=True)
+        locations = _location_codes(population_df, loc_cols)
+        population = population_df["total"].values.astype("float64")
+        buffer_population = _buffer_population_matrix(population_buffer, locations)
 
         if not departure_rate_vector:
             logger.warning(
@@ -397,6 +345,7 @@ class PopulationWeightedOpportunities(Model):
                 + "rate of {} for ".format(uniform_departure_rate)
                 + "all locations."
             )
+            departure_rates = np.full(len(locations), uniform_departure_rate)
         elif not ignore_missing and len(departure_rate_vector) != len(locations):
             raise ValueError(
                 "Locations missing from "
@@ -404,43 +353,148 @@ class PopulationWeightedOpportunities(Model):
                 + "ignore_missing=True if locations "
                 + "without rates should be ignored."
             )
+        else:
+            # Rates are keyed by the first location column, either bare or as a 1-tuple
+            departure_rates = (
+                locations.iloc[:, 0]
+                .map(
+                    lambda x: departure_rate_vector.get(
+                        x, departure_rate_vector.get((x,), 0)
+                    )
+                )
+                .values.astype("float64")
+            )
 
-        results = []
-        for i in locations:
-            sigma = 0
-            m_i = self.__get_population(population_df, i)
-
-            if departure_rate_vector:
-                try:
-                    T_i = m_i * departure_rate_vector[i[0]]
-                except KeyError:
-                    try:
-                        T_i = m_i * departure_rate_vector[tuple(i[:1])]
-                    except KeyError:
-                        T_i = 0
-            else:
-                T_i = m_i * uniform_departure_rate
-
-            for k in [l for l in locations if l != i]:
-                m_k = self.__get_population(population_df, k)
-                S_ik = self.__get_buffer_population(population_buffer, i, k)
-
-                sigma += m_k * ((1 / S_ik) - beta)
-
-            for j in [l for l in locations if l != i]:
-                m_j = self.__get_population(population_df, j)
-                S_ij = self.__get_buffer_population(population_buffer, i, j)
-
-                T_ij = (T_i * m_j * ((1 / S_ij) - beta)) / sigma
-
-                if T_i != 0:
-                    probability = T_ij / T_i
-                else:
-                    probability = 0
-
-                results.append(i + j + [T_ij, probability])
-        ix = get_columns_for_level(self.level)
-        ix = ["{}_{}".format(c, d) for d in ("from", "to") for c in ix]
-        ix += ["prediction", "probability"]
-        res = pd.DataFrame(results, columns=ix)
+        prediction, probability = _predict_flows(
+            population, buffer_population, population * departure_rates
+        )
+
+        # Flatten to one row per (origin, destination) pair, excluding i == j,
+        # ordered by origin and then destination as the rows of the matrices are.
+        n = len(locations)
+        origins, destinations = np.nonzero(~np.eye(n, dtype=bool))
+        res = pd.concat(
+            [
+                locations.iloc[origins].add_suffix("_from").reset_index(drop=True),
+                locations.iloc[destinations].add_suffix("_to").reset_index(drop=True),
+            ],
+            axis=1,
+        )
+        res["prediction"] = prediction[origins, destinations]
+        res["probability"] = probability[origins, destinations]
         return res
+
+
+def _location_codes(population_df, loc_cols):
+    """
+    Get the locations of a population dataframe, where the position of each
+    location is the integer code used for it in the arrays used by the model.
+
+    Parameters
+    ----------
+    population_df : pandas.DataFrame
+        Dataframe with one row per location, and the location columns for the level.
+    loc_cols : list of str
+        Names of the location columns
+
+    Returns
+    -------
+    pandas.DataFrame
+        The location columns of the population dataframe, with a range index
+        giving the code of each location.
+    """
+    locations = population_df[loc_cols].reset_index(drop=True)
+    if locations.duplicated().any():
+        raise ValueError("Population has more than one row for some locations.")
+    return locations
+
+
+def _buffer_population_matrix(population_buffer, locations):
+    """
+    Build an N x N array of buffer populations, where entry (i, j) is
+    the population within the buffer around destination j with radius
+    equal to the distance from origin i.
+
+    Parameters
+    ----------
+    population_buffer : pandas.DataFrame
+        Dataframe with the origin and destination location columns, suffixed
+        with _from and _to, and a buffer_population column.
+    locations : pandas.DataFrame
+        Location columns, in the order of their codes
+
+    Returns
+    -------
+    numpy.ndarray
+        Buffer population for each pair of locations, NaN on the diagonal.
+
+    Raises
+    ------
+    KeyError
+        If there is no buffer population for some pair of different locations
+    """
+    loc_cols = locations.columns.tolist()
+    codes = locations.assign(_code=np.arange(len(locations)))
+    from_codes, to_codes = (
+        population_buffer[[f"{c}_{end}" for c in loc_cols]]
+        .rename(columns={f"{c}_{end}": c for c in loc_cols})
+        .merge(codes, how="left", on=loc_cols)["_code"]
+        .values
+        for end in ("from", "to")
+    )
+    # Pairs involving locations with no population are not part of the model
+    known = ~(np.isnan(from_codes) | np.isnan(to_codes))
+    n = len(locations)
+    buffer_population = np.full((n, n), np.nan)
+    buffer_population[
+        from_codes[known].astype(int), to_codes[known].astype(int)
+    ] = population_buffer["buffer_population"].values.astype("float64")[known]
+    missing = np.isnan(buffer_population)
+    np.fill_diagonal(missing, False)
+    if missing.any():
+        i, j = np.argwhere(missing)[0]
+        raise KeyError(
+            f"No buffer population from {tuple(locations.iloc[i])} to {tuple(locations.iloc[j])}."
+        )
+    return buffer_population
+
+
+def _predict_flows(population, buffer_population, departures):
+    """
+    Compute the population-weighted opportunities flow matrix.
+
+    For origin i and destination j, the predicted flow is
+
+        T_ij = T_i * m_j * (1 / S_ij - 1 / M) / sum_{k != i} m_k * (1 / S_ik - 1 / M)
+
+    where m is the population, S the buffer population, M the total
+    population and T_i the number of departures from i.
+
+    Parameters
+    ----------
+    population : numpy.ndarray
+        Length N array of populations, m
+    buffer_population : numpy.ndarray
+        N x N array of buffer populations, S
+    departures : numpy.ndarray
+        Length N array of the number of people leaving each location, T_i
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        N x N arrays of the predicted flow and the probability of a person
+        leaving the origin arriving at the destination. The diagonals are zero.
+    """
+    beta = 1 / population.sum()
+    attraction = population[np.newaxis, :] * ((1 / buffer_population) - beta)
+    np.fill_diagonal(attraction, 0)
+    sigma = attraction.sum(axis=1)
+    prediction = departures[:, np.newaxis] * attraction / sigma[:, np.newaxis]
+    probability = np.zeros_like(prediction)
+    np.divide(
+        prediction,
+        departures[:, np.newaxis],
+        out=probability,
+        where=departures[:, np.newaxis] != 0,
+    )
+    return prediction, probability
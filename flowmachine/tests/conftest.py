@@ -17,6 +17,7 @@ import logging
 import flowmachine
 from flowmachine.core import Query
 from flowmachine.core.cache import reset_cache
+from flowmachine.core.catalog_cache import refresh_catalog_cache
 from flowmachine.features import EventTableSubset
 
 logger = logging.getLogger()
@@ -109,6 +110,7 @@ def flowmachine_connect():
     con = flowmachine.connect()
     yield con
     reset_cache(con)
+    refresh_catalog_cache()
     con.engine.dispose()  # Close the connection
     Query.redis.flushdb()  # Empty the redis
     del Query.connection  # Ensure we recreate everything at next use
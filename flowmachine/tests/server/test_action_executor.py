@@ -0,0 +1,122 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import asyncio
+import threading
+
+import pytest
+
+from flowmachine.core.server.action_executor import (
+    ActionExecutor,
+    ActionMetrics,
+    ServerBusyError,
+)
+
+
+@pytest.mark.asyncio
+async def test_full_pool_rejects_actions():
+    """
+    Once a pool is full further actions for it are rejected, but the other pool still accepts actions.
+    """
+    executor = ActionExecutor(lookup_threads=1, query_threads=1, max_queued=0)
+    release = threading.Event()
+    blocked = asyncio.ensure_future(executor.run("poll", release.wait))
+    await asyncio.sleep(0.1)
+    with pytest.raises(ServerBusyError):
+        await executor.run("get_params", lambda: "DUMMY_PARAMS")
+    assert "DUMMY_SQL" == await executor.run("get_sql", lambda: "DUMMY_SQL")
+    release.set()
+    assert await blocked
+    assert "DUMMY_PARAMS" == await executor.run("get_params", lambda: "DUMMY_PARAMS")
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_metrics_recorded():
+    """
+    Completed and rejected actions are counted in the executor's metrics.
+    """
+    executor = ActionExecutor(lookup_threads=1, query_threads=1, max_queued=0)
+    release = threading.Event()
+    blocked = asyncio.ensure_future(executor.run("poll", release.wait))
+    await asyncio.sleep(0.1)
+    with pytest.raises(ServerBusyError):
+        await executor.run("poll", release.wait)
+    release.set()
+    await blocked
+    summary = executor.metrics.summary()
+    assert 1 == summary["poll"]["count"]
+    assert 1 == summary["poll"]["rejected"]
+    assert summary["poll"]["p50"] >= 0.1
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_failed_action_frees_slot():
+    """
+    An action which raises an error doesn't keep its place in the pool.
+    """
+    executor = ActionExecutor(lookup_threads=1, query_threads=1, max_queued=0)
+
+    def fail():
+        raise KeyError("DUMMY_KEY")
+
+    with pytest.raises(KeyError):
+        await executor.run("poll", fail)
+    assert 0 == executor.in_flight["lookup"]
+    executor.shutdown()
+
+
+@pytest.mark.parametrize(
+    "action, action_params, pool",
+    [
+        ("poll", {}, "lookup"),
+        ("run_query", {}, "query"),
+        ("get_query_metadata", {}, "lookup"),
+        ("get_query_metadata", {"include_sql": False}, "lookup"),
+        ("get_query_metadata", {"include_sql": True}, "query"),
+    ],
+)
+def test_pool_for(action, action_params, pool):
+    """
+    Test that query metadata is only fetched in the query pool when the sql is asked for.
+    """
+    assert pool == ActionExecutor.pool_for(action, action_params)
+
+
+def test_metrics_summary_percentiles():
+    """
+    Summary gives percentiles of the recorded durations.
+    """
+    metrics = ActionMetrics()
+    for duration in range(1, 101):
+        metrics.record("run_query", 0.0, float(duration))
+    summary = metrics.summary()["run_query"]
+    assert 100 == summary["count"]
+    assert 0 == summary["rejected"]
+    assert 51.0 == summary["p50"]
+    assert 99.0 == summary["p99"]
+    assert 100.0 == summary["max"]
+    assert 0.0 == summary["mean_queue_time"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_action_keeps_slot_until_finished():
+    """
+    Cancelling the wait for an action doesn't free its place in the pool while it is still running.
+    """
+    executor = ActionExecutor(lookup_threads=1, query_threads=1, max_queued=0)
+    release = threading.Event()
+    blocked = asyncio.ensure_future(executor.run("poll", release.wait))
+    await asyncio.sleep(0.1)
+    blocked.cancel()
+    await asyncio.sleep(0.1)
+    assert 1 == executor.in_flight["lookup"]
+    with pytest.raises(ServerBusyError):
+        await executor.run("poll", lambda: "DUMMY_POLL")
+    release.set()
+    await asyncio.sleep(0.1)
+    assert 0 == executor.in_flight["lookup"]
+    assert "DUMMY_POLL" == await executor.run("poll", lambda: "DUMMY_POLL")
+    executor.shutdown()
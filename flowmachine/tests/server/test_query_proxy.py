@@ -1,7 +1,11 @@
 import pytest
 from unittest.mock import Mock
 
-from flowmachine.core.server.query_proxy import QueryProxy, QueryProxyError
+from flowmachine.core.server.query_proxy import (
+    QueryProxy,
+    QueryProxyError,
+    get_result_info_for_query_id,
+)
 from flowmachine.core.query import Query
 from flowmachine.features import daily_location
 
@@ -175,3 +179,85 @@ def test_get_sql(dummy_redis, monkeypatch):
     #
     sql = query_proxy.get_sql()
     assert "SELECT * FROM dummy_table" == sql
+
+
+def test_get_metadata(dummy_redis, monkeypatch):
+    """
+    Metadata gives the kind, params and status of a query, and its sql only once it is done and if asked for.
+    """
+    q = Mock(spec=Query)
+    q.md5 = "dummy_query_id"
+
+    def dummy_construct_query_object(query_kind, params):
+        return q
+
+    query_proxy = QueryProxy(
+        "dummy_query",
+        {"param": "some_value"},
+        redis=dummy_redis,
+        func_construct_query_object=dummy_construct_query_object,
+    )
+    monkeypatch.setattr(
+        "flowmachine.core.server.query_proxy.cache_table_exists",
+        lambda connection, query_id: True,
+    )
+    monkeypatch.setattr(
+        "flowmachine.core.server.query_proxy.get_sql_for_query_id",
+        lambda query_id: "SELECT * FROM dummy_table",
+    )
+    query_id = query_proxy.run_query_async()
+    query_proxy = QueryProxy.from_query_id(query_id, redis=dummy_redis)
+
+    query_proxy.redis_interface.has_lock = lambda query_id: True
+    assert {
+        "id": query_id,
+        "query_kind": "dummy_query",
+        "params": {"param": "some_value"},
+        "status": "running",
+    } == query_proxy.get_metadata(include_sql=True)
+
+    query_proxy.redis_interface.has_lock = lambda query_id: False
+    assert "sql" not in query_proxy.get_metadata()
+    metadata = query_proxy.get_metadata(include_sql=True)
+    assert "done" == metadata["status"]
+    assert "SELECT * FROM dummy_table" == metadata["sql"]
+
+
+def test_get_result_info_for_query_id(monkeypatch):
+    """
+    Result info gives the cache table, the result's columns, and the row number column as the key.
+    """
+    q = Mock(spec=Query)
+    q.fully_qualified_table_name = "cache.xDUMMY_ID"
+    q.column_names = ["pcod", "total"]
+    monkeypatch.setattr(
+        "flowmachine.core.server.query_proxy.get_query_object_by_id",
+        lambda connection, query_id: q,
+    )
+    monkeypatch.setattr(
+        "flowmachine.core.server.query_proxy.get_table_columns",
+        lambda connection, schema, name: ["pcod", "total", "_row_number"],
+    )
+    assert {
+        "table_name": "cache.xDUMMY_ID",
+        "columns": ["pcod", "total"],
+        "key_column": "_row_number",
+    } == get_result_info_for_query_id("DUMMY_ID")
+
+
+def test_get_result_info_for_query_id_without_row_numbers(monkeypatch):
+    """
+    Getting result info for a result stored without row numbers raises an error.
+    """
+    q = Mock(spec=Query)
+    q.fully_qualified_table_name = "cache.xDUMMY_ID"
+    monkeypatch.setattr(
+        "flowmachine.core.server.query_proxy.get_query_object_by_id",
+        lambda connection, query_id: q,
+    )
+    monkeypatch.setattr(
+        "flowmachine.core.server.query_proxy.get_table_columns",
+        lambda connection, schema, name: ["pcod", "total"],
+    )
+    with pytest.raises(QueryProxyError, match="can't be paged"):
+        get_result_info_for_query_id("DUMMY_ID")
@@ -20,6 +20,23 @@ def test_create_zmq_msg_from_multipart_message():
         "param2": "another_value",
     }
     assert zmq_msg.return_address == b"DUMMY_RETURN_ADDRESS"
+    assert zmq_msg.message_id is None
+    assert zmq_msg.return_envelope == [b"DUMMY_RETURN_ADDRESS"]
+    assert zmq_msg.msg_str == msg_contents
+
+
+def test_create_zmq_msg_with_message_id():
+    """
+    Messages from a DEALER socket carry a message id, which is part of the return envelope.
+    """
+    msg_contents = b'{"action": "dummy_action", "request_id": "DUMMY_API_REQUEST_ID"}'
+    multipart_msg = (b"DUMMY_RETURN_ADDRESS", b"DUMMY_MESSAGE_ID", b"", msg_contents)
+    zmq_msg = ZMQMultipartMessage(multipart_msg)
+
+    assert zmq_msg.action == "dummy_action"
+    assert zmq_msg.return_address == b"DUMMY_RETURN_ADDRESS"
+    assert zmq_msg.message_id == b"DUMMY_MESSAGE_ID"
+    assert zmq_msg.return_envelope == [b"DUMMY_RETURN_ADDRESS", b"DUMMY_MESSAGE_ID"]
     assert zmq_msg.msg_str == msg_contents
 
 
@@ -32,6 +49,7 @@ def test_create_zmq_msg_from_multipart_message():
         (b"DUMMY_RETURN_ADDRESS",),  # only return address
         (
             b"DUMMY_RETURN_ADDRESS",
+            b"DUMMY_MESSAGE_ID",
             b"",
             b'{"action": "dummy_action"}',
             b'{"param1": "some_value"}',
@@ -44,7 +62,7 @@ def test_wrong_number_of_parts(multipart_msg):
     """
     with pytest.raises(
         ZMQInterfaceError,
-        match=r"Multipart message is not of the form \(<return_address>, <empty_delimiter>, <message>\)",
+        match=r"Multipart message is not of the form \(<return_address>, \[<message_id>\], <empty_delimiter>, <message>\)",
     ):
         _ = ZMQMultipartMessage(multipart_msg)
 
@@ -6,9 +6,11 @@
 Tests for query caching functions.
 """
 
+import json
+
 import pytest
 
-from flowmachine.core.cache import cache_table_exists
+from flowmachine.core.cache import QUERY_STORED_CHANNEL, cache_table_exists
 from flowmachine.core.query import Query
 from flowmachine.features import daily_location, ModalLocation, Flows
 
@@ -301,3 +303,49 @@ def test_retrieve_all():
     assert dl1.md5 in from_cache
     assert hl1.md5 in from_cache
     assert flow.md5 in from_cache
+
+
+@pytest.fixture
+def query_stored_notifications(flowmachine_connect):
+    """
+    Fixture which listens for notifications that queries were stored, and
+    yields a function returning the payloads received so far.
+    """
+    conn = flowmachine_connect.engine.raw_connection()
+    conn.connection.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"LISTEN {QUERY_STORED_CHANNEL}")
+
+    def payloads():
+        conn.connection.poll()
+        return [json.loads(notify.payload) for notify in conn.connection.notifies]
+
+    yield payloads
+    with conn.cursor() as cur:
+        cur.execute("UNLISTEN *")
+    conn.connection.autocommit = False
+    conn.close()
+
+
+def test_store_sends_notification(query_stored_notifications):
+    """
+    Test that storing a query in cache sends a notification that it is done.
+    """
+    dl = daily_location("2016-01-01")
+    dl.store().result()
+    assert {"query_id": dl.md5, "status": "done"} in query_stored_notifications()
+
+
+def test_failed_store_sends_notification(query_stored_notifications, monkeypatch):
+    """
+    Test that failing to store a query in cache sends a notification that it errored.
+    """
+    dl = daily_location("2016-01-01")
+
+    def fail(*args, **kwargs):
+        raise ValueError("Store failed")
+
+    monkeypatch.setattr(dl, "_make_sql", fail)
+    with pytest.raises(ValueError):
+        dl.store().result()
+    assert {"query_id": dl.md5, "status": "error"} in query_stored_notifications()
@@ -5,6 +5,8 @@
 """
 Tests for cache management utilities.
 """
+import pickle
+
 from cachey import Scorer
 from unittest.mock import Mock
 
@@ -27,6 +29,10 @@ from flowmachine.core.cache import (
     set_cache_half_life,
     invalidate_cache_by_id,
     cache_table_exists,
+    get_cache_eviction_candidates,
+    plan_cache_eviction,
+    remove_cached_queries,
+    CachedQuery,
 )
 from flowmachine.features import daily_location
 
@@ -242,6 +248,60 @@ def test_shrink_to_size_uses_score(flowmachine_connect):
     assert dl_aggregate.is_stored
 
 
+def test_get_cache_eviction_candidates(flowmachine_connect):
+    """
+    Test that eviction candidates are in the same order as the cached query objects, with the same sizes.
+    """
+    dl = daily_location("2016-01-01").store().result()
+    dl.aggregate().store().result()
+    dl.get_table()
+    candidates = get_cache_eviction_candidates(flowmachine_connect)
+    assert [
+        (q.md5, size)
+        for q, size in get_cached_query_objects_ordered_by_score(flowmachine_connect)
+    ] == [(query_id, size) for query_id, _, size, _ in candidates]
+
+
+@pytest.mark.parametrize(
+    "bytes_to_free, expected",
+    [
+        (0, []),
+        (10, ["a"]),
+        # c alone loses less than b, which the lowest scores would need
+        (15, ["c"]),
+        # b alone frees enough, so a is put back
+        (50, ["b"]),
+        (115, ["b", "c"]),
+        (1000, ["a", "b", "c"]),
+    ],
+)
+def test_plan_cache_eviction(bytes_to_free, expected):
+    """
+    Test that the eviction plan frees enough space while keeping the most valuable queries.
+    """
+    candidates = [("a", "xa", 10, 0.1), ("b", "xb", 100, 0.2), ("c", "xc", 20, 0.3)]
+    assert expected == sorted(
+        query_id for query_id, _, _, _ in plan_cache_eviction(candidates, bytes_to_free)
+    )
+
+
+def test_remove_cached_queries(flowmachine_connect):
+    """
+    Test that several queries and any tables pointing to them are removed from cache together.
+    """
+    dl = daily_location("2016-01-01").store().result()
+    dl2 = daily_location("2016-01-02").store().result()
+    dl_agg = dl.aggregate().store().result()
+    table = dl.get_table()
+    remove_cached_queries(flowmachine_connect, [dl.md5, dl2.md5])
+    assert not dl.is_stored
+    assert not dl2.is_stored
+    assert not cache_table_exists(flowmachine_connect, dl.md5)
+    assert not cache_table_exists(flowmachine_connect, table.md5)
+    assert cache_table_exists(flowmachine_connect, dl_agg.md5)
+    assert dl_agg.is_stored
+
+
 def test_shrink_one(flowmachine_connect):
     """
     Test that shrink_one removes a cache record.
@@ -334,6 +394,35 @@ def test_get_query_object_by_id(flowmachine_connect):
     assert dl.get_query() == retrieved_query.get_query()
 
 
+def test_cached_query_unpickles_lazily(flowmachine_connect, monkeypatch):
+    """
+    Test that a cached query is only unpickled when something other than its cache record is used.
+    """
+    dl = daily_location("2016-01-01").store().result()
+    loads = Mock(wraps=pickle.loads)
+    monkeypatch.setattr("flowmachine.core.cache.pickle.loads", loads)
+    cached, _ = get_cached_query_objects_ordered_by_score(flowmachine_connect)[0]
+    assert isinstance(cached, CachedQuery)
+    assert dl.md5 == cached.md5
+    assert dl.fully_qualified_table_name == cached.fully_qualified_table_name
+    assert dl.__class__.__name__ == cached.class_name
+    assert 0 == loads.call_count
+    assert dl.column_names == cached.column_names
+    assert dl.get_query() == cached.get_query()
+    assert 1 == loads.call_count
+
+
+def test_cache_table_exists_needs_table(flowmachine_connect):
+    """
+    Test that a query whose cache record remains but whose table has gone isn't reported as in cache.
+    """
+    dl = daily_location("2016-01-01").store().result()
+    assert cache_table_exists(flowmachine_connect, dl.md5)
+    flowmachine_connect.engine.execute(f"DROP TABLE {dl.fully_qualified_table_name}")
+    assert not cache_table_exists(flowmachine_connect, dl.md5)
+    assert not cache_table_exists(flowmachine_connect, "NOT_A_QUERY_ID")
+
+
 def test_delete_query_by_id(flowmachine_connect):
     """
     Test that we can remove a query from cache by the md5 id
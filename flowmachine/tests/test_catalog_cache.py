@@ -0,0 +1,88 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Tests for the process-wide catalog cache.
+"""
+from unittest.mock import Mock
+
+import pytest
+
+from flowmachine.core import Table
+from flowmachine.core.catalog_cache import (
+    get_table_columns,
+    table_exists,
+    refresh_catalog_cache,
+    catalog_cache_info,
+)
+from flowmachine.features import daily_location, EventTableSubset
+
+
+@pytest.fixture
+def dummy_connection():
+    connection = Mock()
+    connection.engine.url = "DUMMY_URL"
+    connection.fetch.return_value = [("msisdn",), ("datetime",)]
+    connection.has_table.return_value = True
+    yield connection
+    refresh_catalog_cache()
+
+
+def test_columns_are_cached(dummy_connection):
+    """
+    Column names are only fetched from the database once.
+    """
+    hits = catalog_cache_info()["hits"]
+    assert ["msisdn", "datetime"] == get_table_columns(
+        dummy_connection, "events", "calls"
+    )
+    assert ["msisdn", "datetime"] == get_table_columns(
+        dummy_connection, "events", "calls"
+    )
+    dummy_connection.fetch.assert_called_once()
+    assert hits + 1 == catalog_cache_info()["hits"]
+
+
+def test_refresh_discards_entries(dummy_connection):
+    """
+    Refreshing the cache for a table means it is looked up again, but other tables are not.
+    """
+    table_exists(dummy_connection, "events", "calls")
+    table_exists(dummy_connection, "events", "sms")
+    refresh_catalog_cache("events", "calls")
+    table_exists(dummy_connection, "events", "calls")
+    table_exists(dummy_connection, "events", "sms")
+    assert 3 == dummy_connection.has_table.call_count
+
+
+def test_cache_schema_not_cached(dummy_connection):
+    """
+    Existence of tables in the cache schema is always checked against the database.
+    """
+    table_exists(dummy_connection, "cache", "x_dummy")
+    table_exists(dummy_connection, "cache", "x_dummy")
+    assert 2 == dummy_connection.has_table.call_count
+
+
+def test_reflected_table_shared():
+    """
+    Event table subsets share a reflected table definition.
+    """
+    assert (
+        EventTableSubset("2016-01-01", "2016-01-02").sqlalchemy_table
+        is EventTableSubset("2016-01-02", "2016-01-03").sqlalchemy_table
+    )
+
+
+def test_existence_refreshed_after_storing(flowmachine_connect):
+    """
+    Storing a query into a table updates the cached existence of the table.
+    """
+    assert not table_exists(flowmachine_connect, "public", "catalog_cache_test")
+    dl = daily_location("2016-01-01")
+    dl.to_sql(name="catalog_cache_test", schema="public").result()
+    assert table_exists(flowmachine_connect, "public", "catalog_cache_test")
+    t = Table("public.catalog_cache_test")
+    t.invalidate_db_cache(drop=True)
+    assert not table_exists(flowmachine_connect, "public", "catalog_cache_test")
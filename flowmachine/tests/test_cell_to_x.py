@@ -38,3 +38,28 @@ def test_cell_to_x_mapping_column_names(mapper, args):
     """Test that the CellToX mappers have accurate column_names properties."""
     instance = mapper(**args)
     assert instance.head(0).columns.tolist() == instance.column_names
+
+
+def test_cell_to_polygon_stored_before_use():
+    """Test that a cell mapping is stored before a query using it is stored, and then selected from."""
+    admin = CellToAdmin(level="admin3")
+    mapping = admin.mapping
+    admin.invalidate_db_cache()
+    mapping.invalidate_db_cache()
+    assert "ST_within" in admin.get_query()
+    assert not mapping.is_stored
+    admin.store().result()
+    assert mapping.is_stored
+    sql = admin.mapping.get_query()
+    assert "ST_within" not in sql
+    assert mapping.fully_qualified_table_name in sql
+
+
+def test_cell_to_polygon_valid_period():
+    """Test that the period a cell is in service is a range between its first and last dates of service."""
+    df = CellToAdmin(level="admin3").get_dataframe()
+    for row in df.head(10).itertuples():
+        if row.date_of_first_service is not None:
+            assert row.valid_period.lower.date() == row.date_of_first_service
+        if row.date_of_last_service is not None:
+            assert row.valid_period.upper.date() == row.date_of_last_service
@@ -6,10 +6,20 @@
 Tests for flowmachine.feature_collection
 """
 
+import pytest
+from pandas.testing import assert_frame_equal
+
 from flowmachine import feature_collection
 from flowmachine.core import CustomQuery
-from flowmachine.features import RadiusOfGyration, NocturnalEvents, SubscriberDegree
+from flowmachine.features import (
+    EventCount,
+    RadiusOfGyration,
+    NocturnalEvents,
+    SubscriberDegree,
+)
 from flowmachine.features.utilities.feature_collection import (
+    FeatureCollection,
+    SubscriberEventAggregates,
     feature_collection_from_list_of_classes,
 )
 
@@ -82,3 +92,63 @@ def test_dropna(get_length):
     # usully without dropna=False this query would only return
     # a single row. We check that this is not the case.
     assert get_length(fc) > 1
+
+
+def test_features_from_same_events_share_a_scan():
+    """
+    Test that features computed from the same events are computed together.
+    """
+    start, stop = "2016-01-01", "2016-01-03"
+    metrics = [
+        RadiusOfGyration(start, stop),
+        NocturnalEvents(start, stop),
+        SubscriberDegree(start, stop),
+        EventCount(start, stop, direction="out"),
+    ]
+    fc = feature_collection(metrics)
+    assert isinstance(fc, FeatureCollection)
+    assert 2 == len(fc.queries)
+    shared = fc.queries[1]
+    assert isinstance(shared, SubscriberEventAggregates)
+    assert [
+        "subscriber",
+        "value_nocturnalevents_1",
+        "value_subscriberdegree_2",
+        "event_count_eventcount_3",
+    ] == shared.column_names
+
+
+def test_features_from_different_events_dont_share_a_scan():
+    """
+    Test that features computed from different events are joined as usual.
+    """
+    metrics = [
+        NocturnalEvents("2016-01-01", "2016-01-02"),
+        SubscriberDegree("2016-01-02", "2016-01-03"),
+        EventCount("2016-01-01", "2016-01-02", hours=(4, 17)),
+    ]
+    fc = feature_collection(metrics)
+    assert not isinstance(fc, FeatureCollection)
+    assert feature_collection(metrics, shared_scan=False).get_query() == fc.get_query()
+
+
+@pytest.mark.parametrize("dropna", [True, False])
+def test_shared_scan_matches_separate_scans(get_dataframe, dropna):
+    """
+    Test that features computed together have the same values as computing them separately.
+    """
+    start, stop = "2016-01-01", "2016-01-03"
+    metrics = [
+        RadiusOfGyration(start, stop),
+        NocturnalEvents(start, stop, direction="in"),
+        SubscriberDegree(start, stop, direction="out"),
+        EventCount(start, stop, direction="out"),
+        EventCount(start, stop),
+    ]
+    shared = feature_collection(metrics, dropna=dropna)
+    separate = feature_collection(metrics, dropna=dropna, shared_scan=False)
+    assert separate.column_names == shared.column_names
+    assert_frame_equal(
+        get_dataframe(separate).sort_values("subscriber").reset_index(drop=True),
+        get_dataframe(shared).sort_values("subscriber").reset_index(drop=True),
+    )
@@ -16,6 +16,7 @@ import pytest
 
 from flowmachine.core import Query
 from flowmachine.core.mixins import GeoDataMixin
+from flowmachine.core.mixins import geodata_mixin
 from flowmachine.features import daily_location, Flows
 from flowmachine.utils import proj4string
 
@@ -169,20 +170,26 @@ def test_reprojection():
     assert js["properties"]["crs"] == proj4string(dl.connection, 2770)
 
 
-def test_geojson_cache():
+def test_geojson_cache(monkeypatch):
     """
-    Test geojson is cached locally.
+    Test geojson is cached, and not fetched again.
     """
     dl = daily_location("2016-01-01", "2016-01-02", level="lat-lon").aggregate()
     js = dl.to_geojson(crs=2770)  # OSGB36
-    assert js == dl._geojson[proj4string(dl.connection, 2770)]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Geojson was fetched again.")
+
+    monkeypatch.setattr(dl, "_get_geojson", fail)
+    assert js == dl.to_geojson(crs=2770)
 
 
 def test_geojson_cache_exluded_from_pickle():
     """Test that cached geojson is not going to get pickled."""
     dl = daily_location("2016-01-01", "2016-01-02", level="lat-lon").aggregate()
+    state = dl.__getstate__()
     js = dl.to_geojson(crs=2770)  # OSGB36
-    assert "_geojson" not in dl.__getstate__()  # Check excluded from pickle
+    assert state == dl.__getstate__()  # Check excluded from pickle
 
 
 def test_geojson_caching_off():
@@ -190,8 +197,51 @@ def test_geojson_caching_off():
     dl = daily_location("2016-01-01", "2016-01-02", level="lat-lon").aggregate()
     js = dl.to_geojson(crs=2770)  # OSGB36
     dl.turn_off_caching()  # Check caching for geojson switches off
-    with pytest.raises(KeyError):
-        dl._geojson[proj4string(dl.connection, 2770)]
+    assert not any(key[0] == dl.md5 for key in geodata_mixin._geojson_cache)
     js = dl.to_geojson(crs=2770)  # OSGB36
-    with pytest.raises(KeyError):
-        dl._geojson[proj4string(dl.connection, 2770)]
+    assert not any(key[0] == dl.md5 for key in geodata_mixin._geojson_cache)
+
+
+def test_geojson_cache_is_bounded():
+    """Test that the least recently used geojson is dropped when the cache is full."""
+    dls = [
+        daily_location(date, level="admin3").aggregate()
+        for date in ("2016-01-01", "2016-01-02")
+    ]
+    js = dls[0].to_geojson_string()
+    geodata_mixin.set_geojson_cache_size(int(1.5 * len(js)))
+    try:
+        dls[0].to_geojson_string()
+        dls[1].to_geojson_string()
+        cached = {key[0] for key in geodata_mixin._geojson_cache}
+        assert {dls[1].md5} == cached
+    finally:
+        geodata_mixin.set_geojson_cache_size(geodata_mixin.GEOJSON_CACHE_SIZE)
+
+
+def test_simplified_geojson():
+    """
+    Test that simplified geojson has the same features, with fewer points.
+    """
+    dl = daily_location("2016-01-01", level="admin3").aggregate()
+    full = dl.to_geojson()
+    simplified = dl.to_geojson(simplify="low")
+    assert len(full["features"]) == len(simplified["features"])
+    assert len(dl.to_geojson_string(simplify="low")) < len(dl.to_geojson_string())
+    full_feature = full["features"][0]
+    simplified_feature = simplified["features"][0]
+    assert full_feature["properties"] == simplified_feature["properties"]
+
+
+def test_simplification_tolerance():
+    """
+    Test that simplification levels are turned into tolerances, and bad ones refused.
+    """
+    assert geodata_mixin.simplification_tolerance() is None
+    assert geodata_mixin.simplification_tolerance("full") is None
+    assert 0.001 == geodata_mixin.simplification_tolerance("medium")
+    assert 0.5 == geodata_mixin.simplification_tolerance(0.5)
+    with pytest.raises(ValueError):
+        geodata_mixin.simplification_tolerance("tiny")
+    with pytest.raises(ValueError):
+        geodata_mixin.simplification_tolerance(-1)
@@ -58,3 +58,19 @@ def test_selected_values(get_dataframe):
     assert "524 3 08 43" == hdf.loc["E1n7JoqxPBjvR5Ve"][0]
     assert "524 3 08 44" == hdf.loc["gkBLe0mN5j3qmRpX"][0]
     assert "524 3 09 49" == hdf.loc["5Kgwy8Gp6DlN3Eq9"][0]
+
+
+def test_incremental_stores_daily_locations(get_dataframe):
+    """
+    Storing an incremental ModalLocation stores each daily location first, and gives the same result.
+    """
+    dls = [daily_location(d) for d in list_of_dates("2016-01-01", "2016-01-03")]
+    hl = ModalLocation(*dls, incremental=True)
+    assert not any(dl.is_stored for dl in dls)
+    hl.store().result()
+    assert all(dl.is_stored for dl in dls)
+    assert hl.md5 != ModalLocation(*dls).md5
+    assert (
+        get_dataframe(ModalLocation(*dls)).sort_values("subscriber").values.tolist()
+        == get_dataframe(hl).sort_values("subscriber").values.tolist()
+    )
@@ -160,3 +160,14 @@ def test_connect_defaults(mocked_connections, monkeypatch):
     core_init_start_threadpool_mock.assert_called_with(
         5
     )  # for the time being, we should have num_threads = num_db_connections
+
+
+def test_start_threadpool_records_size(monkeypatch):
+    """Test that the size of the query thread pool is recorded on Query."""
+    from flowmachine.core.init import _start_threadpool
+
+    monkeypatch.setattr(Query, "tp", None, raising=False)
+    monkeypatch.setattr(Query, "thread_pool_size", None, raising=False)
+    _start_threadpool(3)
+    Query.tp.shutdown()
+    assert 3 == Query.thread_pool_size
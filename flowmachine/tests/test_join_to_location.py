@@ -121,3 +121,17 @@ def test_join_to_grid(get_dataframe, get_length):
     ul = subscriber_locations("2016-01-05", "2016-01-07", level="cell")
     df = get_dataframe(JoinToLocation(ul, level="grid", size=50))
     assert len(df) == get_length(ul)
+
+
+def test_join_to_admin_uses_stored_mapping():
+    """
+    Test that joining to an admin region uses the stored cell mapping, and its period in service.
+    """
+    ul = subscriber_locations("2016-01-05", "2016-01-07", level="cell")
+    joined = JoinToLocation(ul, level="admin3")
+    joined.store().result()
+    assert joined.right_query.mapping.is_stored
+    joined.invalidate_db_cache()
+    sql = joined.get_query()
+    assert "ST_within" not in sql
+    assert "valid_period @>" in sql
@@ -6,9 +6,43 @@
 Tests for the PopulationWeightedOpportunities() class.
 """
 
+import numpy as np
+import pandas as pd
 import pytest
 
 from flowmachine.models import PopulationWeightedOpportunities
+from flowmachine.models.pwo import (
+    _buffer_population_matrix,
+    _location_codes,
+    _predict_flows,
+)
+
+
+def _loop_pwo(population_df, population_buffer, departure_rate):
+    """
+    Reference implementation of the model, which loops over every
+    pair of locations.
+    """
+    population = population_df.set_index("site_id")["total"]
+    buffer = population_buffer.set_index(["site_id_from", "site_id_to"])[
+        "buffer_population"
+    ]
+    beta = 1 / population.sum()
+    results = []
+    for i in population.index:
+        T_i = population[i] * departure_rate
+        sigma = sum(
+            population[k] * ((1 / buffer[(i, k)]) - beta)
+            for k in population.index
+            if k != i
+        )
+        for j in population.index:
+            if j != i:
+                T_ij = (T_i * population[j] * ((1 / buffer[(i, j)]) - beta)) / sigma
+                results.append([i, j, T_ij, T_ij / T_i])
+    return pd.DataFrame(
+        results, columns=["site_id_from", "site_id_to", "prediction", "probability"]
+    )
 
 
 @pytest.mark.usefixtures("skip_datecheck")
@@ -80,6 +114,58 @@ def test_run_with_location_vector(get_dataframe):
     )
 
 
+def test_vectorised_engine_matches_loop():
+    """
+    The array-based model engine gives the same predictions as looping over location pairs.
+    """
+    rng = np.random.RandomState(42)
+    sites = [f"site_{i}" for i in range(20)]
+    population_df = pd.DataFrame(
+        {"site_id": sites, "total": rng.randint(1, 1000, len(sites))}
+    )
+    pairs = pd.DataFrame(
+        [(a, b) for a in sites for b in sites], columns=["site_id_from", "site_id_to"]
+    ).sample(
+        frac=1, random_state=rng
+    )  # Row order from the db is arbitrary
+    pairs["buffer_population"] = rng.randint(1000, 10000, len(pairs))
+
+    locations = _location_codes(population_df, ["site_id"])
+    buffer_population = _buffer_population_matrix(pairs, locations)
+    population = population_df["total"].values.astype("float64")
+    prediction, probability = _predict_flows(
+        population, buffer_population, population * 0.1
+    )
+    expected = _loop_pwo(population_df, pairs, 0.1)
+
+    origins, destinations = np.nonzero(~np.eye(len(sites), dtype=bool))
+    assert locations.site_id.values[origins].tolist() == expected.site_id_from.tolist()
+    assert (
+        locations.site_id.values[destinations].tolist() == expected.site_id_to.tolist()
+    )
+    assert prediction[origins, destinations] == pytest.approx(
+        expected.prediction.values
+    )
+    assert probability[origins, destinations] == pytest.approx(
+        expected.probability.values
+    )
+
+
+def test_missing_buffer_population_raises_error():
+    """
+    A pair of different locations with no buffer population raises an error rather than giving NaN flows.
+    """
+    population_df = pd.DataFrame({"site_id": ["a", "b", "c"], "total": [1, 2, 3]})
+    pairs = pd.DataFrame(
+        [("a", "b"), ("a", "c"), ("b", "a"), ("b", "c"), ("c", "a")],
+        columns=["site_id_from", "site_id_to"],
+    )
+    pairs["buffer_population"] = 10
+    locations = _location_codes(population_df, ["site_id"])
+    with pytest.raises(KeyError, match="'c',.*'b',"):
+        _buffer_population_matrix(pairs, locations)
+
+
 def test_error_raised_if_location_vector_incomplete():
     """
     PopulationWeightedOpportunities().run() raises error if location vector incomplete.
@@ -0,0 +1,100 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Tests for storing queries as partitioned tables.
+"""
+
+import pytest
+
+from flowmachine.core.cache import get_size_of_cache, get_size_of_table, shrink_one
+from flowmachine.core.partitioning import DatePartitions, SubscriberHashPartitions
+from flowmachine.features import ModalLocation, daily_location, subscriber_locations
+
+
+def test_date_partitions():
+    """
+    Test that there is a partition for each day, and a default partition.
+    """
+    partitions = DatePartitions("2016-01-01", "2016-01-03", column="datetime")
+    assert ["20160101", "20160102", "default"] == [
+        suffix for suffix, _ in partitions.partitions()
+    ]
+    assert (
+        "FOR VALUES FROM ('2016-01-02') TO ('2016-01-03')"
+        == partitions.partitions()[1][1]
+    )
+
+
+def test_date_partitions_need_a_day():
+    """
+    Test that date partitions must cover at least one day.
+    """
+    with pytest.raises(ValueError):
+        DatePartitions("2016-01-01", "2016-01-01")
+
+
+def test_store_date_partitioned(flowmachine_connect):
+    """
+    Test that a query stored with date partitions has the same rows as the query,
+    split across one table per day.
+    """
+    query = subscriber_locations("2016-01-01", "2016-01-03", level="cell")
+    query.store(
+        partition_by=DatePartitions("2016-01-01", "2016-01-03", column="time")
+    ).result()
+    assert query.is_stored
+    schema, name = query.fully_qualified_table_name.split(".")
+    partition_counts = flowmachine_connect.fetch(
+        f"""SELECT relname, (SELECT count(*) FROM pg_inherits WHERE inhparent = c.oid)
+        FROM pg_class c WHERE oid = '{schema}.{name}'::regclass"""
+    )
+    assert 3 == partition_counts[0][1]
+    for day in ("20160101", "20160102"):
+        day_sql = f"SELECT count(*) FROM {schema}.{name}_{day}"
+        assert 0 < flowmachine_connect.fetch(day_sql)[0][0]
+    stored_sql = f"SELECT count(*) FROM {schema}.{name}"
+    query_sql = f"SELECT count(*) FROM ({query._make_query()}) _"
+    assert (
+        flowmachine_connect.fetch(stored_sql)[0][0]
+        == flowmachine_connect.fetch(query_sql)[0][0]
+    )
+
+
+def test_store_hash_partitioned(flowmachine_connect):
+    """
+    Test that a query stored with subscriber hash partitions has the same result as the query.
+    """
+    dl = daily_location("2016-01-01")
+    expected = dl.get_dataframe()
+    dl.invalidate_db_cache()
+    dl.store(partition_by=SubscriberHashPartitions(4)).result()
+    stored = dl.get_dataframe()
+    assert len(expected) == len(stored)
+    assert set(expected.subscriber) == set(stored.subscriber)
+
+
+def test_store_incremental_partitioned(flowmachine_connect):
+    """
+    Test that storing an incremental query as a partitioned table stores its per-day parts first.
+    """
+    dls = [daily_location(date) for date in ("2016-01-01", "2016-01-02")]
+    modal = ModalLocation(*dls, incremental=True)
+    modal.store(partition_by=SubscriberHashPartitions(2)).result()
+    assert modal.is_stored
+    assert all(dl.is_stored for dl in dls)
+
+
+def test_partitioned_table_size(flowmachine_connect):
+    """
+    Test that the size of a partitioned table in cache is the size of its partitions,
+    and that it can be removed from cache.
+    """
+    dl = daily_location("2016-01-01")
+    dl.store(partition_by=SubscriberHashPartitions(4)).result()
+    size = get_size_of_table(flowmachine_connect, dl.table_name, "cache")
+    assert 0 < size
+    assert size == get_size_of_cache(flowmachine_connect)
+    assert dl.md5 == shrink_one(flowmachine_connect).md5
+    assert not dl.is_stored
@@ -12,7 +12,7 @@ import pytest
 from sqlalchemy.exc import ProgrammingError
 
 from flowmachine.core.query import Query
-from flowmachine.features import daily_location
+from flowmachine.features import daily_location, ModalLocation
 
 
 def test_bad_sql_logged_and_raised(caplog):
@@ -126,3 +126,106 @@ def test_limited_head():
     """Test that we can call head on a query with a limit clause."""
     dl = daily_location("2016-01-01")
     dl.random_sample(2).head()
+
+
+def test_iter_dataframes():
+    """
+    Test that iterating over a result in chunks gives every row, in chunks of bounded size.
+    """
+    dl = daily_location("2016-01-01")
+    chunks = list(dl.iter_dataframes(chunksize=100))
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert sum(len(chunk) for chunk in chunks) == len(dl.get_dataframe())
+    assert ["subscriber", "pcod"] == chunks[0].columns.tolist()
+
+
+def test_iter_dataframes_compact_dtypes():
+    """
+    Test that location codes are categorical when iterating with compact dtypes, and not otherwise.
+    """
+    dl = daily_location("2016-01-01")
+    chunk = next(dl.iter_dataframes(chunksize=100))
+    assert "category" == chunk.pcod.dtype.name
+    assert "object" == chunk.subscriber.dtype.name
+    chunk = next(dl.iter_dataframes(chunksize=100, compact=False))
+    assert "object" == chunk.pcod.dtype.name
+
+
+def test_chunked_get_dataframe():
+    """
+    Test that getting a dataframe in chunks gives the same result as getting it all at once.
+    """
+    dl = daily_location("2016-01-01")
+    dl.turn_off_caching()
+    df = dl.get_dataframe()
+    chunked = dl.get_dataframe(chunked=True, chunksize=100)
+    assert "category" == chunked.pcod.dtype.name
+    assert df.equals(chunked.astype({"pcod": object}))
+
+
+def test_chunked_get_dataframe_is_not_cached():
+    """
+    Test that getting a dataframe in chunks doesn't change the dtypes of later results which aren't chunked.
+    """
+    dl = daily_location("2016-01-01")
+    dl.turn_on_caching()
+    assert "category" == dl.get_dataframe(chunked=True, chunksize=100).pcod.dtype.name
+    assert "object" == dl.get_dataframe().pcod.dtype.name
+
+
+def test_get_dataframe_without_copy():
+    """
+    Test that the cached dataframe is returned itself only when no copy is asked for.
+    """
+    dl = daily_location("2016-01-01")
+    dl.turn_on_caching()
+    df = dl.get_dataframe(copy=False)
+    assert df is dl.get_dataframe(copy=False)
+    assert df is not dl.get_dataframe()
+
+
+def test_get_query_is_remembered(monkeypatch):
+    """
+    Test that the sql for a query is built once, and not looked up again until the cache changes.
+    """
+    ml = ModalLocation(daily_location("2016-01-01"), daily_location("2016-01-02"))
+    hits = Query.sql_resolution_stats["memo_hits"]
+    sql = ml.get_query()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Looked up stored tables.")
+
+    monkeypatch.setattr(ml, "_make_query", fail)
+    assert sql == ml.get_query()
+    assert hits + 1 == Query.sql_resolution_stats["memo_hits"]
+    assert 0 < Query.sql_resolution_stats["round_trips_saved"]
+
+
+def test_get_query_uses_newly_stored_dependency():
+    """
+    Test that the sql for a query selects from a dependency once it is stored, and stops when it is removed.
+    """
+    dl = daily_location("2016-01-01")
+    ml = ModalLocation(dl, daily_location("2016-01-02"))
+    assert dl.fully_qualified_table_name not in ml.get_query()
+    dl.store().result()
+    assert dl.fully_qualified_table_name in ml.get_query()
+    dl.invalidate_db_cache()
+    assert dl.fully_qualified_table_name not in ml.get_query()
+
+
+def test_get_query_looks_up_stored_tables_once(monkeypatch):
+    """
+    Test that which queries in a tree are stored is looked up in one go, not for each query.
+    """
+    ml = ModalLocation(*[daily_location(f"2016-01-0{d}") for d in range(1, 4)])
+    has_table_calls = []
+
+    def has_table(name, schema=None):
+        if schema == "cache":
+            has_table_calls.append(name)
+        return False
+
+    monkeypatch.setattr(ml.connection, "has_table", has_table)
+    ml.get_query()
+    assert [] == has_table_calls
@@ -2,8 +2,12 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import pytest
+
 from flowmachine.core import Table
 from flowmachine.core.custom_query import CustomQuery
+from flowmachine.core.union import Union
+from flowmachine.features import daily_location, ModalLocation
 
 
 def test_union_column_names():
@@ -32,3 +36,59 @@ def test_union(get_dataframe):
     union_df = get_dataframe(union)
     single_id = union_df[union_df.id == "5wNJA-PdRJ4-jxEdG-yOXpZ"]
     assert len(single_id) == 2
+
+
+def test_union_many(get_dataframe):
+    """
+    Test that a union of several queries keeps every row of each.
+    """
+    q1 = Table(schema="events", name="calls")
+    union_all = Union(q1, q1, q1)
+    union_all_df = get_dataframe(union_all)
+    single_id = union_all_df[union_all_df.id == "5wNJA-PdRJ4-jxEdG-yOXpZ"]
+    assert len(single_id) == 6
+
+
+def test_union_is_flat():
+    """
+    Test that a union of several queries is a single flat union, not nested unions.
+    """
+    tables = [Table(f"events.calls_2016010{d}") for d in range(1, 5)]
+    union = Union(*tables)
+    assert 3 == union.get_query().count("UNION ALL")
+    assert set(tables) == union.dependencies
+
+
+def test_union_needs_a_query():
+    """
+    Test that a union of nothing is refused.
+    """
+    with pytest.raises(ValueError):
+        Union()
+
+
+def test_modal_location_union_is_flat():
+    """
+    Test that the locations for a modal location are a single union of every daily location.
+    """
+    dls = [daily_location(f"2016-01-0{d}") for d in range(1, 5)]
+    union = ModalLocation(*dls)._unioned_locations()
+    assert 4 == len(union.queries)
+    assert 3 == union.get_query().count("UNION ALL")
+
+
+def test_union_md5_depends_on_queries_and_order():
+    """
+    Test that unions which repeat a query, or take queries in a different order, have different md5s.
+    """
+    q1 = Table(schema="events", name="calls")
+    q2 = Table(schema="events", name="sms")
+    md5s = {
+        Union(q1, q1).md5,
+        Union(q1, q1, q1).md5,
+        Union(q1, q2).md5,
+        Union(q2, q1).md5,
+        Union(q1, q2, q1).md5,
+    }
+    assert 5 == len(md5s)
+    assert Union(q1, q2).md5 == Union(q1, q2).md5
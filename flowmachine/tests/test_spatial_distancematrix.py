@@ -6,6 +6,7 @@
 Tests for the DistanceMatrix() class.
 """
 
+import pytest
 
 from flowmachine.features.spatial import DistanceMatrix
 
@@ -28,3 +29,67 @@ def test_result_has_correct_length(get_length):
     """
     c = DistanceMatrix(level="versioned-site")
     assert get_length(c) == 35 ** 2
+
+
+def test_numpy_engine_matches_sql(get_dataframe):
+    """
+    DistanceMatrix() calculated in numpy has the same pairs and near enough the same distances.
+    """
+    sql_df = get_dataframe(DistanceMatrix(level="versioned-site"))
+    numpy_dm = DistanceMatrix(level="versioned-site", engine="numpy")
+    numpy_dm.store().result()
+    numpy_df = get_dataframe(numpy_dm)
+    assert sorted(sql_df.columns) == sorted(numpy_df.columns)
+    keys = ["site_id_from", "version_from", "site_id_to", "version_to"]
+    merged = sql_df.merge(numpy_df, on=keys, suffixes=("_sql", "_numpy"))
+    assert len(merged) == len(sql_df) == len(numpy_df)
+    assert (
+        (merged.distance_sql - merged.distance_numpy).abs()
+        <= 0.005 * merged.distance_sql + 1e-6
+    ).all()
+
+
+def test_max_distance(get_dataframe):
+    """
+    DistanceMatrix() only includes pairs within max_distance, whichever engine is used.
+    """
+    all_pairs = get_dataframe(DistanceMatrix(level="versioned-site"))
+    for engine in ("sql", "numpy"):
+        dm = DistanceMatrix(level="versioned-site", engine=engine, max_distance=200)
+        dm.store().result()
+        df = get_dataframe(dm)
+        assert df.distance.max() <= 200
+        assert 35 <= len(df) < len(all_pairs)
+
+
+def test_numpy_engine_not_stored_by_get_query(flowmachine_connect):
+    """
+    Getting the sql of a DistanceMatrix() using the numpy engine doesn't store it.
+    """
+    dm = DistanceMatrix(level="versioned-site", engine="numpy")
+    dm.get_query()
+    assert not dm.is_stored
+
+
+def test_engine_is_checked():
+    """
+    DistanceMatrix() refuses unknown engines, and geometries from the numpy engine.
+    """
+    with pytest.raises(ValueError):
+        DistanceMatrix(engine="fortran")
+    with pytest.raises(ValueError):
+        DistanceMatrix(engine="numpy", return_geometry=True)
+
+
+def test_default_engine_query_id_unchanged(flowmachine_connect):
+    """
+    Passing the default engine gives the same query as not passing one.
+    """
+    assert (
+        DistanceMatrix(level="versioned-site").md5
+        == DistanceMatrix(level="versioned-site", engine="sql").md5
+    )
+    assert (
+        DistanceMatrix(level="versioned-site").md5
+        != DistanceMatrix(level="versioned-site", engine="numpy").md5
+    )
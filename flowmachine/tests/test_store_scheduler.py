@@ -0,0 +1,76 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Tests for storing queries along with their dependencies.
+"""
+
+import pytest
+
+from flowmachine.core.store_scheduler import StoreScheduler
+from flowmachine.features import daily_location, ModalLocation
+from flowmachine.features.utilities.event_table_subset import EventTableSubset
+
+
+def test_stores_dependencies_first(flowmachine_connect):
+    """
+    Test that storing with dependencies stores each daily location, then the modal location.
+    """
+    dls = [daily_location(f"2016-01-0{d}") for d in range(1, 4)]
+    ml = ModalLocation(*dls)
+    ml.store_with_dependencies().result()
+    assert ml.is_stored
+    assert all(dl.is_stored for dl in dls)
+
+
+def test_scheduler_progress_and_timings(flowmachine_connect):
+    """
+    Test that the scheduler reports progress and how long each store took.
+    """
+    dls = [daily_location(f"2016-01-0{d}") for d in range(1, 4)]
+    ml = ModalLocation(*dls)
+    scheduler = StoreScheduler(ml, max_parallel=2)
+    done, total = scheduler.progress
+    assert 0 == done
+    assert 4 <= total
+    scheduler.start().result()
+    assert (total, total) == scheduler.progress
+    assert {q.md5 for q in [ml, *dls]}.issubset(scheduler.timings)
+    assert all(seconds > 0 for seconds in scheduler.timings.values())
+
+
+def test_scheduler_skips_stored(flowmachine_connect):
+    """
+    Test that queries which are already stored aren't stored again.
+    """
+    dls = [daily_location(f"2016-01-0{d}") for d in range(1, 4)]
+    dls[0].store().result()
+    scheduler = StoreScheduler(ModalLocation(*dls))
+    assert dls[0].md5 not in scheduler.queries
+    assert dls[0].md5 not in scheduler.waiting_on[scheduler.query.md5]
+    assert dls[1].md5 in scheduler.queries
+
+
+def test_scheduler_needs_storable_query(flowmachine_connect):
+    """
+    Test that a query which can't be stored is refused.
+    """
+    with pytest.raises(ValueError):
+        StoreScheduler(EventTableSubset("2016-01-01", "2016-01-02"))
+
+
+def test_scheduler_raises_errors(flowmachine_connect, monkeypatch):
+    """
+    Test that an error storing a dependency is raised, and the query isn't stored.
+    """
+    dls = [daily_location(f"2016-01-0{d}") for d in range(1, 3)]
+    ml = ModalLocation(*dls)
+
+    def fail(*args, **kwargs):
+        raise ValueError("Store failed")
+
+    monkeypatch.setattr(dls[0], "_to_sql", fail)
+    with pytest.raises(ValueError, match="Store failed"):
+        ml.store_with_dependencies().result()
+    assert not ml.is_stored
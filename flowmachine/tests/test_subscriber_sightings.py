@@ -0,0 +1,104 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Tests for the per-day subscriber sightings read by subscriber_locations.
+"""
+
+import pytest
+from pandas.testing import assert_frame_equal
+
+from flowmachine.core.errors import BadLevelError
+from flowmachine.features import (
+    SubscriberSightings,
+    store_subscriber_sightings,
+    subscriber_locations,
+)
+
+
+def _sorted(df):
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+@pytest.mark.parametrize(
+    "level, hours", [("cell", "all"), ("admin3", "all"), ("versioned-site", (20, 4))]
+)
+def test_sightings_match_events(get_dataframe, level, hours):
+    """
+    Test that subscriber locations read from stored sightings are the same as from the events.
+    """
+    start, stop = "2016-01-01 12:00:00", "2016-01-03"
+    for date in ["2016-01-01", "2016-01-02", "2016-01-03"]:
+        SubscriberSightings(date, level=level).store().result()
+    sl = subscriber_locations(start, stop, level=level, hours=hours)
+    from_events = subscriber_locations(
+        start, stop, level=level, hours=hours, read_sightings=False
+    )
+    sightings = SubscriberSightings("2016-01-02", level=level)
+    assert sightings.fully_qualified_table_name in sl.get_query()
+    assert sightings.fully_qualified_table_name not in from_events.get_query()
+    assert_frame_equal(_sorted(get_dataframe(from_events)), _sorted(get_dataframe(sl)))
+
+
+def test_cell_sightings_are_joined_to_other_levels(flowmachine_connect):
+    """
+    Test that stored cell level sightings are used for levels without their own.
+    """
+    for date in ["2016-01-01", "2016-01-02"]:
+        SubscriberSightings(date).store().result()
+    sl = subscriber_locations("2016-01-01", "2016-01-02", level="admin3")
+    assert (
+        SubscriberSightings("2016-01-01").fully_qualified_table_name in sl.get_query()
+    )
+
+
+def test_sightings_not_used_for_missing_day(flowmachine_connect):
+    """
+    Test that sightings aren't used unless they are stored for every day.
+    """
+    SubscriberSightings("2016-01-01").store().result()
+    sl = subscriber_locations("2016-01-01", "2016-01-03")
+    assert (
+        SubscriberSightings("2016-01-01").fully_qualified_table_name
+        not in sl.get_query()
+    )
+
+
+def test_sightings_not_used_for_subscriber_subset(flowmachine_connect):
+    """
+    Test that sightings aren't used for a subset of subscribers.
+    """
+    SubscriberSightings("2016-01-01").store().result()
+    SubscriberSightings("2016-01-02").store().result()
+    sl = subscriber_locations(
+        "2016-01-01", "2016-01-02", subscriber_subset=["1vGR8kp342yxEpwY"]
+    )
+    assert (
+        SubscriberSightings("2016-01-01").fully_qualified_table_name
+        not in sl.get_query()
+    )
+
+
+def test_store_subscriber_sightings_stores_missing_days(flowmachine_connect):
+    """
+    Test that sightings are stored for each day which doesn't have them.
+    """
+    SubscriberSightings("2016-01-01").store().result()
+    futures = store_subscriber_sightings("2016-01-01", "2016-01-03")
+    assert 2 == len(futures)
+    for future in futures:
+        future.result()
+    assert all(
+        SubscriberSightings(date).is_stored
+        for date in ["2016-01-01", "2016-01-02", "2016-01-03"]
+    )
+    assert [] == store_subscriber_sightings("2016-01-01", "2016-01-03")
+
+
+def test_sightings_need_simple_level(flowmachine_connect):
+    """
+    Test that sightings can't be made for levels which need more than a name.
+    """
+    with pytest.raises(BadLevelError):
+        SubscriberSightings("2016-01-01", level="grid")
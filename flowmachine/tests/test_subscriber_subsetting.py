@@ -10,6 +10,8 @@ Tests for the subscriber subsetting functionality
 import pytest
 
 from flowmachine.core import Table
+from flowmachine.core.cache import reset_cache
+from flowmachine.core.subscriber_subsetter import _SubscriberSubsetTable
 from flowmachine.features import (
     RadiusOfGyration,
     ModalLocation,
@@ -193,3 +195,65 @@ def test_omitted_subscriber_column(get_dataframe, subscriber_list):
     )
     assert su_omit_col.duration.values.tolist() == su_all_cols.duration.values.tolist()
     assert su_omit_col.columns.tolist() == ["duration"]
+
+
+def test_large_subset_uses_table(
+    subscriber_list, get_dataframe, flowmachine_connect, monkeypatch
+):
+    """
+    Test that a subset with too many subscribers to list in the sql is selected from a table, with the same result.
+    """
+    inline = EventTableSubset(
+        "2016-01-01", "2016-01-03", subscriber_subset=subscriber_list
+    )
+    inline_df = get_dataframe(inline)
+    monkeypatch.setattr(
+        "flowmachine.core.subscriber_subsetter.MAX_INLINE_SUBSET_SIZE", 2
+    )
+    from_table = EventTableSubset(
+        "2016-01-01", "2016-01-03", subscriber_subset=list(reversed(subscriber_list))
+    )
+    subset_table = from_table.subscriber_subsetter.subset_table
+    assert subset_table in from_table.subscriber_subsetter.dependencies
+    subset_table.store().result()
+    sql = from_table.get_query()
+    assert subset_table.fully_qualified_table_name in sql
+    assert subscriber_list[0] not in sql
+    assert set(inline_df.subscriber) == set(get_dataframe(from_table).subscriber)
+    assert len(inline_df) == len(get_dataframe(from_table))
+
+
+def test_subset_table_is_cached(subscriber_list, flowmachine_connect, monkeypatch):
+    """
+    Test that the table for a large subset is stored in the cache before a query using it, so that resetting the cache removes it.
+    """
+    monkeypatch.setattr(
+        "flowmachine.core.subscriber_subsetter.MAX_INLINE_SUBSET_SIZE", 2
+    )
+    subset_query = EventTableSubset(
+        "2016-01-01", "2016-01-03", subscriber_subset=subscriber_list
+    )
+    subset_table = subset_query.subscriber_subsetter.subset_table
+    schema, name = subset_table.fully_qualified_table_name.split(".")
+    subset_query.get_query()
+    assert not subset_table.is_stored
+    subset_query.store().result()
+    assert [("_SubscriberSubsetTable",)] == flowmachine_connect.fetch(
+        f"SELECT class FROM cache.cached WHERE schema='{schema}' AND tablename='{name}'"
+    )
+    reset_cache(flowmachine_connect)
+    assert not flowmachine_connect.has_table(name, schema=schema)
+
+
+def test_subset_table_name_is_content_addressed():
+    """
+    Test that explicit subsets with the same subscribers in any order share a table.
+    """
+    assert (
+        _SubscriberSubsetTable(["A", "B", "B"]).fully_qualified_table_name
+        == _SubscriberSubsetTable(("B", "A")).fully_qualified_table_name
+    )
+    assert (
+        _SubscriberSubsetTable(["A", "B"]).fully_qualified_table_name
+        != _SubscriberSubsetTable(["A", "C"]).fully_qualified_table_name
+    )
@@ -129,3 +129,78 @@ def test_bad_interval_raises_error():
         TotalLocationEvents(
             "2016-01-01", "2016-01-04", level="versioned-site", interval="BAD_INTERVAL"
         )
+
+
+def test_incremental_matches_full_range(get_dataframe):
+    """
+    Incremental TotalLocationEvents gives the same counts as one over the whole range, for the days it covers.
+    """
+    te = TotalLocationEvents("2016-01-01", "2016-01-04", level="versioned-site")
+    te_incremental = TotalLocationEvents(
+        "2016-01-01", "2016-01-04", level="versioned-site", incremental=True
+    )
+    te_incremental.store().result()
+    df = get_dataframe(te)
+    df = df[df.date.astype(str) != "2016-01-04"]
+    df_incremental = get_dataframe(te_incremental)
+    cols = te.column_names
+    assert (
+        df.sort_values(cols[:-1]).reset_index(drop=True)[cols].values.tolist()
+        == df_incremental.sort_values(cols[:-1])
+        .reset_index(drop=True)[cols]
+        .values.tolist()
+    )
+
+
+def test_incremental_stores_each_day():
+    """
+    Storing incremental TotalLocationEvents stores each day, and a longer range only stores the new days.
+    """
+    te = TotalLocationEvents("2016-01-01", "2016-01-03", incremental=True)
+    te.store().result()
+    assert all(part.is_stored for part in te._incremental_parts)
+    te_longer = TotalLocationEvents("2016-01-01", "2016-01-04", incremental=True)
+    newly_stored = te_longer.store_parts()
+    assert ["2016-01-03"] == [part.start for part in newly_stored]
+
+
+def test_incremental_md5_unchanged_when_off():
+    """
+    The incremental option doesn't change the md5 of a query which isn't incremental.
+    """
+    assert (
+        TotalLocationEvents("2016-01-01", "2016-01-03").md5
+        == TotalLocationEvents("2016-01-01", "2016-01-03", incremental=False).md5
+    )
+    assert (
+        TotalLocationEvents("2016-01-01", "2016-01-03").md5
+        != TotalLocationEvents("2016-01-01", "2016-01-03", incremental=True).md5
+    )
+
+
+@pytest.mark.parametrize(
+    "start, stop", [("2016-01-01 12:00:00", "2016-01-03"), ("2016-01-01", "2016-01-01")]
+)
+def test_incremental_needs_whole_days(start, stop):
+    """
+    Incremental TotalLocationEvents raises an error unless it covers whole days.
+    """
+    with pytest.raises(ValueError):
+        TotalLocationEvents(start, stop, incremental=True)
+
+
+def test_incremental_parts_must_be_defined():
+    """
+    A query using IncrementalMixin can't be created without defining its parts.
+    """
+    from flowmachine.core import Query
+    from flowmachine.core.mixins import IncrementalMixin
+
+    class NoParts(IncrementalMixin, Query):
+        column_names = ["value"]
+
+        def _make_query(self):
+            return "SELECT 1 AS value"
+
+    with pytest.raises(TypeError, match="_incremental_parts"):
+        NoParts()
@@ -0,0 +1,52 @@
+import pytest
+
+from .helpers import poll_until_done, send_message_and_get_reply
+
+
+@pytest.mark.asyncio
+async def test_run_and_poll_query_batch(zmq_url, fm_conn, redis):
+    """
+    Running a batch of queries reports each query's id or error, and polling a batch reports each status.
+    """
+    msg_run_batch = {
+        "action": "run_query_batch",
+        "queries": [
+            {
+                "query_kind": "daily_location",
+                "params": {
+                    "date": "2016-01-01",
+                    "daily_location_method": "last",
+                    "aggregation_unit": "admin3",
+                    "subscriber_subset": "all",
+                },
+            },
+            {"query_kind": "FOOBAR", "params": {}},
+        ],
+        "request_id": "DUMMY_ID",
+    }
+    expected_query_id = "e39b0d45bc6b46b7700c67cd52f00455"
+
+    reply = send_message_and_get_reply(zmq_url, msg_run_batch)
+    assert {
+        "status": "done",
+        "results": [
+            {"status": "accepted", "id": expected_query_id},
+            {"status": "error", "error": "Unsupported query kind: 'FOOBAR'"},
+        ],
+    } == reply
+
+    poll_until_done(zmq_url, expected_query_id)
+
+    msg_poll_batch = {
+        "action": "poll_batch",
+        "query_ids": [expected_query_id, "FOOBAR"],
+        "request_id": "DUMMY_ID",
+    }
+    reply = send_message_and_get_reply(zmq_url, msg_poll_batch)
+    assert {
+        "status": "done",
+        "results": [
+            {"status": "done", "id": expected_query_id, "query_kind": "daily_location"},
+            {"status": "awol", "id": "FOOBAR", "error": "Unknown query id: FOOBAR"},
+        ],
+    } == reply
@@ -0,0 +1,64 @@
+import pytest
+
+from .helpers import poll_until_done, send_message_and_get_reply
+
+
+@pytest.mark.asyncio
+async def test_get_query_metadata(zmq_url):
+    """
+    Running 'get_query_metadata' against an existing query_id returns its kind, parameters, status and sql together.
+    """
+    params = {
+        "date": "2016-01-01",
+        "daily_location_method": "last",
+        "aggregation_unit": "admin3",
+        "subscriber_subset": "all",
+    }
+    msg_run_query = {
+        "action": "run_query",
+        "query_kind": "daily_location",
+        "params": params,
+        "request_id": "DUMMY_ID",
+    }
+
+    reply = send_message_and_get_reply(zmq_url, msg_run_query)
+    query_id = reply["id"]
+    poll_until_done(zmq_url, query_id)
+
+    msg_get_metadata = {
+        "action": "get_query_metadata",
+        "query_id": query_id,
+        "include_sql": True,
+        "request_id": "DUMMY_ID",
+    }
+    reply = send_message_and_get_reply(zmq_url, msg_get_metadata)
+    assert f"SELECT pcod, total FROM cache.x{query_id}" == reply.pop("sql")
+    assert {
+        "id": query_id,
+        "query_kind": "daily_location",
+        "params": params,
+        "status": "done",
+    } == reply
+
+    msg_get_metadata["include_sql"] = False
+    reply = send_message_and_get_reply(zmq_url, msg_get_metadata)
+    assert "sql" not in reply
+
+
+@pytest.mark.asyncio
+async def test_get_query_metadata_for_nonexistent_query_id(zmq_url):
+    """
+    Running 'get_query_metadata' on a non-existent query id returns an error.
+    """
+    msg_get_metadata = {
+        "action": "get_query_metadata",
+        "query_id": "FOOBAR",
+        "request_id": "DUMMY_ID",
+    }
+
+    reply = send_message_and_get_reply(zmq_url, msg_get_metadata)
+    assert {
+        "status": "awol",
+        "id": "FOOBAR",
+        "error": "Unknown query id: FOOBAR",
+    } == reply
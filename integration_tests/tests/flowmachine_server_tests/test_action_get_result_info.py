@@ -0,0 +1,57 @@
+import pytest
+
+from .helpers import poll_until_done, send_message_and_get_reply
+
+
+@pytest.mark.asyncio
+async def test_get_result_info(zmq_url):
+    """
+    Running 'get_result_info' on a finished query returns its cache table, columns and row number column.
+    """
+    msg_run_query = {
+        "action": "run_query",
+        "query_kind": "daily_location",
+        "params": {
+            "date": "2016-01-01",
+            "daily_location_method": "last",
+            "aggregation_unit": "admin3",
+            "subscriber_subset": "all",
+        },
+        "request_id": "DUMMY_ID",
+    }
+    expected_query_id = "e39b0d45bc6b46b7700c67cd52f00455"
+
+    reply = send_message_and_get_reply(zmq_url, msg_run_query)
+    assert {"status": "accepted", "id": expected_query_id} == reply
+    poll_until_done(zmq_url, expected_query_id)
+
+    msg_get_result_info = {
+        "action": "get_result_info",
+        "query_id": expected_query_id,
+        "request_id": "DUMMY_ID",
+    }
+    reply = send_message_and_get_reply(zmq_url, msg_get_result_info)
+    assert {
+        "status": "done",
+        "table_name": f"cache.x{expected_query_id}",
+        "columns": ["pcod", "total"],
+        "key_column": "_row_number",
+    } == reply
+
+
+@pytest.mark.asyncio
+async def test_get_result_info_for_nonexistent_query_id(zmq_url):
+    """
+    Running 'get_result_info' with a non-existent query id returns an error.
+    """
+    msg_get_result_info = {
+        "action": "get_result_info",
+        "query_id": "FOOBAR",
+        "request_id": "DUMMY_ID",
+    }
+    reply = send_message_and_get_reply(zmq_url, msg_get_result_info)
+    assert {
+        "status": "awol",
+        "id": "FOOBAR",
+        "error": "Unknown query id: FOOBAR",
+    } == reply
@@ -45,7 +45,7 @@ async def test_get_sql(zmq_url):
     }
 
     reply = send_message_and_get_reply(zmq_url, msg_get_sql)
-    assert f"SELECT * FROM cache.x{expected_query_id}" == reply["sql"]
+    assert f"SELECT pcod, total FROM cache.x{expected_query_id}" == reply["sql"]
 
 
 @pytest.mark.asyncio
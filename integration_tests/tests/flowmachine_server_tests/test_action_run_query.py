@@ -85,7 +85,7 @@ async def test_run_query(zmq_url, fm_conn, redis):
         ("524 1 03 13", 20),
     ]
     first_few_rows = fm_conn.engine.execute(
-        f"SELECT * FROM cache.{output_cache_table} LIMIT 3"
+        f"SELECT pcod, total FROM cache.{output_cache_table} LIMIT 3"
     ).fetchall()
     assert first_few_rows_expected == first_few_rows
 
@@ -0,0 +1,58 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import os
+
+import asyncpg
+import pytest
+from quart import Quart
+
+
+@pytest.mark.asyncio
+async def test_pages_with_duplicate_and_null_values(fm_conn):
+    """
+    Test that paging through a result with repeated rows and null values,
+    with pages ending part way through them, returns every row exactly once,
+    in order of the row numbers.
+    """
+    from app.pagination import fetch_result_page
+
+    fm_conn.engine.execute(
+        """
+        CREATE TABLE cache.pagination_test AS
+        SELECT key, n, row_number() OVER () AS _row_number
+        FROM (VALUES ('A', 1), ('A', 1), ('A', 3), ('B', 4),
+            (NULL, 5), (NULL, NULL), (NULL, NULL)) AS t(key, n)
+        """
+    )
+    app = Quart(__name__)
+    app.pool = await asyncpg.create_pool(
+        host=os.getenv("FLOWDB_HOST", "localhost"),
+        port=int(os.getenv("FLOWDB_PORT", 9000)),
+        user="flowdb",
+        password="flowflow",
+        database="flowdb",
+    )
+    try:
+        rows, cursor = [], None
+        async with app.app_context():
+            while True:
+                page, cursor = await fetch_result_page(
+                    "cache.pagination_test", ["key", "n"], "_row_number", 2, cursor
+                )
+                rows += page
+                if cursor is None:
+                    break
+    finally:
+        await app.pool.close()
+        fm_conn.engine.execute("DROP TABLE cache.pagination_test")
+    assert [
+        {"key": "A", "n": 1},
+        {"key": "A", "n": 1},
+        {"key": "A", "n": 3},
+        {"key": "B", "n": 4},
+        {"key": None, "n": 5},
+        {"key": None, "n": None},
+        {"key": None, "n": None},
+    ] == rows